@@ -0,0 +1,175 @@
+"""Autotune module: finds the best request settings of each gitlab host.
+
+Runs short probes against each host, varying the number of requests in flight
+and the page size (see src.tuning.tune_host), and stores the best settings in
+the tuning profile, which the runs of main load automatically.
+
+Usage (from the root of the repository):
+
+    python3 -m autotune [--sources <file>] [--profile <file>] [-c <levels>] [-p <page sizes>]
+                        [-n <projects>] [--pages <pages>]
+"""
+
+# Python Libraries
+import getopt
+import sys
+
+# Program Libraries
+from src.constants import MAX_PER_PAGE
+from src.sources import CENTRAL, LEGACY
+from src.tuning import (
+    DEFAULT_CONCURRENCY_LEVELS,
+    DEFAULT_PAGE_SIZES,
+    DEFAULT_PROBE_PAGES,
+    DEFAULT_PROBE_PROJECTS,
+    format_probe,
+    get_default_profile_path,
+    get_host,
+    load_profile,
+    save_profile,
+    tune_host
+)
+
+# The groups whose projects are probed on each gitlab instance: the helm
+# projects (Central CI) and the group of tas/kubernetes (Legacy CI).
+DEFAULT_TARGETS = [{"instance" : CENTRAL, "group" : "ntas/helm"},
+                   {"instance" : LEGACY, "group" : "tas"}]
+
+def print_help():
+    """Prints help message."""
+    msg = f"""Options:
+    --sources <string: file>            : (optional) Probe the groups listed in a sources file
+                                                        (the first one of each gitlab instance)
+                                                        instead of ntas/helm and tas.
+    --profile <string: file>            : (optional) The tuning profile (default is
+                                                        {get_default_profile_path()}).
+    -c, --concurrency <ints: 1,2,...>   : (optional) The probed numbers of requests in flight
+                                                        (default is {','.join(map(str, DEFAULT_CONCURRENCY_LEVELS))}).
+    -p, --per-page <ints: 20,50,...>    : (optional) The probed page sizes, 1-{MAX_PER_PAGE}
+                                                        (default is {','.join(map(str, DEFAULT_PAGE_SIZES))}).
+    -n, --projects <int>                : (optional) The number of projects crawled by each
+                                                        probe (default is {DEFAULT_PROBE_PROJECTS}).
+    --pages <int>                       : (optional) The maximum number of pages of tags of each
+                                                        project (default is {DEFAULT_PROBE_PAGES}).
+        """
+    print(msg)
+
+def parse_int_list(arg, maximum = None):
+    """Parses a comma-separated list of positive integers (None if it is invalid)."""
+    values = [value.strip() for value in arg.split(",")]
+    if (not values) or not all(value.isdigit() and int(value) >= 1 for value in values):
+        return None
+    values = sorted({int(value) for value in values})
+    if (maximum is not None) and values[-1] > maximum:
+        return None
+    return tuple(values)
+
+def parse_arguments(argv):
+    """Parses the provided arguments.
+
+    Returns:
+        (dict): The options: "sources", "profile", "concurrency", "per_page",
+                "projects" and "pages".
+    """
+    options = {
+        "sources" : None,
+        "profile" : None,
+        "concurrency" : DEFAULT_CONCURRENCY_LEVELS,
+        "per_page" : DEFAULT_PAGE_SIZES,
+        "projects" : DEFAULT_PROBE_PROJECTS,
+        "pages" : DEFAULT_PROBE_PAGES
+    }
+
+    try:
+        opts, _ = getopt.getopt(argv[1:], "hc:p:n:", ["help", "sources=", "profile=",
+                                                      "concurrency=", "per-page=",
+                                                      "projects=", "pages="])
+    except Exception:
+        print_help()
+        sys.exit(1)
+
+    for opt, arg in opts:
+        if opt in ("-h", "--help"):
+            print_help()
+            sys.exit(0)
+        elif opt == "--sources":
+            options["sources"] = arg
+        elif opt == "--profile":
+            options["profile"] = arg
+        elif opt in ("-c", "--concurrency"):
+            options["concurrency"] = parse_int_list(arg)
+        elif opt in ("-p", "--per-page"):
+            options["per_page"] = parse_int_list(arg, MAX_PER_PAGE)
+        elif opt in ("-n", "--projects"):
+            options["projects"] = int(arg) if arg.isdigit() and int(arg) >= 1 else None
+        elif opt == "--pages":
+            options["pages"] = int(arg) if arg.isdigit() and int(arg) >= 1 else None
+
+    if None in (options["concurrency"], options["per_page"], options["projects"],
+                options["pages"]):
+        print_help()
+        sys.exit(1)
+
+    return options
+
+def get_targets(options):
+    """Returns the group probed on each gitlab instance (see DEFAULT_TARGETS)."""
+    if options["sources"] is None:
+        return DEFAULT_TARGETS
+    from src.sources import load_sources
+    sources, _ = load_sources(options["sources"])
+    targets = {}
+    for source in sources:
+        targets.setdefault(source["instance"], source)
+    return list(targets.values())
+
+def get_api(instance):
+    """Returns a new API object of a gitlab instance ("central" or "legacy")."""
+    if instance == LEGACY:
+        from src.legacy_ci_api import LegacyCIAPI
+        return LegacyCIAPI()
+    from src.central_ci_api import CentralCIAPI
+    return CentralCIAPI()
+
+def main(options):
+    """Tunes every host and stores the settings in the tuning profile.
+
+    Returns:
+        (int): The exit code (1 if no host could be tuned).
+    """
+    profile_path = options["profile"] or get_default_profile_path()
+    hosts = load_profile(profile_path)
+    tuned = 0
+
+    for target in get_targets(options):
+        api = get_api(target["instance"])
+        host = get_host(api.groups_uri)
+        print(f"Tuning {host} (probing the projects of {target['group']}):")
+        try:
+            hosts[host] = tune_host(api, target["group"], options["concurrency"],
+                                    options["per_page"], options["projects"], options["pages"],
+                                    report = lambda probe: print("  " + format_probe(probe)))
+        except Exception as exc:
+            print(f"  Tuning failed, the previous settings are kept: {exc}")
+            continue
+        finally:
+            api.close()
+        tuned += 1
+        settings = hosts[host]
+        print(f"  -> per_page {settings['per_page']}, concurrency {settings['concurrency']}, " +\
+              f"timeout {settings['timeout']}s, backoff factor {settings['backoff_factor']}s")
+
+    if tuned == 0:
+        print("No host could be tuned.")
+        return 1
+
+    try:
+        save_profile(hosts, profile_path)
+    except OSError as exc:
+        print(f"The tuning profile could not be written: {exc}")
+        return 1
+    print(f"Tuning profile written to {profile_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(parse_arguments(sys.argv)))
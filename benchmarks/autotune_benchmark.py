@@ -0,0 +1,188 @@
+"""Autotune validation benchmark.
+
+Starts a local stub gitlab server (groups, projects and tags listings) with
+injected latency: each response takes a fixed latency plus a cost per tag,
+and requests beyond a number in flight are throttled (429). Tunes it with
+src.tuning.tune_host, stores the settings in a temporary profile and checks
+that a run loads them (see RequirementsYamlUpdater.apply_request_settings).
+The tuned concurrency should not exceed the throttling limit.
+
+Usage (from the root of the repository):
+
+    python3 -m benchmarks.autotune_benchmark [-l <latency in ms>] [-k <cost per tag in us>]
+                                             [-t <throttling limit>] [-n <projects>]
+"""
+
+# Python Libraries
+import getopt
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import os.path
+import re
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# pylint: disable=wrong-import-position
+from src.central_ci_api import CentralCIAPI
+from src.constants import API_V4, GROUPS_PATH, PROJECTS_PATH, SUBGROUPS_PATH, TAGS_PATH
+from src.requirements_yaml_updater import RequirementsYamlUpdater
+from src.tuning import format_probe, get_host, load_profile, save_profile, tune_host
+
+DEFAULT_LATENCY_MS = 20
+DEFAULT_TAG_COST_US = 100
+DEFAULT_THROTTLE_LIMIT = 6
+DEFAULT_PROJECTS = 40
+
+
+def make_tags(project_id):
+    """Returns the tags of a project (newest first), 40 to 280 of them."""
+    return [{
+        "name" : f"1.{i}.0",
+        "message" : "",
+        "commit" : {"id" : "0" * 40, "title" : f"ntas-xy-z-foo change {i}",
+                    "committed_date" : "2023-01-01T00:00:00.000+00:00"}
+    } for i in reversed(range(40 + (project_id * 37) % 240))]
+
+
+def start_stub_server(latency, tag_cost, throttle_limit, num_projects, stats):
+    """Starts the stub gitlab server (HTTP/1.1, keep-alive) and returns its port."""
+    projects = [{"id" : 100 + i, "name" : f"helm-{i}",
+                 "last_activity_at" : f"2023-01-{1 + i % 28:02d}T00:00:00.000Z"}
+                for i in range(num_projects)]
+    tags = {project["id"] : make_tags(project["id"]) for project in projects}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        """Serves the listings after latency seconds (plus tag_cost per tag)."""
+        protocol_version = "HTTP/1.1"
+        # Only the injected latency delays the responses.
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            with lock:
+                stats["in_flight"] += 1
+                stats["requests"] += 1
+                throttled = stats["in_flight"] > throttle_limit
+                stats["throttled"] += int(throttled)
+            try:
+                if throttled:
+                    self.respond(429, [])
+                else:
+                    self.respond(200, self.route())
+            finally:
+                with lock:
+                    stats["in_flight"] -= 1
+
+        def route(self):
+            uri = urlparse(self.path)
+            query = {key : value[0] for key, value in parse_qs(uri.query).items()}
+            page = int(query.get("page", 1))
+            per_page = int(query.get("per_page", 20))
+            if match := re.match(r"^/api/v4/projects/(\d+)/repository/tags$", uri.path):
+                items = tags.get(int(match.group(1)), [])
+                items = items[(page - 1) * per_page : page * per_page]
+                time.sleep(latency + tag_cost * len(items))
+                return items
+            time.sleep(latency)
+            if re.match(r"^/api/v4/groups/[^/]+/subgroups$", uri.path):
+                return [{"id" : 7, "name" : "helm"}] if page == 1 else []
+            if re.match(r"^/api/v4/groups/\d+/projects$", uri.path):
+                return projects[(page - 1) * per_page : page * per_page]
+            return {"id" : 3}
+
+        def respond(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    return server.server_address[1]
+
+
+def main(argv):
+    """Runs the benchmark."""
+    latency_ms = DEFAULT_LATENCY_MS
+    tag_cost_us = DEFAULT_TAG_COST_US
+    throttle_limit = DEFAULT_THROTTLE_LIMIT
+    num_projects = DEFAULT_PROJECTS
+
+    opts, _ = getopt.getopt(argv[1:], "l:k:t:n:", ["latency=", "tag-cost=", "throttle=",
+                                                  "projects="])
+    for opt, arg in opts:
+        if opt in ("-l", "--latency"):
+            latency_ms = float(arg)
+        elif opt in ("-k", "--tag-cost"):
+            tag_cost_us = float(arg)
+        elif opt in ("-t", "--throttle"):
+            throttle_limit = int(arg)
+        elif opt in ("-n", "--projects"):
+            num_projects = int(arg)
+
+    stats = {"in_flight" : 0, "requests" : 0, "throttled" : 0}
+    port = start_stub_server(latency_ms / 1000, tag_cost_us / 1e6, throttle_limit,
+                             num_projects, stats)
+
+    # The API of Central CI, pointed to the stub server.
+    base_uri = f"http://127.0.0.1:{port}{API_V4}"
+    api = CentralCIAPI()
+    api.groups_uri = base_uri + GROUPS_PATH
+    api.subgroups_uri = base_uri + SUBGROUPS_PATH
+    api.projects_uri = base_uri + PROJECTS_PATH
+    api.project_tags_uri = base_uri + TAGS_PATH
+
+    print(f"stub: {latency_ms:.0f} ms latency + {tag_cost_us:.0f} us per tag, " +\
+          f"throttled beyond {throttle_limit} requests in flight, {num_projects} projects")
+
+    # RequestMaker writes its execution log in the working directory.
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            start = time.perf_counter()
+            settings = tune_host(api, "ntas/helm", num_projects = num_projects,
+                                 report = lambda probe: print("  " + format_probe(probe)))
+            elapsed = time.perf_counter() - start
+
+            profile_path = os.path.join(directory, "tuning.json")
+            save_profile({get_host(api.groups_uri) : settings}, profile_path)
+            updater = RequirementsYamlUpdater()
+            updater.tuning = load_profile(profile_path)
+            loaded_api = CentralCIAPI()
+            loaded_api.groups_uri = api.groups_uri
+            updater.apply_request_settings(loaded_api)
+            loaded_api.set_per_page(updater.get_per_page(loaded_api, deep_search = True))
+        finally:
+            os.chdir(cwd)
+            api.close()
+
+    print(f"tuned in {elapsed:.1f}s ({stats['requests']} requests, " +\
+          f"{stats['throttled']} throttled): per_page {settings['per_page']}, " +\
+          f"concurrency {settings['concurrency']}, timeout {settings['timeout']}s, " +\
+          f"backoff factor {settings['backoff_factor']}s")
+    print(f"loaded by a deep search: per_page {loaded_api.per_page}, " +\
+          f"concurrency {updater.get_concurrency(loaded_api)}, " +\
+          f"timeout {loaded_api.timeout}s, " +\
+          f"backoff factor {loaded_api.retry_policy.base_delay}s")
+
+    if settings["concurrency"] > throttle_limit:
+        print("FAILED: the tuned concurrency exceeds the throttling limit.")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,216 @@
+"""HTTP/2 transport benchmark.
+
+Fetches tag pages concurrently from two local stub servers with the same
+latency: an HTTP/1.1 server (default transport of RequestMaker) and an
+h2c server (HTTP/2 transport, prior knowledge). Reports wall time,
+throughput and the number of connections opened to each server.
+
+Requires the optional httpx and h2 packages:
+
+    pip install "httpx[http2]"
+
+Usage (from the root of the repository):
+
+    python3 -m benchmarks.http2_benchmark [-n <requests>] [-c <concurrency>] [-l <latency in ms>]
+"""
+
+# Python Libraries
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import getopt
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import os.path
+import sys
+import tempfile
+import threading
+import time
+
+import h2.config
+import h2.connection
+import h2.events
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# pylint: disable=wrong-import-position
+from src.request_maker import RequestMaker
+
+DEFAULT_REQUESTS = 400
+DEFAULT_CONCURRENCY = 32
+DEFAULT_LATENCY_MS = 20
+
+
+def tag_page():
+    """Returns a synthetic page of 50 tags, as returned by gitlab."""
+    tags = [{
+        "name" : f"1.{i}.0",
+        "message" : "",
+        "commit" : {"id" : "0" * 40, "title" : f"ntas-xy-z-foo change {i}",
+                    "committed_date" : "2023-01-01T00:00:00.000+00:00"}
+    } for i in range(50)]
+    return json.dumps(tags).encode()
+
+
+def start_http1_server(latency, body, stats):
+    """Starts the HTTP/1.1 stub server (keep-alive) and returns its port."""
+
+    class Handler(BaseHTTPRequestHandler):
+        """Serves body after latency seconds."""
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            stats["connections"] += 1
+            super().setup()
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    return server.server_address[1]
+
+
+class H2Protocol(asyncio.Protocol):
+    """h2c (HTTP/2 without TLS) stub server: serves body after latency seconds."""
+
+    def __init__(self, latency, body, stats):
+        self.latency = latency
+        self.body = body
+        self.stats = stats
+        self.transport = None
+        self.connection = h2.connection.H2Connection(
+            config = h2.config.H2Configuration(client_side = False))
+        # Remaining data of each stream, waiting for the flow control window.
+        self.pending = {}
+
+    def connection_made(self, transport):
+        self.stats["connections"] += 1
+        self.transport = transport
+        self.connection.initiate_connection()
+        self.transport.write(self.connection.data_to_send())
+
+    def data_received(self, data):
+        for event in self.connection.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                asyncio.get_running_loop().call_later(self.latency, self.respond,
+                                                      event.stream_id)
+            elif isinstance(event, h2.events.WindowUpdated):
+                for stream_id in list(self.pending):
+                    self.flush(stream_id)
+        self.transport.write(self.connection.data_to_send())
+
+    def respond(self, stream_id):
+        """Sends the headers and the body of a response."""
+        self.connection.send_headers(stream_id, [
+            (":status", "200"),
+            ("content-type", "application/json"),
+            ("content-length", str(len(self.body)))
+        ])
+        self.pending[stream_id] = self.body
+        self.flush(stream_id)
+
+    def flush(self, stream_id):
+        """Sends as much of the body of a stream as the flow control window allows."""
+        data = self.pending[stream_id]
+        while data:
+            size = min(self.connection.local_flow_control_window(stream_id),
+                       self.connection.max_outbound_frame_size, len(data))
+            if size <= 0:
+                break
+            self.connection.send_data(stream_id, data[:size])
+            data = data[size:]
+
+        if data:
+            self.pending[stream_id] = data
+        else:
+            del self.pending[stream_id]
+            self.connection.end_stream(stream_id)
+        self.transport.write(self.connection.data_to_send())
+
+
+def start_h2_server(latency, body, stats):
+    """Starts the h2c stub server and returns its port."""
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(loop.create_server(
+        lambda: H2Protocol(latency, body, stats), "127.0.0.1", 0))
+    threading.Thread(target = loop.run_forever, daemon = True).start()
+    return server.sockets[0].getsockname()[1]
+
+
+def run(request_maker, uri, requests, concurrency):
+    """Fetches uri requests times, with concurrency requests in flight.
+
+    Returns:
+        (float): The wall time in seconds.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = concurrency) as executor:
+        # Distinct uris, so that requests are not coalesced.
+        uris = [f"{uri}?page={page}" for page in range(requests)]
+        for response in executor.map(request_maker.make_request, uris):
+            assert response.status_code == 200
+    return time.perf_counter() - start
+
+
+def main(argv):
+    """Runs the benchmark."""
+    requests = DEFAULT_REQUESTS
+    concurrency = DEFAULT_CONCURRENCY
+    latency_ms = DEFAULT_LATENCY_MS
+
+    opts, _ = getopt.getopt(argv[1:], "n:c:l:", ["requests=", "concurrency=", "latency="])
+    for opt, arg in opts:
+        if opt in ("-n", "--requests"):
+            requests = int(arg)
+        elif opt in ("-c", "--concurrency"):
+            concurrency = int(arg)
+        elif opt in ("-l", "--latency"):
+            latency_ms = float(arg)
+
+    body = tag_page()
+    http1_stats = {"connections" : 0}
+    h2_stats = {"connections" : 0}
+    http1_port = start_http1_server(latency_ms / 1000, body, http1_stats)
+    h2_port = start_h2_server(latency_ms / 1000, body, h2_stats)
+    path = "/api/v4/projects/1/repository/tags"
+
+    http1_maker = RequestMaker()
+    h2_maker = RequestMaker()
+    if not h2_maker.enable_http2(prior_knowledge = True):
+        print("HTTP/2 transport not available, install httpx[http2].")
+        return 1
+
+    print(f"{requests} requests, {concurrency} in flight, {latency_ms:.0f} ms latency, " +\
+          f"{len(body)} bytes per page")
+    print(f"{'transport':<12}{'wall (s)':>10}{'req/s':>10}{'connections':>14}")
+
+    # RequestMaker writes its execution log in the working directory.
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            for name, request_maker, port, stats in (
+                    ("HTTP/1.1", http1_maker, http1_port, http1_stats),
+                    ("HTTP/2", h2_maker, h2_port, h2_stats)):
+                wall_time = run(request_maker, f"http://127.0.0.1:{port}{path}",
+                                requests, concurrency)
+                print(f"{name:<12}{wall_time:>10.2f}{requests / wall_time:>10.1f}" +\
+                      f"{stats['connections']:>14}")
+        finally:
+            os.chdir(cwd)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
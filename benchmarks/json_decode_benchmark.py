@@ -0,0 +1,129 @@
+"""JSON decode benchmark.
+
+Decodes large synthetic tag pages (as returned by gitlab) with:
+    - response.text + json.loads (the previous decode path: charset
+      detection and decoding to a string, then parsing),
+    - json.loads on response.content,
+    - src.fast_json.parse_json on response.content (orjson if installed),
+and reports the CPU time per page of each path.
+
+Usage (from the root of the repository):
+
+    python3 -m benchmarks.json_decode_benchmark [-p <pages>] [-t <tags per page>]
+"""
+
+# Python Libraries
+import getopt
+import json
+import os.path
+import sys
+import time
+
+from requests.models import Response
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# pylint: disable=wrong-import-position
+from src import fast_json
+
+DEFAULT_PAGES = 200
+DEFAULT_TAGS_PER_PAGE = 100
+
+
+def tag_page(page_number, tags_per_page):
+    """Returns the body of a synthetic page of tags, with the fields of gitlab's tags API."""
+    tags = []
+    for i in range(tags_per_page):
+        number = page_number * tags_per_page + i
+        commit_id = f"{number:040x}"
+        tags.append({
+            "name" : f"1.{number // 100}.{number % 100}",
+            "message" : "",
+            "target" : commit_id,
+            "commit" : {
+                "id" : commit_id,
+                "short_id" : commit_id[:8],
+                "created_at" : "2023-05-17T10:21:43.000+00:00",
+                "parent_ids" : [f"{number + 1:040x}"],
+                "title" : f"ntas-xy-z-foo: update helm chart of release {number}",
+                "message" : f"ntas-xy-z-foo: update helm chart of release {number}\n\n" +\
+                    "Signed-off-by: Jane Doe <jane.doe@example.com>\n",
+                "author_name" : "Jane Doe",
+                "author_email" : "jane.doe@example.com",
+                "authored_date" : "2023-05-17T10:21:43.000+00:00",
+                "committer_name" : "Jane Doe",
+                "committer_email" : "jane.doe@example.com",
+                "committed_date" : "2023-05-17T10:21:43.000+00:00",
+                "trailers" : {},
+                "web_url" : "https://gitlab.example.com/ntas/helm/foo/-/commit/" + commit_id
+            },
+            "release" : None,
+            "protected" : False
+        })
+    return json.dumps(tags).encode()
+
+def make_response(content):
+    """Returns a requests Response with content as body and
+    no charset in its headers (as gitlab's JSON responses)."""
+    response = Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = "application/json"
+    response._content = content
+    return response
+
+def text_then_json(content):
+    """The previous decode path."""
+    return json.loads(make_response(content).text)
+
+def json_from_content(content):
+    """json.loads on the bytes of the body."""
+    return json.loads(make_response(content).content)
+
+def fast_json_from_content(content):
+    """src.fast_json on the bytes of the body."""
+    response = make_response(content)
+    if fast_json.is_empty_page(response.content):
+        return []
+    return fast_json.parse_json(response.content)
+
+def run(decode, pages):
+    """Decodes every page and returns the CPU time in seconds."""
+    start = time.process_time()
+    for content in pages:
+        decode(content)
+    return time.process_time() - start
+
+def main(argv):
+    """Runs the benchmark."""
+    num_pages = DEFAULT_PAGES
+    tags_per_page = DEFAULT_TAGS_PER_PAGE
+
+    opts, _ = getopt.getopt(argv[1:], "p:t:", ["pages=", "tags="])
+    for opt, arg in opts:
+        if opt in ("-p", "--pages"):
+            num_pages = int(arg)
+        elif opt in ("-t", "--tags"):
+            tags_per_page = int(arg)
+
+    pages = [tag_page(page_number, tags_per_page) for page_number in range(num_pages)]
+    size = sum(len(content) for content in pages) / num_pages
+
+    parser = "orjson" if fast_json.orjson is not None else "json (orjson not installed)"
+    print(f"{num_pages} pages of {tags_per_page} tags, {size / 1024:.1f} KB per page")
+    print(f"{'decode path':<44}{'ms/page':>10}{'speedup':>10}")
+
+    baseline = None
+    for name, decode in (("response.text + json.loads", text_then_json),
+                         ("json.loads(response.content)", json_from_content),
+                         (f"fast_json ({parser})", fast_json_from_content)):
+        # Warm up, then measure.
+        run(decode, pages[:5])
+        cpu_time = run(decode, pages)
+        baseline = baseline or cpu_time
+        print(f"{name:<44}{cpu_time / num_pages * 1000:>10.3f}{baseline / cpu_time:>9.1f}x")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,150 @@
+"""Startup-time benchmark.
+
+Runs main.py for the short code paths (help, argument error, offline update
+from a snapshot) with `python -X importtime` and checks that:
+    - the import time of the program stays within the budget,
+    - heavy modules (requests, urllib3, yaml) are not imported where they are
+      not needed.
+
+Usage (from the root of the repository):
+
+    python3 -m benchmarks.startup_benchmark [-n <runs>] [-b <budget in ms>]
+                                            [-o <offline budget in ms>]
+
+Exits with status 1 if a budget check fails.
+"""
+
+# Python Libraries
+import getopt
+import os
+import os.path
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Default number of runs per scenario.
+DEFAULT_RUNS = 5
+# Default budget (in ms) for the import time of the program.
+DEFAULT_BUDGET_MS = 50
+# Default budget (in ms) for the import time of the offline update, which
+# parses and writes the requirements file: yaml alone takes 20 to 40 ms.
+DEFAULT_OFFLINE_BUDGET_MS = 100
+# Modules that should only be imported when gitlab is accessed.
+NETWORK_MODULES = ("requests", "urllib3")
+
+
+def build_snapshot(directory):
+    """Writes a small synthetic snapshot for the offline scenario.
+
+    Returns:
+        (string): The path of the snapshot.
+    """
+    sys.path.insert(0, REPO_ROOT)
+    from src.snapshot import write_snapshot
+
+    requirements = "dependencies:\n"
+    projects = []
+    for i in range(50):
+        requirements += f"  - name: chart-{i}\n    version: 1.0.0\n    repository: '@repo'\n"
+        projects.append({
+            "name" : f"helm-chart-{i}",
+            "id" : i,
+            "tags" : [{"name" : f"1.0.{j}", "title" : f"title {j}"} for j in range(50)]
+        })
+
+    path = os.path.join(directory, "snapshot.jsonl.gz")
+    write_snapshot(path, {
+        "branch" : "benchmark",
+        "deep_search" : False,
+        "branch_info" : {"name" : "benchmark"},
+        "requirements" : requirements,
+        "projects" : projects
+    })
+    return path
+
+def run_scenario(args, cwd):
+    """Runs main.py once with -X importtime.
+
+    Returns:
+        wall_time_ms(float): The wall time of the process.
+        import_time_ms(float): The import time of the program (excluding
+                               the imports of the interpreter's startup).
+        modules(set): The names of the imported modules.
+    """
+    command = [sys.executable, "-X", "importtime", os.path.join(REPO_ROOT, "main.py")] + args
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd = cwd, capture_output = True, text = True,
+                            env = {**os.environ, "PYTHONPATH" : REPO_ROOT}, check = False)
+    wall_time_ms = (time.perf_counter() - start) * 1000
+
+    import_time_us = 0
+    modules = set()
+    program_started = False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        module = name.strip()
+        modules.add(module)
+        # Imports of the interpreter's startup (site, encodings, ...) come first,
+        # the program starts with the first "src" import or its own stdlib imports.
+        if module.startswith("src") or module in ("getopt", "json"):
+            program_started = True
+        if program_started and not name.startswith("  "):
+            import_time_us += int(cumulative)
+
+    return wall_time_ms, import_time_us / 1000, modules
+
+def main(argv):
+    """Runs the benchmark and checks the budget."""
+    runs = DEFAULT_RUNS
+    budget_ms = DEFAULT_BUDGET_MS
+    offline_budget_ms = DEFAULT_OFFLINE_BUDGET_MS
+
+    opts, _ = getopt.getopt(argv[1:], "n:b:o:", ["runs=", "budget=", "offline-budget="])
+    for opt, arg in opts:
+        if opt in ("-n", "--runs"):
+            runs = int(arg)
+        elif opt in ("-b", "--budget"):
+            budget_ms = float(arg)
+        elif opt in ("-o", "--offline-budget"):
+            offline_budget_ms = float(arg)
+
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot = build_snapshot(directory)
+        # (name, arguments, budget, modules that must not be imported)
+        scenarios = [
+            ("help", ["-h"], budget_ms, NETWORK_MODULES + ("yaml",)),
+            ("argument error", ["--no-such-option"], budget_ms, NETWORK_MODULES + ("yaml",)),
+            ("offline", ["--from-snapshot", snapshot, "-q"], offline_budget_ms, NETWORK_MODULES),
+        ]
+
+        print(f"{'scenario':<16}{'wall (ms)':>12}{'imports (ms)':>14}  status")
+        for name, args, scenario_budget_ms, forbidden in scenarios:
+            wall_times, import_times = [], []
+            modules = set()
+            for _ in range(runs):
+                wall_time_ms, import_time_ms, modules = run_scenario(args, directory)
+                wall_times.append(wall_time_ms)
+                import_times.append(import_time_ms)
+
+            import_time_ms = statistics.median(import_times)
+            unexpected = sorted(module for module in forbidden if module in modules)
+            status = "ok"
+            if import_time_ms > scenario_budget_ms:
+                status = f"FAIL (over {scenario_budget_ms:.0f} ms budget)"
+            if unexpected:
+                status = f"FAIL (imports {', '.join(unexpected)})"
+            failed = failed or (status != "ok")
+
+            print(f"{name:<16}{statistics.median(wall_times):>12.1f}{import_time_ms:>14.1f}  {status}")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,115 @@
+"""Tag index benchmark.
+
+Builds a TagIndex for projects with thousands of tags (releases, pre-releases
+and "v"-prefixed duplicates) and compares its lookups (latest tag, latest tag
+below a version) with scanning the list of tags for every lookup.
+
+Usage (from the root of the repository):
+
+    python3 -m benchmarks.tag_index_benchmark [-p <projects>] [-t <tags per project>] [-q <queries>]
+"""
+
+# Python Libraries
+import getopt
+import os.path
+import random
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# pylint: disable=wrong-import-position
+from src.tag_index import TagIndex, version_key
+
+DEFAULT_PROJECTS = 50
+DEFAULT_TAGS = 5000
+DEFAULT_QUERIES = 200
+
+
+def project_tags(num_tags, rng):
+    """Returns num_tags synthetic tag names, in random order."""
+    tags = []
+    while len(tags) < num_tags:
+        version = f"{rng.randrange(10)}.{rng.randrange(50)}.{rng.randrange(100)}"
+        kind = rng.random()
+        if kind < 0.2:
+            tags.append("v" + version)
+        elif kind < 0.3:
+            tags.append(f"{version}-rc.{rng.randrange(5)}")
+        tags.append(version)
+    return tags[:num_tags]
+
+def scan_latest(tags):
+    """The latest tag, by scanning the list."""
+    return max((tag for tag in tags if version_key(tag) is not None), key = version_key)
+
+def scan_latest_below(tags, bound):
+    """The latest tag below bound, by scanning the list."""
+    bound_key = version_key(bound)
+    below = [tag for tag in tags if (version_key(tag) or bound_key) < bound_key]
+    return max(below, key = version_key) if below else None
+
+def main(argv):
+    """Runs the benchmark."""
+    num_projects = DEFAULT_PROJECTS
+    num_tags = DEFAULT_TAGS
+    num_queries = DEFAULT_QUERIES
+
+    opts, _ = getopt.getopt(argv[1:], "p:t:q:", ["projects=", "tags=", "queries="])
+    for opt, arg in opts:
+        if opt in ("-p", "--projects"):
+            num_projects = int(arg)
+        elif opt in ("-t", "--tags"):
+            num_tags = int(arg)
+        elif opt in ("-q", "--queries"):
+            num_queries = int(arg)
+
+    rng = random.Random(0)
+    projects = [project_tags(num_tags, rng) for _ in range(num_projects)]
+    bounds = [f"{rng.randrange(10)}.{rng.randrange(50)}.0" for _ in range(num_queries)]
+
+    start = time.perf_counter()
+    indexes = [TagIndex(tags) for tags in projects]
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for index in indexes:
+        index.latest()
+        for bound in bounds:
+            index.latest_below(bound)
+    index_time = time.perf_counter() - start
+
+    # Scanning is slow: measure a few projects only.
+    scanned = projects[:max(1, num_projects // 10)]
+    start = time.perf_counter()
+    for tags in scanned:
+        scan_latest(tags)
+        for bound in bounds:
+            scan_latest_below(tags, bound)
+    scan_time = (time.perf_counter() - start) * num_projects / len(scanned)
+
+    # Both ways select the same tags ("vX.Y.Z" and "X.Y.Z" are the same version).
+    for tags, index in zip(scanned, indexes):
+        assert version_key(scan_latest(tags)) == version_key(index.latest())
+        for bound in bounds[:10]:
+            expected = scan_latest_below(tags, bound)
+            found = index.latest_below(bound)
+            assert (expected is None and found is None) or \
+                version_key(expected) == version_key(found)
+
+    lookups = num_projects * (num_queries + 1)
+    print(f"{num_projects} projects, {num_tags} tags per project, " +\
+          f"{num_queries + 1} lookups per project")
+    print(f"index build:            {build_time * 1000:10.1f} ms " +\
+          f"({build_time / num_projects * 1000:.2f} ms per project)")
+    print(f"index lookups:          {index_time * 1000:10.1f} ms " +\
+          f"({index_time / lookups * 1e6:.2f} us per lookup)")
+    print(f"list scan (estimated):  {scan_time * 1000:10.1f} ms " +\
+          f"({scan_time / lookups * 1e6:.2f} us per lookup)")
+    print(f"speedup (build + lookups): {scan_time / (build_time + index_time):.0f}x")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
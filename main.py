@@ -1,6 +1,7 @@
 """Main module."""
 
 # Python Libraries
+from contextlib import nullcontext
 import getopt
 import json
 import os
@@ -9,22 +10,76 @@ import sys
 
 # Program Libraries
 from src.constants import (
+    MAX_PER_PAGE,
     REQUIREMENTS_YAML_FILE,
     OLD_YAML_FILE,
     EXECUTION_LOG_FILE,
-    ERROR_LOG_FILE
+    ERROR_LOG_FILE,
+    CRAWL_JOURNAL_FILE
 )
 from src.exceptions import (
-    FetchInfoFailedException
+    CassetteException,
+    FetchInfoFailedException,
+    SourcesFileException
 )
 from src.utils import (
     is_string,
     write_text_to_file)
-from src.requirements_yaml_updater import RequirementsYamlUpdater
+from src.progress import ProgressReporter
+# RequirementsYamlUpdater is imported in main, so that printing help
+# and reporting argument errors do not pay for importing it.
 
 # Constants
 PWD = os.getcwd()
-REQUIREMENTS_YAML_FILE_PATH = os.path.join(PWD, REQUIREMENTS_YAML_FILE)
+# Part of the --deadline budget kept for writing the results (at most, in seconds).
+DEADLINE_WRITE_RESERVE = 1.0
+# Options other than branch and deep search, with their default values.
+DEFAULT_OPTIONS = {
+    # If True, progress is not displayed.
+    "quiet" : False,
+    # Path of the yaml file listing the files to be updated in batch mode.
+    "targets" : None,
+    # If True, slow GET requests are hedged.
+    "hedge" : False,
+    # Time budget of the run in seconds (None for no deadline).
+    "deadline" : None,
+    # If True, the HTTP/2 transport is used (when available).
+    "http2" : False,
+    # Number of items per page of the gitlab listings
+    # (None for the tuned page size of each host, or DEFAULT_PER_PAGE).
+    "per_page" : None,
+    # If True, the memory used by each stage is measured (tracemalloc) and reported.
+    "memprofile" : False,
+    # Memory (in MB) that the crawled tags may use before they are
+    # spilled to disk (None for no budget).
+    "memory_budget" : None,
+    # Path of the cassette file to record the requests to.
+    "record" : None,
+    # Path of the cassette file to replay the requests from (offline mode).
+    "replay" : None,
+    # If True, replayed responses are delayed by their recorded latency.
+    "replay_realtime" : False,
+    # Path of the snapshot file to export the crawled state to.
+    "to_snapshot" : None,
+    # Path of the snapshot file to update the tags from (offline mode).
+    "from_snapshot" : None,
+    # If True, the result of a previous deep search with the same inputs is reused.
+    "cache" : True,
+    # If True, the helm projects are discovered from their merge requests.
+    "mr_discovery" : False,
+    # Number of worker processes of the tag crawl (None for 1).
+    "workers" : None,
+    # Path of the file with the groups of the helm projects (see src.sources).
+    "sources" : None,
+    # If True, a deep search fetches only the pages of the tags dated
+    # around the last commit of the branch.
+    "seek" : False,
+    # If True, the crawl is recorded to a journal and an interrupted crawl continues from it.
+    "resume" : False,
+    # If True, the request settings of each host are loaded from the
+    # tuning profile (see autotune).
+    "tuning" : True
+}
 
 def print_help():
     """Prints help message."""
@@ -35,19 +90,85 @@ def print_help():
     -d, --deep <bool: True/False>       : (optional) 
                                             - [True / 1]  --> All tags of each helm project will be
                                                                 fetched.
-                                            - [False / 0] --> (default) Only the last 50 tags of each
-                                                                helm project will be fetched.
+                                            - [False / 0] --> (default) Only the last page of tags
+                                                                (see --per-page) of each helm project
+                                                                will be fetched.
+    -q, --quiet                         : (optional) Do not display progress.
+    --deadline <float: seconds>         : (optional) Time budget of the run. Request timeouts
+                                                        shrink as the budget is spent; when it
+                                                        runs out, the projects not crawled yet
+                                                        are reported and the file is still written.
+    --http2                             : (optional) Use the HTTP/2 transport (requires httpx
+                                                        and h2), falls back to HTTP/1.1.
+    --per-page <int: 1-100>             : (optional) Number of items per page of the gitlab
+                                                        listings (default is the tuned page
+                                                        size of the host, or 100).
+    --memprofile                        : (optional) Report the memory used by each stage
+                                                        and its top allocation sites.
+    --memory-budget <float: MB>         : (optional) Memory the crawled tags may use; beyond it
+                                                        they are spilled to a temporary file.
+    --hedge                             : (optional) Send a duplicate of the requests that are
+                                                        slower than 95% of the requests of their
+                                                        endpoint, and use the first response.
+    -t, --targets <string: file>        : (optional) Batch mode: update every file listed in a
+                                                        yaml file (project, path and filename of
+                                                        each requirements.yaml / Chart.yaml) with
+                                                        a single crawl of the helm tags.
+    --to-snapshot <string: file>        : (optional) Export the crawled state (branch info,
+                                                        requirements.yaml and helm tags) to a
+                                                        gzip-compressed snapshot file.
+    --from-snapshot <string: file>      : (optional) Update the tags offline, using the state
+                                                        of a snapshot file instead of gitlab.
+    --record <string: file>             : (optional) Record every request, with its response
+                                                        and timing, to a cassette file.
+    --replay <string: file>             : (optional) Serve the requests from a cassette file
+                                                        instead of gitlab (at full speed).
+    --replay-realtime                   : (optional) With --replay, delay each response by its
+                                                        recorded latency.
+    --no-cache                          : (optional) Do not reuse the result of a previous deep
+                                                        search with the same branch, file
+                                                        and tags.
+    --mr-discovery                      : (optional) Crawl only the tags of the helm projects
+                                                        with a merge request for the branch.
+    --workers <int>                     : (optional) Crawl the tags with this many worker
+                                                        processes (default is 1).
+    --sources <string: file>            : (optional) Crawl the helm projects of the groups
+                                                        (of both gitlab instances) listed in
+                                                        a yaml file, concurrently.
+    --seek                              : (optional) With -d True, fetch only the pages of the
+                                                        tags dated around the last commit of
+                                                        the branch.
+    --resume                            : (optional) Record the crawl to a journal and
+                                                        continue an interrupted crawl from
+                                                        it (if the branch and the options
+                                                        are the same).
+    --no-tuning                         : (optional) Do not load the request settings of the
+                                                        hosts found by autotune.
         """
     print(msg)
 
 def parse_arguments(argv):
-    """Parses the provided arguments."""
+    """Parses the provided arguments.
+
+    Returns:
+        arg_branch(string): The target branch (None if not specified).
+        arg_deep(boolean): The deep search flag.
+        arg_options(dict): The rest of the options (see DEFAULT_OPTIONS).
+    """
     arg_branch = None
     arg_deep = False
+    arg_options = dict(DEFAULT_OPTIONS)
     #arg_help = "{0} -b <branch name> -d <deep-search>".format(argv[0]) 
 
     try:
-        opts, _ = getopt.getopt(argv[1:], "h:b:d:", ["help", "branch=", "deep="])
+        opts, _ = getopt.getopt(argv[1:], "hb:d:qt:", ["help", "branch=", "deep=", "quiet",
+                                                       "targets=", "hedge", "deadline=", "http2",
+                                                       "per-page=", "memprofile", "memory-budget=",
+                                                       "to-snapshot=", "from-snapshot=",
+                                                       "record=", "replay=", "replay-realtime",
+                                                       "no-cache", "mr-discovery", "workers=",
+                                                       "sources=", "seek", "resume",
+                                                       "no-tuning"])
     except Exception:
         print_help()
         sys.exit(1)
@@ -68,8 +189,82 @@ def parse_arguments(argv):
             if arg.capitalize() in ("True", "1"):
                 arg_deep = True
                 # default is False
+        elif opt in ["-q", "--quiet"]:
+            arg_options["quiet"] = True
+        elif opt == "--hedge":
+            arg_options["hedge"] = True
+        elif opt == "--http2":
+            arg_options["http2"] = True
+        elif opt == "--per-page":
+            if (not arg.isdigit()) or not 1 <= int(arg) <= MAX_PER_PAGE:
+                print_help()
+                sys.exit(1)
+            arg_options["per_page"] = int(arg)
+        elif opt == "--memprofile":
+            arg_options["memprofile"] = True
+        elif opt == "--memory-budget":
+            try:
+                arg_options["memory_budget"] = float(arg)
+            except ValueError:
+                print_help()
+                sys.exit(1)
+            if arg_options["memory_budget"] <= 0:
+                print_help()
+                sys.exit(1)
+        elif opt == "--deadline":
+            try:
+                arg_options["deadline"] = float(arg)
+            except ValueError:
+                print_help()
+                sys.exit(1)
+            if arg_options["deadline"] <= 0:
+                print_help()
+                sys.exit(1)
+        elif opt in ["-t", "--targets"]:
+            arg_options["targets"] = arg
+        elif opt == "--to-snapshot":
+            arg_options["to_snapshot"] = arg
+        elif opt == "--from-snapshot":
+            arg_options["from_snapshot"] = arg
+        elif opt == "--record":
+            arg_options["record"] = arg
+        elif opt == "--replay":
+            arg_options["replay"] = arg
+        elif opt == "--replay-realtime":
+            arg_options["replay_realtime"] = True
+        elif opt == "--no-cache":
+            arg_options["cache"] = False
+        elif opt == "--mr-discovery":
+            arg_options["mr_discovery"] = True
+        elif opt == "--workers":
+            if (not arg.isdigit()) or int(arg) < 1:
+                print_help()
+                sys.exit(1)
+            arg_options["workers"] = int(arg)
+        elif opt == "--sources":
+            arg_options["sources"] = arg
+        elif opt == "--seek":
+            arg_options["seek"] = True
+        elif opt == "--resume":
+            arg_options["resume"] = True
+        elif opt == "--no-tuning":
+            arg_options["tuning"] = False
+
+    if arg_options["to_snapshot"] and arg_options["from_snapshot"]:
+        print_help()
+        sys.exit(1)
+    if arg_options["targets"] and (arg_options["to_snapshot"] or arg_options["from_snapshot"]):
+        print_help()
+        sys.exit(1)
+    if (arg_options["record"] or arg_options["replay"]) and arg_options["from_snapshot"]:
+        print_help()
+        sys.exit(1)
+    if (arg_options["record"] and arg_options["replay"]) or \
+       (arg_options["replay_realtime"] and not arg_options["replay"]):
+        print_help()
+        sys.exit(1)
 
-    return arg_branch, arg_deep
+    return arg_branch, arg_deep, arg_options
 
 def setup():
     """Removes files created from previous execution."""
@@ -81,31 +276,33 @@ def setup():
         if os.path.exists(_file):
             os.remove(_file)
 
-def success():
+def success(file_name = REQUIREMENTS_YAML_FILE):
     """Prints the location of the updated file."""
 
     msg = "\nSUCCESS\n" +\
-        f"{REQUIREMENTS_YAML_FILE} updated successfully.\n" +\
+        f"{file_name} updated successfully.\n" +\
         "Move the file to your local kubernetes repository and\n" +\
         "commit your changes to gitlab.\n" +\
-        f"File location: {REQUIREMENTS_YAML_FILE_PATH}\n"
+        f"File location: {os.path.join(PWD, file_name)}\n"
 
     print(msg)
     write_text_to_file(msg, EXECUTION_LOG_FILE, mode = "a")
 
-def partial_failure(failed):
+def partial_failure(failed, file_name = REQUIREMENTS_YAML_FILE):
     """Prints the location of the updated file and
     the helm projects whose tag could not be updated.
     """
 
     msg = "\nPARTIAL FAILURE\n" +\
-        "Some tags could not be updated.\n" +\
+        f"Some tags of {file_name} could not be updated.\n" +\
         "Projects affected:\n" +\
         json.dumps(failed, indent=2) +\
         "\n\nYou have to update these tags manually.\n" +\
         "Then, move the file to your local kubernetes repository and\n" +\
         "commit your changes to gitlab.\n" +\
-        f"File location: {REQUIREMENTS_YAML_FILE_PATH}\n"
+        f"File location: {os.path.join(PWD, file_name)}\n"
+    if os.path.exists(CRAWL_JOURNAL_FILE):
+        msg += "Run again with --resume to retry only the failed projects.\n"
 
     print(msg)
     write_text_to_file(msg, EXECUTION_LOG_FILE, mode = "a")
@@ -117,12 +314,14 @@ def failure(exception):
     msg = "\nFAILURE\n" +\
         f"Reason: \n{exception}\n" +\
         f"See {ERROR_LOG_FILE} for more info.\n"
+    if os.path.exists(CRAWL_JOURNAL_FILE):
+        msg += "The crawl was interrupted, run again with --resume to continue it.\n"
 
     print(msg)
     write_text_to_file(msg, EXECUTION_LOG_FILE, mode = "a")
     write_text_to_file(msg, ERROR_LOG_FILE, mode = "a")
 
-def main(branch, deep_search):
+def main(branch, deep_search, options = None):
     """Main function.
     
     Initializes RequirementsYamlUpdater and updates the tags.
@@ -130,24 +329,103 @@ def main(branch, deep_search):
     Args:
         branch(string): The target branch in /tas/kubernetes
         deep_search(boolean):
+        options(dict): The rest of the options (see DEFAULT_OPTIONS).
     """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+
+    profiler = None
+    if options["memprofile"]:
+        from src.memory_profile import MemoryProfiler
+        profiler = MemoryProfiler()
+
+    deadline = None
+    if options["deadline"]:
+        from src.deadline import Deadline
+        # Keep some of the budget for writing the results.
+        reserve = min(DEADLINE_WRITE_RESERVE, options["deadline"] / 10)
+        deadline = Deadline(options["deadline"]).reserve(reserve)
+
+    from src.requirements_yaml_updater import RequirementsYamlUpdater
 
     # Initialize RequirementsYamlUpdater
-    yaml_updater = RequirementsYamlUpdater()
+    progress = ProgressReporter(quiet = options["quiet"])
+    hedger = None
+    if options["hedge"]:
+        from src.hedging import RequestHedger
+        hedger = RequestHedger()
+
+    try:
+        cassette = open_cassette(options)
+    except CassetteException as exc:
+        failure(str(exc))
+        return
+
+    try:
+        sources = open_sources(options)
+    except SourcesFileException as exc:
+        failure(str(exc))
+        return
+
+    if options["targets"]:
+        batch_main(branch, deep_search, options, progress, hedger, deadline, profiler, cassette,
+                   sources)
+        return
+
+    yaml_updater = RequirementsYamlUpdater(progress)
+    yaml_updater.hedger = hedger
+    yaml_updater.deadline = deadline
+    yaml_updater.http2 = options["http2"]
+    yaml_updater.per_page = options["per_page"]
+    yaml_updater.memory_budget = get_memory_budget_bytes(options)
+    yaml_updater.cassette = cassette
+    yaml_updater.mr_discovery = options["mr_discovery"]
+    yaml_updater.workers = options["workers"]
+    yaml_updater.seek = options["seek"]
+    yaml_updater.resume = options["resume"]
+    yaml_updater.tuning = open_tuning_profile(options)
+    if sources is not None:
+        yaml_updater.sources, yaml_updater.concurrency = sources
+    yaml_updater.result_cache = open_result_cache(options, deep_search)
     yaml_updater.target_branch = branch
+    if (branch is None) and not options["from_snapshot"]:
+        # Crawl the tags while the user is prompted for the branch.
+        yaml_updater.start_speculative_crawl(deep_search)
 
     try:
-        # Get target branch
-        yaml_updater.get_branch()
-        # Fetch requirements.yaml file from gitlab
-        yaml_updater.fetch_requirements_file()
-        # Find which tags have changed
-        helm_projects_with_changed_tag = yaml_updater.get_changed_tags(deep_search)
-        # Update tags with the new ones
-        updated_yaml_object = yaml_updater.update_helm_tags(helm_projects_with_changed_tag)
-        # Write changes to requirements.yaml
-        yaml_updater.write_yaml_to_file(updated_yaml_object)
+        if options["from_snapshot"]:
+            # Offline mode: branch, requirements.yaml and tags come from the snapshot.
+            with memory_stage(profiler, "load snapshot"):
+                deep_search = yaml_updater.load_snapshot(options["from_snapshot"])
+        else:
+            # Get target branch
+            with memory_stage(profiler, "get branch"):
+                yaml_updater.get_branch()
+            # Fetch requirements.yaml file from gitlab
+            with memory_stage(profiler, "fetch requirements"):
+                yaml_updater.fetch_requirements_file()
+        # Reuse the result of a previous run with the same inputs
+        with memory_stage(profiler, "result cache"):
+            cache_hit = yaml_updater.load_cached_result(deep_search)
+        if not cache_hit:
+            # Find which tags have changed
+            with memory_stage(profiler, "crawl tags"):
+                helm_projects_with_changed_tag = yaml_updater.get_changed_tags(deep_search)
+            if options["to_snapshot"]:
+                with memory_stage(profiler, "export snapshot"):
+                    yaml_updater.export_snapshot(options["to_snapshot"], deep_search)
+            # Update tags with the new ones
+            with memory_stage(profiler, "update tags"):
+                updated_yaml_object = yaml_updater.update_helm_tags(helm_projects_with_changed_tag)
+            # Write changes to requirements.yaml
+            with memory_stage(profiler, "write file"):
+                yaml_updater.write_yaml_to_file(updated_yaml_object)
+            yaml_updater.store_cached_result()
 
+        progress.finish()
+        report_transfer(progress)
+        report_hedging(hedger)
+        report_shards(yaml_updater.shard_timings, progress)
+        report_memory(profiler)
         failed = yaml_updater.failed_update
 
         if not failed:
@@ -159,9 +437,178 @@ def main(branch, deep_search):
         failure("Execution terminated by user.")
     except (FetchInfoFailedException, Exception) as exc:
         failure(str(exc))
+    finally:
+        if cassette is not None:
+            cassette.close()
+        if profiler is not None:
+            profiler.stop()
+
+def open_cassette(options):
+    """Opens the cassette of --record or --replay.
+
+    Returns:
+        (CassetteRecorder or CassettePlayer): The cassette (None if neither option is set).
+
+    Raises:
+        CassetteException: If the cassette file cannot be created or read.
+    """
+    if options["record"]:
+        from src.cassette import CassetteRecorder
+        return CassetteRecorder(options["record"])
+    if options["replay"]:
+        from src.cassette import CassettePlayer
+        return CassettePlayer(options["replay"], options["replay_realtime"])
+    return None
+
+def report_transfer(progress):
+    """Prints (unless quiet) and logs the bytes received and saved by compression."""
+    if progress.requests == 0:
+        return
+    msg = progress.transfer_summary() + "\n"
+    if not progress.quiet:
+        print(msg)
+    write_text_to_file(msg, EXECUTION_LOG_FILE, mode = "a")
+
+def open_sources(options):
+    """Loads the sources file of --sources.
+
+    Returns:
+        (tuple): The sources and the concurrency (see src.sources.load_sources),
+                 None if --sources is not set.
+
+    Raises:
+        SourcesFileException: If the sources file is not valid.
+    """
+    if not options["sources"]:
+        return None
+    from src.sources import load_sources
+    return load_sources(options["sources"])
+
+def open_result_cache(options, deep_search):
+    """Opens the result cache, unless --no-cache is set or the run is not
+    a plain online deep search (snapshots and replays always crawl).
+
+    The key of the cache costs one request per referenced helm project (see
+    get_result_cache_key), as many as the crawl of a shallow search, so the
+    cache only pays off for deep searches.
+
+    Returns:
+        (ResultCache): The result cache (None if it is disabled).
+    """
+    if (not options["cache"]) or (not deep_search) or options["to_snapshot"] or \
+       options["from_snapshot"] or options["replay"]:
+        return None
+    from src.result_cache import ResultCache
+    return ResultCache()
+
+def open_tuning_profile(options):
+    """Loads the request settings of each host from the tuning profile (see
+    autotune), unless --no-tuning is set or requests are recorded or replayed
+    (the requests of a cassette must not depend on the profile).
+
+    Returns:
+        (dict): The settings of each host (empty if there are none).
+    """
+    if (not options["tuning"]) or options["record"] or options["replay"] or \
+       options["from_snapshot"]:
+        return {}
+    from src.tuning import load_profile
+    return load_profile()
+
+def get_memory_budget_bytes(options):
+    """Returns the --memory-budget option in bytes (None if it is not set)."""
+    if options["memory_budget"] is None:
+        return None
+    return int(options["memory_budget"] * 2**20)
+
+def memory_stage(profiler, name):
+    """Returns a context manager measuring the memory used by a stage
+    (it does nothing if profiler is None)."""
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name)
+
+def report_memory(profiler):
+    """Prints and logs the memory profile (if --memprofile was set)."""
+    if profiler is None:
+        return
+    msg = profiler.report() + "\n"
+    print(msg)
+    write_text_to_file(msg, EXECUTION_LOG_FILE, mode = "a")
+
+def report_hedging(hedger):
+    """Prints and logs the hedging metrics (if hedging was enabled)."""
+    if hedger is None:
+        return
+    msg = hedger.summary() + "\n"
+    print(msg)
+    write_text_to_file(msg, EXECUTION_LOG_FILE, mode = "a")
+
+def report_shards(shard_timings, progress):
+    """Prints (unless quiet) the timings of the shards of a sharded crawl
+    (they are logged by the crawl)."""
+    if (shard_timings is None) or progress.quiet:
+        return
+    from src.sharded_crawl import shard_timings_summary
+    print(shard_timings_summary(shard_timings) + "\n")
+
+def batch_main(branch, deep_search, options, progress, hedger = None, deadline = None,
+               profiler = None, cassette = None, sources = None):
+    """Updates every file listed in the targets file (options["targets"])
+    with a single crawl and reports the outcome of each file separately.
+
+    Args:
+        branch(string): The target branch in /tas/kubernetes
+        deep_search(boolean):
+        options(dict): The rest of the options (see DEFAULT_OPTIONS).
+        progress(ProgressReporter): The progress reporter of the run.
+        hedger(RequestHedger): The request hedger of the run (None to disable hedging).
+        deadline(Deadline): The deadline of the requests (None for no deadline).
+        profiler(MemoryProfiler): The memory profiler of the run (None to disable profiling).
+        cassette(CassetteRecorder or CassettePlayer): Records or replays the requests
+                                                      (None to disable).
+        sources(tuple): The sources and the concurrency of --sources (None for the default).
+    """
+    from src.batch_updater import BatchYamlUpdater, load_targets
+
+    sources_list, concurrency = sources or (None, None)
+
+    try:
+        batch_updater = BatchYamlUpdater(load_targets(options["targets"]), progress, hedger,
+                                         deadline, options["http2"], options["per_page"],
+                                         get_memory_budget_bytes(options), cassette,
+                                         options["mr_discovery"], options["workers"],
+                                         sources_list, concurrency,
+                                         options["seek"], options["resume"],
+                                         open_tuning_profile(options))
+        with memory_stage(profiler, "batch update"):
+            results = batch_updater.update(branch, deep_search)
+        progress.finish()
+        report_transfer(progress)
+        report_hedging(hedger)
+        report_shards(batch_updater.main_updater.shard_timings, progress)
+        report_memory(profiler)
+
+        for result in results:
+            if result["error"] is not None:
+                failure(f"{result['file']}: {result['error']}")
+            elif not result["failed"]:
+                success(result["file"])
+            else:
+                partial_failure(result["failed"], result["file"])
+
+    except KeyboardInterrupt:
+        failure("Execution terminated by user.")
+    except (FetchInfoFailedException, Exception) as exc:
+        failure(str(exc))
+    finally:
+        if cassette is not None:
+            cassette.close()
+        if profiler is not None:
+            profiler.stop()
 
 if __name__ == "__main__":
-    branch, deep_search = parse_arguments(sys.argv)
+    branch, deep_search, options = parse_arguments(sys.argv)
     # Remove remaining files from previous executions
     setup()
-    main(branch, deep_search)
+    main(branch, deep_search, options)
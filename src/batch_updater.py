@@ -0,0 +1,228 @@
+"""Batch updater for several umbrella charts."""
+
+# Python Libraries
+from concurrent.futures import ThreadPoolExecutor
+from inspect import stack
+
+# Program Libraries
+from src.constants import EXECUTION_LOG_FILE
+from src.exceptions import TargetsFileException
+from src.requirements_yaml_updater import LISTING_FAILURE, RequirementsYamlUpdater
+from src.utils import write_text_to_file
+
+# Maximum number of files downloaded concurrently.
+MAX_DOWNLOAD_WORKERS = 8
+
+
+def load_targets(path):
+    """Loads the list of files to be updated from a yaml (or json) file.
+
+    Each target is a dictionary containing:
+        - "project" : The project of the file, e.g. "/tas/kubernetes",
+        - "path" : The path of the file in the project, e.g. "/helm/nokia-tas",
+        - "filename" : "requirements.yaml" or "Chart.yaml" (Helm v3),
+        - "output" : (optional) The name of the local file to be written.
+
+    Args:
+        path(string): The path of the targets file.
+
+    Returns:
+        (list): The list of targets.
+
+    Raises:
+        TargetsFileException: If the file cannot be read or is not valid.
+    """
+    import yaml
+
+    try:
+        with open(path, "r", encoding = "utf-8") as targets_stream:
+            targets = yaml.safe_load(targets_stream)
+    except (OSError, yaml.YAMLError) as exc:
+        raise TargetsFileException(stack()[0], path, str(exc)) from exc
+
+    if not isinstance(targets, list) or len(targets) == 0:
+        raise TargetsFileException(stack()[0], path, "Expected a non-empty list of targets.")
+
+    for target in targets:
+        if not isinstance(target, dict) or \
+           any(key not in target for key in ("project", "path", "filename")):
+            msg = f"Target {target} must contain \"project\", \"path\" and \"filename\"."
+            raise TargetsFileException(stack()[0], path, msg)
+
+    return targets
+
+def get_output_filename(target):
+    """Returns the name of the local file for a target, e.g.
+    "tas_kubernetes_helm_nokia-tas_requirements.yaml" for
+    /tas/kubernetes/helm/nokia-tas/requirements.yaml.
+
+    Args:
+        target(dict): The target (see load_targets).
+
+    Returns:
+        (string): The name of the local file.
+    """
+    if target.get("output"):
+        return target["output"]
+
+    prefix = (target["project"] + "/" + target["path"]).strip("/")
+    prefix = "_".join(part for part in prefix.split("/") if part)
+    return f"{prefix}_{target['filename']}"
+
+
+class BatchYamlUpdater():
+    """The BatchYamlUpdater is responsible for updating several requirements.yaml
+    (or Chart.yaml) files with a single crawl of the helm tags.
+    """
+
+    def __init__(self, targets, progress = None, hedger = None, deadline = None, http2 = False,
+                 per_page = None, memory_budget = None, cassette = None,
+                 mr_discovery = False, workers = None, sources = None,
+                 concurrency = None, seek = False, resume = False, tuning = None):
+        """Instantiates a BatchYamlUpdater object.
+
+        Args:
+            targets(list): The files to be updated (see load_targets).
+            progress(ProgressReporter): The progress reporter of the run.
+            hedger(RequestHedger): The request hedger of the run (None to disable hedging).
+            deadline(Deadline): The deadline of the requests (None for no deadline).
+            http2(boolean): If True, the HTTP/2 transport is used (when available).
+            per_page(int): The number of items per page of the listings (None for
+                           the tuned page size of each host).
+            memory_budget(int): The memory (in bytes) that the crawled tags may use
+                                before they are spilled to disk (None for no budget).
+            cassette(CassetteRecorder or CassettePlayer): Records or replays the
+                                                          requests (None to disable).
+            mr_discovery(boolean): If True, the helm projects are discovered from
+                                   their merge requests (see discover_helm_projects).
+            workers(int): The number of worker processes of the tag crawl (None for 1).
+            sources(list): The groups of the helm projects (see src.sources,
+                           None for the default ones).
+            concurrency(int): The number of requests in flight at once (None for no limit).
+            seek(boolean): If True, a deep search fetches only the pages of the tags
+                           dated around the last commit of the branch.
+            resume(boolean): If True, the crawl is recorded to a journal and an
+                             interrupted crawl continues from it.
+            tuning(dict): The request settings of each host (see src.tuning).
+        """
+        # The main updater verifies the branch and crawls the tags,
+        # the updater of each target shares them.
+        self.main_updater = RequirementsYamlUpdater(progress)
+        self.main_updater.hedger = hedger
+        self.main_updater.deadline = deadline
+        self.main_updater.http2 = http2
+        self.main_updater.per_page = per_page
+        self.main_updater.memory_budget = memory_budget
+        self.main_updater.cassette = cassette
+        self.main_updater.mr_discovery = mr_discovery
+        self.main_updater.workers = workers
+        self.main_updater.sources = sources or self.main_updater.sources
+        self.main_updater.concurrency = concurrency
+        self.main_updater.seek = seek
+        self.main_updater.resume = resume
+        self.main_updater.tuning = tuning or {}
+        self.updaters = []
+        for target in targets:
+            self.updaters.append(RequirementsYamlUpdater(self.main_updater.progress,
+                                                         project = target["project"],
+                                                         path = target["path"],
+                                                         filename = target["filename"],
+                                                         output_filename = get_output_filename(target)))
+
+    def update(self, branch, deep_search):
+        """Updates the tags of every target.
+
+        Args:
+            branch(string): The target branch (the user is prompted if None).
+            deep_search(boolean): If true, all tags of the helm projects will be fetched.
+
+        Returns:
+            results(list): A list with a dictionary for each target, containing:
+                            - "file" : The name of the local file,
+                            - "failed" : The helm projects whose tag could not
+                                         be updated,
+                            - "error" : The reason the file could not be updated
+                                        (None on success).
+        """
+        self.main_updater.target_branch = branch
+        if branch is None:
+            # Crawl the tags while the user is prompted for the branch.
+            self.main_updater.start_speculative_crawl(deep_search)
+        self.main_updater.get_branch()
+
+        for updater in self.updaters:
+            updater.share_session(self.main_updater)
+
+        errors = self._fetch_requirements_files()
+
+        # Only the helm projects referenced by at least one target are crawled.
+        required_names = {}
+        required_names_of_target = {}
+        for updater in self.updaters:
+            if updater in errors:
+                continue
+            try:
+                required_names_of_target[updater] = updater.get_required_project_names()
+            except Exception as exc:
+                errors[updater] = str(exc)
+                continue
+            required_names.update(required_names_of_target[updater])
+
+        # One crawl, shared by all targets.
+        self.main_updater.helm_projects_with_tags = \
+            self.main_updater.get_helm_tags(deep_search, required_names)
+
+        results = []
+        for updater in self.updaters:
+            result = {"file" : updater.output_filename, "failed" : {}, "error" : None}
+            results.append(result)
+
+            if updater in errors:
+                result["error"] = errors[updater]
+                continue
+
+            # Each target sees only the helm projects it references (and their failures).
+            updater.helm_projects_with_tags = [
+                helm_project for helm_project in self.main_updater.helm_projects_with_tags
+                if updater.strip_helm_prefix(helm_project["name"]) in \
+                    required_names_of_target[updater]
+            ]
+            updater.crawl_failures = {
+                name : reason for name, reason in self.main_updater.crawl_failures.items()
+                if (name == LISTING_FAILURE) or \
+                    (updater.strip_helm_prefix(name) in required_names_of_target[updater])
+            }
+            try:
+                changed_tags = updater.get_changed_tags(deep_search)
+                yaml_object = updater.update_helm_tags(changed_tags)
+                updater.write_yaml_to_file(yaml_object)
+                result["failed"] = updater.failed_update
+            except Exception as exc:
+                result["error"] = str(exc)
+
+            write_text_to_file(f"Batch target {updater.output_filename}: " +\
+                               ("updated" if result["error"] is None else result["error"]) + "\n",
+                               EXECUTION_LOG_FILE, mode = "a")
+
+        return results
+
+    def _fetch_requirements_files(self):
+        """Downloads the files of all targets concurrently.
+
+        Returns:
+            errors(dict): The reason of the failure for each updater
+                          whose file could not be downloaded.
+        """
+        errors = {}
+        workers = min(MAX_DOWNLOAD_WORKERS, len(self.updaters))
+
+        with ThreadPoolExecutor(max_workers = workers) as executor:
+            futures = {updater : executor.submit(updater.fetch_requirements_file)
+                       for updater in self.updaters}
+            for updater, future in futures.items():
+                try:
+                    future.result()
+                except Exception as exc:
+                    errors[updater] = str(exc)
+
+        return errors
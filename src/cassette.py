@@ -0,0 +1,282 @@
+"""Record/replay of the HTTP traffic of a run.
+
+A cassette is a gzip-compressed JSON Lines file. Each line is a record
+with a "kind" key:
+    - "header"      : format version,
+    - "interaction" : one request with its response (or the error raised
+                      instead), the time it took and when it started.
+
+CassetteRecorder records the traffic of a real run; CassettePlayer serves
+it back, without accessing the network, at full speed or with the
+recorded latencies.
+"""
+
+# Python Libraries
+import base64
+from collections import deque
+from datetime import timedelta
+import gzip
+from inspect import stack
+import json
+import threading
+import time
+
+from requests.adapters import BaseAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import RequestException
+from requests.exceptions import Timeout as RequestsTimeout
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Program Libraries
+from src.constants import EXECUTION_LOG_FILE, NOT_FOUND
+from src.exceptions import CassetteException
+from src.utils import (
+    get_wire_bytes,
+    write_text_to_file
+)
+
+CASSETTE_VERSION = 1
+
+
+class _RecordedBody():
+    """Stands in for the raw (urllib3) response of requests: only the size
+    of the body on the wire is kept."""
+
+    def __init__(self, num_bytes):
+        self.num_bytes = num_bytes
+
+    def tell(self):
+        """Returns the number of bytes received on the wire."""
+        return self.num_bytes
+
+    def close(self):
+        """Nothing to close."""
+
+
+class CassetteRecorder():
+    """The CassetteRecorder class records every request of the sessions
+    it is attached to (with its response and timing) to a cassette file.
+    """
+
+    def __init__(self, path):
+        """Instantiates a CassetteRecorder object and creates the cassette file.
+
+        Args:
+            path(string): The path of the cassette file.
+
+        Raises:
+            CassetteException: If the file cannot be created.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._start_time = time.monotonic()
+        try:
+            self._fstream = gzip.open(path, "wt", encoding = "utf-8")
+        except OSError as exc:
+            raise CassetteException(stack()[0], path, str(exc)) from exc
+        self._write_record({"kind" : "header", "version" : CASSETTE_VERSION})
+
+    def attach(self, session):
+        """Records the requests of a session, sent with its current transport
+        adapters (call it after enable_http2).
+
+        Args:
+            session(requests.Session): The session to be recorded.
+        """
+        for prefix in ("https://", "http://"):
+            session.mount(prefix, _RecordingAdapter(self, session.adapters[prefix]))
+
+    def record(self, request, started, elapsed, response = None, error = None):
+        """Records an interaction.
+
+        Args:
+            request(requests.PreparedRequest): The request.
+            started(float): When the request was sent (time.monotonic()).
+            elapsed(float): The time (in seconds) until the response was received.
+            response(requests.models.Response object): The response
+                                                       (None if an error was raised).
+            error(Exception): The error raised instead of a response.
+        """
+        record = {
+            "kind" : "interaction",
+            "method" : request.method,
+            "url" : request.url,
+            "offset" : round(started - self._start_time, 6),
+            "elapsed" : round(elapsed, 6)
+        }
+        if response is not None:
+            body, body_encoding = _encode_body(response.content)
+            record["status"] = response.status_code
+            record["reason"] = response.reason
+            record["headers"] = dict(response.headers)
+            record["body"] = body
+            record["body_encoding"] = body_encoding
+            record["wire_bytes"] = get_wire_bytes(response)
+        else:
+            record["error"] = "timeout" if isinstance(error, RequestsTimeout) else "connection"
+            record["message"] = str(error)
+
+        with self._lock:
+            self._write_record(record)
+
+    def close(self):
+        """Closes the cassette file."""
+        with self._lock:
+            self._fstream.close()
+
+    def _write_record(self, record):
+        """Writes a record as a single compact JSON line."""
+        self._fstream.write(json.dumps(record, separators = (",", ":")) + "\n")
+
+
+class CassettePlayer():
+    """The CassettePlayer class serves the requests of the sessions it is
+    attached to from a cassette file, without accessing the network.
+
+    The recorded interactions of each (method, url) are served in the recorded
+    order (the last one is repeated if there are more requests than recorded).
+    A request that was not recorded gets a 404 response.
+    """
+
+    def __init__(self, path, realtime = False):
+        """Instantiates a CassettePlayer object and loads the cassette file.
+
+        Args:
+            path(string): The path of the cassette file.
+            realtime(boolean): If True, each response is delayed by its recorded latency.
+
+        Raises:
+            CassetteException: If the file cannot be read or is not a valid cassette.
+        """
+        self.path = path
+        self.realtime = realtime
+        self._lock = threading.Lock()
+        self._interactions = {}
+
+        try:
+            with gzip.open(path, "rt", encoding = "utf-8") as fstream:
+                for line in fstream:
+                    record = json.loads(line)
+                    if record["kind"] == "header":
+                        if record["version"] != CASSETTE_VERSION:
+                            msg = f"Unsupported cassette version {record['version']}."
+                            raise CassetteException(stack()[0], path, msg)
+                    elif record["kind"] == "interaction":
+                        key = (record["method"], record["url"])
+                        self._interactions.setdefault(key, deque()).append(record)
+        except (OSError, EOFError, ValueError, KeyError) as exc:
+            raise CassetteException(stack()[0], path, str(exc)) from exc
+
+    def attach(self, session):
+        """Serves the requests of a session from the cassette.
+
+        Args:
+            session(requests.Session): The session.
+        """
+        adapter = _ReplayAdapter(self)
+        for prefix in ("https://", "http://"):
+            session.mount(prefix, adapter)
+
+    def next_interaction(self, method, url):
+        """Returns the next recorded interaction of a request (None if it was not recorded)."""
+        with self._lock:
+            interactions = self._interactions.get((method, url))
+            if not interactions:
+                return None
+            if len(interactions) > 1:
+                return interactions.popleft()
+            return interactions[0]
+
+    def close(self):
+        """Nothing to close, the cassette is loaded in memory."""
+
+
+class _RecordingAdapter(BaseAdapter):
+    """Sends the requests with an other adapter and records them."""
+
+    def __init__(self, recorder, adapter):
+        super().__init__()
+        self.recorder = recorder
+        self.adapter = adapter
+
+    def send(self, request, stream = False, timeout = None, verify = True, cert = None,
+             proxies = None):
+        started = time.monotonic()
+        try:
+            response = self.adapter.send(request, stream = stream, timeout = timeout,
+                                         verify = verify, cert = cert, proxies = proxies)
+            # The body is read here, so that elapsed includes its download.
+            _ = response.content
+        except RequestException as exc:
+            self.recorder.record(request, started, time.monotonic() - started, error = exc)
+            raise
+        self.recorder.record(request, started, time.monotonic() - started, response = response)
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+
+class _ReplayAdapter(BaseAdapter):
+    """Serves the requests from a CassettePlayer."""
+
+    def __init__(self, player):
+        super().__init__()
+        self.player = player
+
+    def send(self, request, stream = False, timeout = None, verify = True, cert = None,
+             proxies = None):
+        record = self.player.next_interaction(request.method, request.url)
+        if record is None:
+            write_text_to_file(f"Not in cassette: {request.method} {request.url}\n",
+                               EXECUTION_LOG_FILE, mode = "a")
+            return _build_response(request, {"status" : NOT_FOUND, "reason" : "Not Recorded",
+                                             "headers" : {}, "body" : "", "elapsed" : 0})
+
+        if self.player.realtime:
+            read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+            if (read_timeout is not None) and (record["elapsed"] > read_timeout):
+                time.sleep(read_timeout)
+                raise RequestsTimeout(f"Recorded response took {record['elapsed']:.3f}s",
+                                      request = request)
+            time.sleep(record["elapsed"])
+
+        if "error" in record:
+            error = RequestsTimeout if record["error"] == "timeout" else RequestsConnectionError
+            raise error(record["message"], request = request)
+
+        return _build_response(request, record)
+
+    def close(self):
+        pass
+
+
+def _build_response(request, record):
+    """Builds a requests Response from a recorded interaction."""
+    response = Response()
+    response.status_code = record["status"]
+    response.reason = record["reason"]
+    response.headers = CaseInsensitiveDict(record["headers"])
+    response._content = _decode_body(record["body"], record.get("body_encoding", "utf-8"))
+    response._content_consumed = True
+    response.raw = _RecordedBody(record.get("wire_bytes", len(response._content)))
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.elapsed = timedelta(seconds = record["elapsed"])
+    return response
+
+def _encode_body(content):
+    """Returns a body as text: as is if it is UTF-8, base64-encoded otherwise."""
+    try:
+        return content.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError:
+        return base64.b64encode(content).decode("ascii"), "base64"
+
+def _decode_body(body, body_encoding):
+    """Reverses _encode_body."""
+    if body_encoding == "base64":
+        return base64.b64decode(body)
+    return body.encode("utf-8")
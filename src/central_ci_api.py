@@ -6,7 +6,9 @@ from src.constants import (
     CCI_PROJECT_SEARCH_BY_NAME_URI,
     CCI_PROJECTS_URI,
     CCI_TAGS_URI,
-    CCI_BRANCHES_URI
+    CCI_BRANCHES_URI,
+    CCI_PROJECT_URI,
+    CCI_MERGE_REQUESTS_URI
 )
 from src.gitlab_api import GitlabAPI
 
@@ -22,3 +24,5 @@ class CentralCIAPI(GitlabAPI):
     projects_uri = CCI_PROJECTS_URI
     project_tags_uri = CCI_TAGS_URI
     branches_uri = CCI_BRANCHES_URI
+    project_uri = CCI_PROJECT_URI
+    merge_requests_uri = CCI_MERGE_REQUESTS_URI
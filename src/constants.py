@@ -10,16 +10,26 @@ GITLAB_API_URI_V4  = GITLAB_URI + API_V4
 GITLAB1_API_URI_V4 = GITLAB1_URI + API_V4
 
 # URI Paths
+# Listings are paginated: {{page_number}} and {{per_page}} are set by
+# RequestMaker.recursive_request. Project listings use simple=true, which
+# returns a minimal representation of each project (name and id are enough).
 GROUPS_PATH    = "/groups/{group_name}"
 SUBGROUPS_PATH = "/groups/{group_name}/subgroups" +\
-                    "?page={{page_number}}&per_page=50"
-PROJECT_SEARCH_BY_NAME_PATH = "/groups/{group_id}/projects?search={{project_name}}"
+                    "?page={{page_number}}&per_page={{per_page}}"
+PROJECT_SEARCH_BY_NAME_PATH = "/groups/{group_id}/projects?simple=true&search={{project_name}}"
 PROJECTS_PATH  = "/groups/{group_id}/projects" +\
-                    "?include_subgroups=true&page={{page_number}}&per_page=50"
+                    "?include_subgroups=true&simple=true" +\
+                    "&page={{page_number}}&per_page={{per_page}}"
 TAGS_PATH      = "/projects/{project_id}/repository/tags" +\
-                    "?order_by=updated&page={{page_number}}&per_page=50"
+                    "?order_by=updated&page={{page_number}}&per_page={{per_page}}"
 FILE_PATH      = "/projects/{project_id}/repository/files/{{path_to_file}}"
 BRANCH_PATH    = "/projects/{project_id}/repository/branches"
+PROJECT_PATH   = "/projects/{project_id}"
+# Merge requests of the projects of a group whose title contains {search}
+# (which must be URL-encoded), in the given {state} ("all" for any state).
+MERGE_REQUESTS_PATH = "/groups/{group_id}/merge_requests" +\
+                        "?scope=all&state={state}&in=title&search={search}" +\
+                        "&page={{page_number}}&per_page={{per_page}}"
 
 # Full URIs
 # CCI -> URI for Central CI
@@ -29,6 +39,8 @@ CCI_PROJECT_SEARCH_BY_NAME_URI = GITLAB_API_URI_V4 + PROJECT_SEARCH_BY_NAME_PATH
 CCI_PROJECTS_URI = GITLAB_API_URI_V4 + PROJECTS_PATH
 CCI_TAGS_URI = GITLAB_API_URI_V4 + TAGS_PATH
 CCI_BRANCHES_URI = GITLAB_API_URI_V4 + BRANCH_PATH
+CCI_PROJECT_URI = GITLAB_API_URI_V4 + PROJECT_PATH
+CCI_MERGE_REQUESTS_URI = GITLAB_API_URI_V4 + MERGE_REQUESTS_PATH
 # LCI -> URI for Legacy CI
 LCI_GROUPS_URI = GITLAB1_API_URI_V4 + GROUPS_PATH
 LCI_SUBGROUPS_URI = GITLAB1_API_URI_V4 + SUBGROUPS_PATH
@@ -36,6 +48,8 @@ LCI_PROJECT_SEARCH_BY_NAME_URI = GITLAB1_API_URI_V4 + PROJECT_SEARCH_BY_NAME_PAT
 LCI_PROJECTS_URI = GITLAB1_API_URI_V4 + PROJECTS_PATH
 LCI_TAGS_URI = GITLAB1_API_URI_V4 + TAGS_PATH
 LCI_BRANCHES_URI = GITLAB1_API_URI_V4 + BRANCH_PATH
+LCI_PROJECT_URI = GITLAB1_API_URI_V4 + PROJECT_PATH
+LCI_MERGE_REQUESTS_URI = GITLAB1_API_URI_V4 + MERGE_REQUESTS_PATH
 
 
 # ------------------- HTTP CONSTANTS -------------------
@@ -44,6 +58,23 @@ LCI_BRANCHES_URI = GITLAB1_API_URI_V4 + BRANCH_PATH
 GET  = "GET"
 POST = "POST"
 
+# Page size of the listings (gitlab allows at most 100 items per page)
+DEFAULT_PER_PAGE = 100
+MAX_PER_PAGE = 100
+
+# Request timeout (in seconds) and backoff factor (delay before the first
+# retry, in seconds) of RequestMaker, unless tuned (see src.tuning)
+DEFAULT_TIMEOUT = 10
+DEFAULT_BACKOFF_FACTOR = 0.1
+
+# Window of the dates of the tags fetched by a seeking deep search, around
+# the date of the last commit of the target branch (see seek_request).
+SEEK_DAYS_BEFORE_BRANCH = 180
+SEEK_DAYS_AFTER_BRANCH = 30
+
+# Encodings accepted for the response bodies
+ACCEPT_ENCODING = "gzip, deflate"
+
 # HTTP Status Codes
 OK = 200
 BAD_REQUEST = 400
@@ -62,3 +93,9 @@ EXECUTION_LOG_FILE = "execution.log"
 # Yaml Files
 REQUIREMENTS_YAML_FILE = "requirements.yaml"
 OLD_YAML_FILE = "old.yaml"
+
+# Journal of the tag crawl, kept when the crawl is interrupted (see --resume)
+CRAWL_JOURNAL_FILE = "crawl.journal.jsonl"
+
+# Helm v3 charts declare their dependencies in Chart.yaml
+HELM_V3_CHART_FILE = "Chart.yaml"
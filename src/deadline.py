@@ -0,0 +1,48 @@
+"""End-to-end deadline of a run."""
+
+# Python Libraries
+import time
+
+
+class Deadline():
+    """The Deadline class keeps the remaining time of a run, so that
+    request timeouts shrink as the time budget is spent."""
+
+    def __init__(self, seconds):
+        """Instantiates a Deadline object.
+
+        Args:
+            seconds(float): The time budget (in seconds), starting now.
+        """
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        """Returns the remaining time (in seconds), 0 if the deadline has passed."""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self):
+        """Returns True if the deadline has passed."""
+        return self.remaining() <= 0
+
+    def clamp_timeout(self, timeout):
+        """Returns timeout, shrunk to the remaining time if it is longer.
+
+        Args:
+            timeout(float): The timeout (in seconds) of a request.
+
+        Returns:
+            (float): The timeout to be used.
+        """
+        return min(timeout, self.remaining())
+
+    def reserve(self, seconds):
+        """Returns a new deadline, which expires seconds before this one
+        (e.g. to keep some time for writing the results).
+
+        Args:
+            seconds(float): The time to be kept.
+
+        Returns:
+            (Deadline): The new deadline.
+        """
+        return Deadline(max(self.remaining() - seconds, 0.0))
@@ -63,3 +63,54 @@ class BranchNotFoundException(BaseTracerException):
     def __init__(self, method_name, branch_name, msg):
         exc_msg = f"Branch \"{branch_name}\" not found. Failed due to: {msg}"
         super().__init__("BranchNotFoundException", method_name, exc_msg)
+
+class SnapshotException(BaseTracerException):
+
+    """Exception for the cases a snapshot file could not be read."""
+
+    def __init__(self, method_name, path, msg):
+        exc_msg = f"Snapshot \"{path}\" could not be loaded: {msg}"
+        super().__init__("SnapshotException", method_name, exc_msg)
+
+class TargetsFileException(BaseTracerException):
+
+    """Exception for the cases the file with the batch targets is not valid."""
+
+    def __init__(self, method_name, path, msg):
+        exc_msg = f"Targets file \"{path}\" could not be loaded: {msg}"
+        super().__init__("TargetsFileException", method_name, exc_msg)
+
+class SourcesFileException(BaseTracerException):
+
+    """Exception for the cases the file with the sources of the helm projects is not valid."""
+
+    def __init__(self, method_name, path, msg):
+        exc_msg = f"Sources file \"{path}\" could not be loaded: {msg}"
+        super().__init__("SourcesFileException", method_name, exc_msg)
+
+class CircuitOpenException(RequestFailedException):
+
+    """Exception for the cases a request was not sent because
+    the circuit breaker of the host is open."""
+
+    def __init__(self, method_name, host, uri):
+        exc_msg = f"Request to {uri} was not sent: too many recent failures " +\
+            f"on {host}, circuit breaker is open."
+        BaseTracerException.__init__(self, "CircuitOpenException", method_name, exc_msg)
+
+class DeadlineExceededException(RequestFailedException):
+
+    """Exception for the cases a request was not sent because
+    the deadline of the run has passed."""
+
+    def __init__(self, method_name, uri):
+        exc_msg = f"Request to {uri} was not sent: the deadline of the run has passed."
+        BaseTracerException.__init__(self, "DeadlineExceededException", method_name, exc_msg)
+
+class CassetteException(BaseTracerException):
+
+    """Exception for the cases a cassette file could not be read or written."""
+
+    def __init__(self, method_name, path, msg):
+        exc_msg = f"Cassette \"{path}\" could not be used: {msg}"
+        super().__init__("CassetteException", method_name, exc_msg)
@@ -0,0 +1,46 @@
+"""JSON decoding of response bodies.
+
+The bodies are parsed from bytes (response.content), without decoding them
+to a string first (response.text detects the charset of every response).
+orjson is used if it is installed, json otherwise.
+"""
+
+# Python Libraries
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Bodies of an empty page of a gitlab listing.
+EMPTY_PAGES = (b"", b"[]")
+# Bodies longer than this are not empty pages (allows for whitespace).
+MAX_EMPTY_PAGE_LENGTH = 16
+
+
+def parse_json(content):
+    """Parses a JSON document.
+
+    Args:
+        content(bytes): The document (e.g. response.content), UTF-8 encoded.
+
+    Returns:
+        The parsed document.
+
+    Raises:
+        ValueError: If content is not a valid JSON document.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    # json detects the encoding (UTF-8/16/32) of bytes by itself.
+    return json.loads(content)
+
+def is_empty_page(content):
+    """Returns True if content is the body of an empty page of a listing
+    ("[]" or nothing), without parsing it.
+
+    Args:
+        content(bytes): The body of the response.
+    """
+    return len(content) <= MAX_EMPTY_PAGE_LENGTH and content.strip() in EMPTY_PAGES
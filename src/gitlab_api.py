@@ -1,15 +1,23 @@
 """Gitlab API"""
 
 # Python Libraries
-import json
-import re
 from inspect import stack
+from urllib.parse import quote
 
 # Program Libraries
+from src.constants import EXECUTION_LOG_FILE
 from src.exceptions import (
-    ElementNotFoundException
+    ElementNotFoundException,
+    FetchInfoFailedException
 )
+from src.fast_json import parse_json
 from src.request_maker import RequestMaker
+from src.spill import SpillingList
+from src.utils import (
+    match_tag_with_title,
+    parse_gitlab_datetime,
+    write_text_to_file
+)
 
 class GitlabAPI(RequestMaker):
     """The GitLabAPI class is a subclass of RequestMaker
@@ -20,6 +28,8 @@ class GitlabAPI(RequestMaker):
     project_search_by_name_uri = None
     project_tags_uri = None
     branches_uri = None
+    project_uri = None
+    merge_requests_uri = None
 
     def get_subgroups_of_group(self, group_name):
         """Fetches all the subgroups of a group (from gitlab).
@@ -33,7 +43,7 @@ class GitlabAPI(RequestMaker):
 
         """
         uri = self.subgroups_uri.format(group_name = group_name)
-        json_list = self.recursive_request(uri, spinner_text = "subgroups")
+        json_list = self.recursive_request(uri, progress_text = "subgroups")
         return json_list
 
     def get_projects_of_group(self, group_id):
@@ -51,9 +61,43 @@ class GitlabAPI(RequestMaker):
 
         """
         uri = self.projects_uri.format(group_id = group_id)
-        json_list = self.recursive_request(uri, spinner_text = "projects")
+        json_list = self.recursive_request(uri, progress_text = "projects")
         return json_list
 
+    def get_merge_requests_of_group(self, group_id, search, state = "all"):
+        """Fetches the merge requests of the projects of a group whose
+        title contains search (from gitlab, with a single paginated listing).
+
+        Args:
+            group_id(int): The id of the group (see get_projects_of_group).
+            search(string): The text that the title should contain.
+            state(string): The state of the merge requests ("opened", "closed",
+                           "merged" or "all").
+
+        Returns:
+            json_list(list): A list with dictionaries containing
+                             info about the merge requests.
+
+        """
+        uri = self.merge_requests_uri.format(group_id = group_id, state = state,
+                                             search = quote(search, safe = ""))
+        json_list = self.recursive_request(uri, progress_text = "merge requests")
+        return json_list
+
+    def get_project_from_project_id(self, project_id):
+        """Fetches info about a project from gitlab.
+
+        Args:
+            project_id(integer): Project's id.
+
+        Returns:
+            (dict): A dictionary containing info about the project.
+
+        """
+        uri = self.project_uri.format(project_id = project_id)
+        response = self.make_request_and_report_progress(uri, f"project {project_id}")
+        return parse_json(response.content)
+
     def get_group_id_from_name(self, group_name):
         """Finds the group id from its name.
 
@@ -64,11 +108,33 @@ class GitlabAPI(RequestMaker):
             (int): Group's id.
 
         """
-        uri = self.groups_uri.format(group_name = group_name)
-        response = self.make_request_and_expect_200(uri)
-        group_info = json.loads(response.text)
-        return group_info["id"]
+        def lookup():
+            uri = self.groups_uri.format(group_name = group_name)
+            response = self.make_request_and_expect_200(uri)
+            group_info = parse_json(response.content)
+            return group_info["id"]
+
+        return self.memoized_lookup(("group_id", group_name), lookup)
+
+
+    def get_group_id_from_path(self, group_path):
+        """Finds the id of a group (or subgroup) from its full path,
+        e.g. "ntas" or "ntas/helm".
+
+        Args:
+            group_path(string): The full path of the group.
+
+        Returns:
+            (int): Group's id.
 
+        """
+        names = group_path.strip("/").split("/")
+        if len(names) == 1:
+            return self.get_group_id_from_name(names[0])
+        if len(names) == 2:
+            return self.get_subgroup_id_from_name(names[0], names[1])
+        # Nested subgroups are looked up by their URL-encoded full path.
+        return self.get_group_id_from_name(quote("/".join(names), safe = ""))
 
     def get_subgroup_id_from_name(self, group_name, subgroup_name):
         """Finds the subgroup id from the name of the group it belongs to.
@@ -81,9 +147,11 @@ class GitlabAPI(RequestMaker):
         Returns: Subgroup's id.
 
         """
-        json_list = self.get_subgroups_of_group(group_name)
-        subgroup_id = self._get_id_from_name(json_list, subgroup_name)
-        return subgroup_id
+        def lookup():
+            json_list = self.get_subgroups_of_group(group_name)
+            return self._get_id_from_name(json_list, subgroup_name)
+
+        return self.memoized_lookup(("subgroup_id", group_name, subgroup_name), lookup)
 
     def _get_id_from_name(self, json_list, name):
         """Finds the id of an element from a list with dictionaries.
@@ -116,30 +184,39 @@ class GitlabAPI(RequestMaker):
             ElementNotFoundException: If the specified project is not found.
 
         """
-        group_id = self.get_group_id_from_name(group_name)
+        def lookup():
+            group_id = self.get_group_id_from_name(group_name)
 
-        uri = self.project_search_by_name_uri.format(group_id = group_id)
-        uri = uri.format(project_name = project_name)
+            uri = self.project_search_by_name_uri.format(group_id = group_id)
+            uri = uri.format(project_name = project_name)
 
-        response = self.make_request_and_expect_200(uri)
-        json_list = json.loads(response.text)
+            response = self.make_request_and_expect_200(uri)
+            json_list = parse_json(response.content)
 
-        for element in json_list:
-            if element["name"] == project_name:
-                return element["id"]
+            for element in json_list:
+                if element["name"] == project_name:
+                    return element["id"]
+
+            raise ElementNotFoundException(stack()[0], project_name)
 
-        raise ElementNotFoundException(stack()[0], project_name)
+        return self.memoized_lookup(("project_id", group_name, project_name), lookup)
 
-    def get_project_tags_from_project_id(self, project_id, deep_search = False):
+    def get_project_tags_from_project_id(self, project_id, deep_search = False, extract = None,
+                                         window = None):
         """Fetches info about the tags of a project from gitlab.
         If deep_search is set to True then all tags of this projects
-        will be fetched, else only the last 50 tags will be fetched.
+        will be fetched (only the pages of the tags dated inside window, if provided,
+        see seek_request), else only the last page (per_page tags) will be fetched.
 
         Args:
             project_id(integer): Project's id.
             deep_search(boolean): If true, all tags of the project will be
                                   fetched.
-                                  If False, only the last 50 tags will be fetched.
+                                  If False, only the last page of tags will be fetched.
+            extract(callable): If provided, it is applied to each page of tags
+                               (e.g. extract_tag_name_and_title).
+            window(tuple): The newest and the oldest date (datetime) of the tags
+                           to be fetched by a deep search (None to fetch all tags).
             
         Returns:
             json_list(list): A list with dictionaries containing
@@ -147,10 +224,32 @@ class GitlabAPI(RequestMaker):
 
         """
         uri = self.project_tags_uri.format(project_id = project_id)
-        json_list = self.recursive_request(uri, deep_search,
-                                           spinner_text = f"project {project_id} tags")
+        if deep_search and (window is not None):
+            newest, oldest = window
+            return self.seek_request(uri, newest, oldest, get_tag_date,
+                                     progress_text = "tags", extract = extract)
+        json_list = self.recursive_request(uri, deep_search, progress_text = "tags",
+                                           extract = extract, checkpoint = True)
         return json_list
 
+    def get_newest_tag(self, project_id):
+        """Fetches info about the most recently updated tag of a project
+        (the first tag of the first page of its tags).
+
+        Args:
+            project_id(integer): Project's id.
+
+        Returns:
+            (dict): A dictionary containing info about the tag,
+                    or None if the project has no tag.
+
+        """
+        uri = self.project_tags_uri.format(project_id = project_id).format(page_number = 1,
+                                                                           per_page = 1)
+        response = self.make_request_and_report_progress(uri, "newest tags")
+        json_list = parse_json(response.content)
+        return json_list[0] if json_list else None
+
     def get_branch_info(self, group_name, project_name, branch_name):
         """Fetches info about a branch from gitlab.
 
@@ -167,11 +266,12 @@ class GitlabAPI(RequestMaker):
         """
         project_id = self.get_project_id_from_project_name(project_name, group_name)
         uri = self.branches_uri.format(project_id = project_id) + f"/{branch_name}"
-        spinner_text = f"info for branch {branch_name} of /{group_name}/{project_name}"
-        response = self.make_request_and_display_spinner(uri, spinner_text)
-        return json.loads(response.text)
+        progress_text = f"branch {branch_name} of /{group_name}/{project_name}"
+        response = self.make_request_and_report_progress(uri, progress_text)
+        return parse_json(response.content)
 
-    def find_tags_of_projects(self, projects_list, deep_search = False):
+    def find_tags_of_projects(self, projects_list, deep_search = False, failed_projects = None,
+                              memory_budget = None, window = None, stop = None):
         """Fetches info about the tags of every project (in projects_list) 
         and constructs a list of dictionaries containing:
             - "name" : project name,
@@ -186,24 +286,88 @@ class GitlabAPI(RequestMaker):
                                     - "id" : Project id.
             deep_search(boolean): If true, all tags of the project will be
                         fetched.
-                        If False, only the last 50 tags will be fetched.
+                        If False, only the last page of tags will be fetched.
+            failed_projects(dict): If provided, the projects whose tags could not be
+                                   fetched are added to it ({"name" : reason}) and the
+                                   crawl continues with the next project.
+                                   If not provided, the exception is raised.
+            memory_budget(int): If provided, the projects are kept in memory up to
+                                this size (in bytes) and the rest are spilled to a
+                                temporary file (see SpillingList).
+            window(tuple): If provided, a deep search fetches only the pages of the
+                           tags dated inside it (see get_project_tags_from_project_id).
+            stop(Event): If provided, the crawl stops before the next project once
+                         it is set (e.g. a speculative crawl whose result is not needed).
+
+        If a journal is set (see set_journal), each project is recorded to it
+        once all its tags are fetched, and the projects recorded by an
+        interrupted crawl are not fetched again.
 
         Returns:
-            project_tags(list): The constructed list of dictionaries.
+            project_tags(list or SpillingList): The constructed list of dictionaries.
                                     
         """
-        projects_tags = []
+        if memory_budget is None:
+            projects_tags = []
+        else:
+            projects_tags = SpillingList(memory_budget)
+
+        if self.progress is not None:
+            self.progress.add_projects(len(projects_list))
 
         for project in projects_list:
-            tags_list = self.get_project_tags_from_project_id(project["id"], deep_search)
-            tags_list = self.extract_tag_name_and_title(tags_list)
-            projects_tags.append({
+            if (stop is not None) and stop.is_set():
+                break
+            if self.journal is not None:
+                recorded_project = self.journal.get_project(self.get_journal_key(project))
+                if recorded_project is not None:
+                    projects_tags.append(recorded_project)
+                    if self.progress is not None:
+                        self.progress.project_done()
+                    continue
+            if (failed_projects is not None) and (self.deadline is not None) and \
+               self.deadline.expired():
+                failed_projects[project["name"]] = "Tags not fetched: the deadline has passed."
+                if self.progress is not None:
+                    self.progress.project_done()
+                continue
+            try:
+                # Only the name and title of the tags are kept, page by page.
+                tags_list = self.get_project_tags_from_project_id(
+                    project["id"], deep_search, extract = self.extract_tag_name_and_title,
+                    window = window)
+            except FetchInfoFailedException as exc:
+                if failed_projects is None:
+                    raise
+                if (self.deadline is not None) and self.deadline.expired():
+                    failed_projects[project["name"]] = "Tags not fetched: the deadline has passed."
+                else:
+                    failed_projects[project["name"]] = f"Tags could not be fetched: {exc.msg}"
+                if self.progress is not None:
+                    self.progress.project_done()
+                continue
+            project_tags = {
                 "name"  : project["name"],
                 "id"    : project["id"],
                 "tags"  : tags_list
-            })
+            }
+            projects_tags.append(project_tags)
+            if self.journal is not None:
+                self.journal.record_project(self.get_journal_key(project), project_tags)
+            if self.progress is not None:
+                self.progress.project_done()
+
+        if (memory_budget is not None) and projects_tags.spilled:
+            log_msg = f"Memory budget exceeded: the tags of {projects_tags.spilled} " +\
+                "projects were spilled to disk.\n"
+            write_text_to_file(log_msg, EXECUTION_LOG_FILE, mode = "a")
         return  projects_tags
 
+    def get_journal_key(self, project):
+        """Returns the key of a project in the crawl journal (the uri of its
+        tags, which is unique across gitlab instances)."""
+        return self.project_tags_uri.format(project_id = project["id"])
+
     def match_tag_with_title(self, tags_list, keyword):
         """Finds the tags whose title starts with the given keyword.
 
@@ -218,18 +382,11 @@ class GitlabAPI(RequestMaker):
             matches(list): A list containing the matching tags
 
         """
-        matches = []
-        pattern = f"^{keyword.lower()}"
-        for element in tags_list:
-            title = element["title"].lower()
-            if re.match(pattern, title):
-                matches.append(element["name"])
-
-        return matches
+        return match_tag_with_title(tags_list, keyword)
 
     def extract_project_name_and_id(self, json_list):
         """Constructs a new list with dictionaries containing only the
-        name and the id of each project in the initial list.
+        name, the id and the last activity of each project in the initial list.
 
         Args:
             json_list(list): A list with dictionaries containing
@@ -239,7 +396,8 @@ class GitlabAPI(RequestMaker):
 
         Returns:
             project_info(list): A list with dictionaries containing
-                                only project's name and id.
+                                only project's name, id and
+                                "last_activity_at" (None if not provided).
 
         """
 
@@ -247,7 +405,8 @@ class GitlabAPI(RequestMaker):
         for element in json_list:
             project_info.append({
                 "name" : element["name"],
-                "id"   : element["id"]
+                "id"   : element["id"],
+                "last_activity_at" : element.get("last_activity_at")
             })
         return project_info
 
@@ -275,3 +434,7 @@ class GitlabAPI(RequestMaker):
                 "title" : element["commit"]["title"]
             })
         return tag_info
+
+def get_tag_date(tag):
+    """Returns the date of the commit of a tag (None if unknown)."""
+    return parse_gitlab_datetime((tag.get("commit") or {}).get("committed_date"))
@@ -0,0 +1,152 @@
+"""Hedged requests, to cut the tail latency of idempotent requests."""
+
+# Python Libraries
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import threading
+import time
+
+
+class LatencyTracker():
+    """The LatencyTracker class keeps the latencies of the recent requests
+    of each endpoint and computes their percentiles."""
+
+    def __init__(self, window = 200, min_samples = 20):
+        """Instantiates a LatencyTracker object.
+
+        Args:
+            window(int): The number of recent latencies kept per endpoint.
+            min_samples(int): The minimum number of latencies needed
+                              to compute a percentile.
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, latency):
+        """Records the latency (in seconds) of a request to endpoint."""
+        with self._lock:
+            if endpoint not in self._latencies:
+                self._latencies[endpoint] = deque(maxlen = self.window)
+            self._latencies[endpoint].append(latency)
+
+    def percentile(self, endpoint, percentile):
+        """Returns a percentile (0 - 1) of the latencies of endpoint,
+        or None if there are not enough latencies yet.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies.get(endpoint, ()))
+        if len(latencies) < self.min_samples:
+            return None
+        index = min(int(percentile * len(latencies)), len(latencies) - 1)
+        return latencies[index]
+
+
+class RequestHedger():
+    """The RequestHedger class sends a duplicate (hedge) of a request that has
+    not been answered within a percentile of the latency of its endpoint, and
+    returns whichever response arrives first.
+
+    Only idempotent requests should be hedged. The number of hedges is capped
+    to a fraction of the requests, so a slow server is not flooded.
+    """
+
+    def __init__(self, percentile = 0.95, max_hedge_ratio = 0.1, min_samples = 20,
+                 max_workers = 16):
+        """Instantiates a RequestHedger object.
+
+        Args:
+            percentile(float): The latency percentile (0 - 1) after which
+                               a hedge is sent.
+            max_hedge_ratio(float): The maximum number of hedges,
+                                    as a fraction of the requests.
+            min_samples(int): The number of requests of an endpoint that
+                              are needed before its requests are hedged.
+            max_workers(int): The maximum number of requests in flight.
+        """
+        self.percentile = percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.latency_tracker = LatencyTracker(min_samples = min_samples)
+        self._executor = ThreadPoolExecutor(max_workers = max_workers,
+                                            thread_name_prefix = "hedge")
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    def send(self, endpoint, send_request, request_slots = None):
+        """Sends a request, hedging it if it is slow. The delay of the hedge
+        counts from when the request is sent (not while it waits for a worker).
+
+        Args:
+            endpoint(string): The endpoint of the request (latencies are
+                              tracked per endpoint).
+            send_request(callable): Sends the request and returns the response.
+            request_slots(threading.Semaphore): The concurrency budget of the
+                                                requests, if any: the hedge is sent
+                                                only if a slot is free, and holds it.
+
+        Returns:
+            (requests.models.Response object): The first response received.
+
+        Raises:
+            Exception: The exception raised by send_request, if both the request
+                       and its hedge failed.
+        """
+        with self._lock:
+            self.requests += 1
+
+        delay = self.latency_tracker.percentile(endpoint, self.percentile)
+        if delay is None:
+            return self._timed(endpoint, send_request)
+
+        sent = threading.Event()
+        primary = self._executor.submit(self._timed, endpoint, send_request, sent)
+        sent.wait()
+        done, _ = wait([primary], timeout = delay)
+        if done or not self._take_hedge(request_slots):
+            return primary.result()
+
+        hedge = self._executor.submit(self._timed, endpoint, send_request)
+        if request_slots is not None:
+            hedge.add_done_callback(lambda _: request_slots.release())
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when = FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedges_won += 1
+                    return future.result()
+
+        return primary.result()
+
+    def summary(self):
+        """Returns a one-line summary of the hedging metrics."""
+        with self._lock:
+            return f"Hedged requests: {self.hedges_fired} of {self.requests} requests " +\
+                f"were hedged, {self.hedges_won} hedges won."
+
+    def _take_hedge(self, request_slots = None):
+        """Returns True (and counts the hedge) if a hedge can be sent, after
+        taking a slot of request_slots (if provided) without waiting."""
+        with self._lock:
+            if self.hedges_fired + 1 > self.max_hedge_ratio * self.requests:
+                return False
+            if (request_slots is not None) and not request_slots.acquire(blocking = False):
+                return False
+            self.hedges_fired += 1
+            return True
+
+    def _timed(self, endpoint, send_request, sent = None):
+        """Sends a request and records its latency (sent is set, if provided,
+        when the request is sent)."""
+        if sent is not None:
+            sent.set()
+        start = time.monotonic()
+        response = send_request()
+        self.latency_tracker.record(endpoint, time.monotonic() - start)
+        return response
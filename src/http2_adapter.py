@@ -0,0 +1,183 @@
+"""HTTP/2 transport adapter for RequestMaker.
+
+Requires the optional httpx and h2 packages:
+
+    pip install "httpx[http2]"
+"""
+
+# Python Libraries
+import os.path
+import ssl
+import threading
+
+import httpx
+from requests.adapters import BaseAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import Timeout as RequestsTimeout
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import DEFAULT_CA_BUNDLE_PATH, get_encoding_from_headers, select_proxy
+
+
+class _DownloadedBody():
+    """Stands in for the raw (urllib3) response of requests: the body has
+    already been read by httpx, only its size on the wire is kept."""
+
+    def __init__(self, num_bytes):
+        self.num_bytes = num_bytes
+
+    def tell(self):
+        """Returns the number of bytes received on the wire."""
+        return self.num_bytes
+
+    def close(self):
+        """Nothing to close, the connection is released by httpx."""
+
+
+class HTTP2Adapter(BaseAdapter):
+    """The HTTP2Adapter class is a transport adapter for requests.Session,
+    which sends the requests with httpx over HTTP/2.
+
+    Concurrent requests to a host are multiplexed over a single connection.
+    If the server does not negotiate h2 (ALPN), HTTP/1.1 is used.
+    Retries and timeouts are still handled by RequestMaker.
+
+    The TLS and proxy settings are the ones that requests passes to send
+    (the settings of the session merged with the environment, e.g.
+    REQUESTS_CA_BUNDLE and HTTPS_PROXY), one httpx client for each of them.
+    """
+
+    def __init__(self, prior_knowledge = False, max_connections = 10):
+        """Instantiates an HTTP2Adapter object.
+
+        Args:
+            prior_knowledge(boolean): If True, HTTP/2 is used without negotiation
+                                      (needed for plain-text "http://" servers).
+            max_connections(int): The maximum number of connections per client.
+
+        Raises:
+            ImportError: If the h2 package is not installed.
+        """
+        super().__init__()
+        self.prior_knowledge = prior_knowledge
+        self.max_connections = max_connections
+        # httpx clients by (verify, cert, proxy), see _get_client.
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+        # The client of the default settings (httpx raises ImportError here without h2).
+        self._get_client(True, None, None)
+
+    def send(self, request, stream = False, timeout = None, verify = True, cert = None,
+             proxies = None):
+        """Sends a PreparedRequest and returns a requests Response.
+
+        Args:
+            request(requests.PreparedRequest): The request to be sent.
+            timeout(float or tuple): The timeout, as accepted by requests
+                                     (seconds, or a (connect, read) tuple).
+            verify(boolean or string): Whether the certificate of the server is
+                                       verified, or the path of the CA bundle
+                                       (or directory) it is verified against.
+            cert(string or tuple): The client certificate (a file, or a
+                                   (certificate, key) tuple), if any.
+            proxies(dict): The proxies by scheme or host (see requests.utils.select_proxy).
+
+        Returns:
+            (requests.models.Response object): The response from the server.
+
+        Raises:
+            requests.exceptions.Timeout: If the request timed out.
+            requests.exceptions.ConnectionError: If the request failed.
+        """
+        if isinstance(timeout, tuple):
+            connect_timeout, read_timeout = timeout
+            httpx_timeout = httpx.Timeout(read_timeout, connect = connect_timeout)
+        else:
+            httpx_timeout = httpx.Timeout(timeout)
+
+        client = self._get_client(verify, cert, select_proxy(request.url, proxies or {}))
+        try:
+            httpx_response = client.request(request.method, request.url,
+                                                  headers = dict(request.headers),
+                                                  content = request.body,
+                                                  timeout = httpx_timeout)
+        except httpx.TimeoutException as exc:
+            raise RequestsTimeout(exc, request = request) from exc
+        except httpx.TransportError as exc:
+            raise RequestsConnectionError(exc, request = request) from exc
+
+        return self._build_response(request, httpx_response)
+
+    def close(self):
+        """Closes the connections."""
+        with self._clients_lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+    def _get_client(self, verify, cert, proxy):
+        """Returns the httpx client of the TLS and proxy settings of a request
+        (created on first use). The environment is not read by httpx, requests
+        has already merged it into the settings."""
+        if isinstance(cert, list):
+            cert = tuple(cert)
+        key = (verify, cert, proxy)
+        with self._clients_lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = httpx.Client(http1 = not self.prior_knowledge, http2 = True,
+                                      verify = _make_ssl_context(verify, cert),
+                                      proxy = proxy, trust_env = False,
+                                      limits = httpx.Limits(
+                                          max_connections = self.max_connections))
+                self._clients[key] = client
+        return client
+
+    def _build_response(self, request, httpx_response):
+        """Converts an httpx Response to a requests Response."""
+        response = Response()
+        response.status_code = httpx_response.status_code
+        response.reason = httpx_response.reason_phrase
+        response.headers = CaseInsensitiveDict(httpx_response.headers)
+        # httpx has already decoded the body (gzip, deflate, ...).
+        response._content = httpx_response.content
+        response._content_consumed = True
+        response.raw = _DownloadedBody(httpx_response.num_bytes_downloaded)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = str(httpx_response.url)
+        response.request = request
+        response.elapsed = httpx_response.elapsed
+        response.connection = self
+        # "HTTP/2" or "HTTP/1.1"
+        response.http_version = httpx_response.http_version
+        return response
+
+
+def _make_ssl_context(verify, cert):
+    """Returns the SSL context of the verify and cert settings of requests.
+
+    Args:
+        verify(boolean or string): Whether the certificate of the server is verified,
+                                   or the path of the CA bundle (or directory).
+                                   True verifies it against the bundle of requests (certifi).
+        cert(string or tuple): The client certificate (a file, or a
+                               (certificate, key) tuple), if any.
+
+    Returns:
+        (ssl.SSLContext): The context.
+    """
+    if verify is False:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    elif isinstance(verify, str) and os.path.isdir(verify):
+        context = ssl.create_default_context(capath = verify)
+    else:
+        context = ssl.create_default_context(
+            cafile = verify if isinstance(verify, str) else DEFAULT_CA_BUNDLE_PATH)
+
+    if cert:
+        certfile, keyfile = cert if isinstance(cert, tuple) else (cert, None)
+        context.load_cert_chain(certfile, keyfile)
+    return context
@@ -0,0 +1,167 @@
+"""Journal of a crawl, so that an interrupted crawl can be resumed.
+
+The journal is a JSON Lines file, appended (and flushed) as the crawl goes.
+Each line is a record with a "kind" key:
+    - "header"  : format version and fingerprint of the crawl (the target
+                  branch and the crawl parameters),
+    - "page"    : a page of a listing (see RequestMaker.recursive_request),
+    - "project" : a project with all its tags (see GitlabAPI.find_tags_of_projects).
+
+A journal is resumed only if its fingerprint matches the one of the new
+crawl. A truncated line (the crawl was killed while writing it) is ignored.
+"""
+
+# Python Libraries
+import hashlib
+import json
+import os
+import threading
+
+# Program Libraries
+from src.constants import EXECUTION_LOG_FILE
+from src.utils import write_text_to_file
+
+JOURNAL_VERSION = 1
+
+
+def get_fingerprint(**parameters):
+    """Returns the fingerprint of a crawl.
+
+    Args:
+        parameters: Everything the crawled state depends on (JSON-serializable).
+
+    Returns:
+        (string): The fingerprint (a SHA-256 hex digest).
+    """
+    document = json.dumps({"version" : JOURNAL_VERSION, **parameters}, sort_keys = True,
+                          default = str)
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+
+class CrawlJournal():
+    """The CrawlJournal class records the pages and projects of a crawl as
+    they complete and serves them back (once) when the crawl is resumed.
+    Only the records loaded from the previous crawl are kept in memory.
+    It is thread-safe.
+    """
+
+    def __init__(self, path, fingerprint, resume = False):
+        """Instantiates a CrawlJournal object and opens the journal file.
+
+        Args:
+            path(string): The path of the journal file.
+            fingerprint(string): The fingerprint of the crawl (see get_fingerprint).
+            resume(boolean): If True, the records of a journal with the same
+                             fingerprint are loaded and the journal is continued.
+                             Otherwise (or if the fingerprint differs) a new
+                             journal is started.
+        """
+        self.path = path
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self._pages = {}
+        self._projects = {}
+        self._truncated = False
+
+        if resume and self._load():
+            self._fstream = open(path, "a", encoding = "utf-8")
+            if self._truncated:
+                # Terminate the truncated line, the next records start on a new one.
+                self._fstream.write("\n")
+            msg = f"Crawl journal {path} resumed: {len(self._projects)} projects, " +\
+                f"{len(self._pages)} pages.\n"
+            write_text_to_file(msg, EXECUTION_LOG_FILE, mode = "a")
+        else:
+            self._fstream = open(path, "w", encoding = "utf-8")
+            self._write_record({"kind" : "header", "version" : JOURNAL_VERSION,
+                                "fingerprint" : fingerprint})
+
+    def get_page(self, uri):
+        """Returns (and forgets) the recorded page of uri (None if it was not recorded).
+
+        Returns:
+            (dict): A dictionary containing:
+                        - "items" : The (extracted) items of the page,
+                        - "size" : The number of items of the page as received,
+                        - "last" : True if it is the last page of the listing.
+        """
+        with self._lock:
+            return self._pages.pop(uri, None)
+
+    def record_page(self, uri, items, size, last):
+        """Records a page of a listing (see get_page)."""
+        record = {"kind" : "page", "uri" : uri, "items" : items, "size" : size, "last" : last}
+        with self._lock:
+            self._write_record(record)
+
+    def get_project(self, key):
+        """Returns (and forgets) the recorded project (with its tags) of key,
+        None if it was not recorded."""
+        with self._lock:
+            return self._projects.pop(key, None)
+
+    def record_project(self, key, project):
+        """Records a project with all its tags.
+
+        Args:
+            key(string): The key of the project, unique across gitlab instances
+                         (e.g. the uri of its tags).
+            project(dict): A dictionary containing "name", "id" and "tags".
+        """
+        with self._lock:
+            self._write_record({"kind" : "project", "key" : key, "project" : project})
+
+    def close(self):
+        """Closes the journal file (it is kept, so the crawl can be resumed)."""
+        with self._lock:
+            if not self._fstream.closed:
+                self._fstream.close()
+
+    def discard(self):
+        """Closes and removes the journal file (e.g. when the crawl has completed)."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _load(self):
+        """Loads the records of the journal file.
+
+        Returns:
+            (boolean): True if the journal was loaded, False if there is none
+                       or it belongs to an other crawl.
+        """
+        try:
+            with open(self.path, "r", encoding = "utf-8") as fstream:
+                lines = fstream.readlines()
+        except OSError:
+            return False
+
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Truncated line: the crawl was killed while writing it.
+                continue
+        self._truncated = bool(lines) and not lines[-1].endswith("\n")
+
+        if (not records) or (records[0].get("kind") != "header") or \
+           (records[0].get("version") != JOURNAL_VERSION) or \
+           (records[0].get("fingerprint") != self.fingerprint):
+            write_text_to_file(f"Crawl journal {self.path} does not match this crawl " +\
+                               "(branch or parameters changed), starting over.\n",
+                               EXECUTION_LOG_FILE, mode = "a")
+            return False
+
+        for record in records[1:]:
+            if record.get("kind") == "page":
+                self._pages[record["uri"]] = record
+            elif record.get("kind") == "project":
+                self._projects[record["key"]] = record["project"]
+        return True
+
+    def _write_record(self, record):
+        """Writes a record as a single JSON line and flushes it.
+        Must be called with the lock held."""
+        self._fstream.write(json.dumps(record, separators = (",", ":")) + "\n")
+        self._fstream.flush()
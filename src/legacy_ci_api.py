@@ -6,7 +6,9 @@ from src.constants import (
     LCI_PROJECT_SEARCH_BY_NAME_URI,
     LCI_PROJECTS_URI,
     LCI_TAGS_URI,
-    LCI_BRANCHES_URI
+    LCI_BRANCHES_URI,
+    LCI_PROJECT_URI,
+    LCI_MERGE_REQUESTS_URI
 )
 from src.gitlab_api import GitlabAPI
 
@@ -22,3 +24,5 @@ class LegacyCIAPI(GitlabAPI):
     projects_uri = LCI_PROJECTS_URI
     project_tags_uri = LCI_TAGS_URI
     branches_uri = LCI_BRANCHES_URI
+    project_uri = LCI_PROJECT_URI
+    merge_requests_uri = LCI_MERGE_REQUESTS_URI
@@ -0,0 +1,84 @@
+"""Per-stage memory profiling with tracemalloc."""
+
+# Python Libraries
+from contextlib import contextmanager
+import tracemalloc
+
+# Number of frames kept for each allocation.
+TRACEBACK_FRAMES = 1
+# Number of allocation sites reported for each stage.
+TOP_ALLOCATION_SITES = 5
+# The allocations of tracemalloc itself (snapshots) are not reported.
+SNAPSHOT_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+
+class MemoryProfiler():
+    """The MemoryProfiler class measures the memory allocated by each stage
+    of a run: the memory still held at its end, its peak, and the source lines
+    that allocated the most memory.
+
+    Tracing memory slows the run down, so it is only started on demand.
+    """
+
+    def __init__(self, top = TOP_ALLOCATION_SITES):
+        """Instantiates a MemoryProfiler object and starts tracing memory allocations.
+
+        Args:
+            top(int): The number of allocation sites reported for each stage.
+        """
+        self.top = top
+        # A dictionary for each stage, containing:
+        #   - "name" : The name of the stage,
+        #   - "current" : The traced memory at the end of the stage (bytes),
+        #   - "peak" : The peak of the traced memory during the stage (bytes),
+        #   - "sites" : The top allocation sites (tracemalloc.StatisticDiff list).
+        self.stages = []
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEBACK_FRAMES)
+
+    @contextmanager
+    def stage(self, name):
+        """Measures the memory allocated by the block of a with statement.
+
+        Args:
+            name(string): The name of the stage.
+        """
+        before = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+            sites = after.compare_to(before, "lineno")[:self.top]
+            self.stages.append({
+                "name" : name,
+                "current" : current,
+                "peak" : peak,
+                "sites" : sites
+            })
+
+    def report(self):
+        """Returns the report of the stages measured so far.
+
+        Returns:
+            (string): The report.
+        """
+        lines = ["Memory profile (traced memory, MB):",
+                 f"  {'stage':<24}{'end':>10}{'peak':>10}"]
+        for stage in self.stages:
+            lines.append(f"  {stage['name']:<24}{stage['current'] / 2**20:>10.1f}" +\
+                         f"{stage['peak'] / 2**20:>10.1f}")
+
+        for stage in self.stages:
+            lines.append(f"Top allocation sites of stage \"{stage['name']}\":")
+            for site in stage["sites"]:
+                frame = site.traceback[0]
+                lines.append(f"  {site.size_diff / 1024:+10.1f} KB  " +\
+                             f"{frame.filename}:{frame.lineno}")
+
+        return "\n".join(lines)
+
+    def stop(self):
+        """Stops tracing memory allocations."""
+        tracemalloc.stop()
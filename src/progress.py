@@ -0,0 +1,211 @@
+"""Aggregated progress reporter."""
+
+# Python Libraries
+import sys
+import threading
+import time
+
+# Seconds between two redraws of the progress line (TTY).
+TTY_REFRESH_INTERVAL = 0.1
+# Seconds between two summary lines (non-TTY, e.g. CI logs).
+SUMMARY_INTERVAL = 10
+# Counters that can be added from an other reporter (see ProgressReporter.add_counters).
+COUNTERS = ("projects_done", "pages", "requests", "failed_requests", "bytes",
+            "wire_bytes", "uncompressed_responses")
+
+
+class ProgressReporter():
+    """The ProgressReporter class displays the aggregate progress of a run:
+    projects done/total, pages fetched, requests per second and bytes received.
+
+    It is thread-safe, so one reporter can be shared by parallel workers.
+    On a TTY a single line is redrawn in place; otherwise a summary line is
+    printed periodically. A quiet reporter displays nothing.
+    """
+
+    def __init__(self, stream = None, quiet = False):
+        """Instantiates a ProgressReporter object.
+
+        Args:
+            stream(file object): Where progress is displayed (default is sys.stderr).
+            quiet(boolean): If True, nothing is displayed.
+        """
+        self.stream = stream if stream is not None else sys.stderr
+        self.quiet = quiet
+        self.is_tty = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self.interval = TTY_REFRESH_INTERVAL if self.is_tty else SUMMARY_INTERVAL
+
+        self._lock = threading.Lock()
+        self._paused = False
+        self._start_time = time.monotonic()
+        self._last_display = self._start_time
+        self._line_length = 0
+
+        self.stage = ""
+        self.projects_total = 0
+        self.projects_done = 0
+        self.pages = 0
+        self.requests = 0
+        self.failed_requests = 0
+        self.bytes = 0
+        # Bytes received on the wire (compressed bodies are smaller than self.bytes).
+        self.wire_bytes = 0
+        # Responses that were not compressed by the server.
+        self.uncompressed_responses = 0
+
+    def set_stage(self, stage):
+        """Sets the text describing what is being fetched."""
+        with self._lock:
+            self.stage = stage
+            self._display()
+
+    def add_projects(self, count):
+        """Adds count projects to the total number of projects to be processed."""
+        with self._lock:
+            self.projects_total += count
+            self._display()
+
+    def project_done(self):
+        """Marks one project as processed."""
+        with self._lock:
+            self.projects_done += 1
+            self._display()
+
+    def request_done(self, num_bytes, page = True, wire_bytes = None, compressed = False):
+        """Records a completed request.
+
+        Args:
+            num_bytes(int): The size of the response body.
+            page(boolean): True if the request fetched a page of a listing.
+            wire_bytes(int): The size of the response body on the wire
+                             (default is num_bytes).
+            compressed(boolean): True if the server compressed the response body.
+        """
+        with self._lock:
+            self.requests += 1
+            self.bytes += num_bytes
+            self.wire_bytes += num_bytes if wire_bytes is None else wire_bytes
+            if not compressed:
+                self.uncompressed_responses += 1
+            if page:
+                self.pages += 1
+            self._display()
+
+    def counters(self):
+        """Returns the counters of the processed projects and requests
+        (e.g. to be added to the reporter of an other process).
+
+        Returns:
+            (dict): The counters, by attribute name.
+        """
+        with self._lock:
+            return {name : getattr(self, name) for name in COUNTERS}
+
+    def add_counters(self, counters):
+        """Adds the counters of an other reporter (see counters)."""
+        with self._lock:
+            for name in COUNTERS:
+                setattr(self, name, getattr(self, name) + counters.get(name, 0))
+            self._display()
+
+    def request_failed(self):
+        """Records a failed request."""
+        with self._lock:
+            self.requests += 1
+            self.failed_requests += 1
+            self._display(force = True)
+
+    def pause(self):
+        """Stops displaying progress (e.g. while the user is prompted for input)."""
+        with self._lock:
+            self._clear_line()
+            self._paused = True
+
+    def resume(self):
+        """Resumes displaying progress after pause."""
+        with self._lock:
+            self._paused = False
+
+    def finish(self):
+        """Displays the final summary (unless no request was made, e.g. an
+        offline run). Progress is not displayed after it."""
+        with self._lock:
+            self._paused = True
+            if self.quiet or (self.requests == 0):
+                return
+            self._clear_line()
+            self.stream.write(self.summary() + "\n")
+            self.stream.flush()
+
+    def summary(self):
+        """Returns a one-line summary of the progress.
+
+        Returns:
+            (string): The summary.
+        """
+        elapsed = max(time.monotonic() - self._start_time, 1e-6)
+        summary = f"projects {self.projects_done}/{self.projects_total}" +\
+            f" | pages {self.pages}" +\
+            f" | {self.requests / elapsed:.1f} req/s" +\
+            f" | {_format_bytes(self.bytes)}"
+        if self.failed_requests:
+            summary += f" | {self.failed_requests} failed"
+        if self.stage:
+            summary = f"[{self.stage}] " + summary
+        return summary
+
+    def transfer_summary(self):
+        """Returns a one-line summary of the bytes received and
+        of the bytes saved by compression.
+
+        Returns:
+            (string): The summary.
+        """
+        with self._lock:
+            saved = max(self.bytes - self.wire_bytes, 0)
+            ratio = saved / self.bytes if self.bytes else 0.0
+            summary = f"Transfer: {_format_bytes(self.bytes)} of response bodies, " +\
+                f"{_format_bytes(self.wire_bytes)} on the wire, " +\
+                f"{_format_bytes(saved)} ({ratio:.0%}) saved by compression."
+            if self.uncompressed_responses:
+                responses = self.requests - self.failed_requests
+                summary += f" {self.uncompressed_responses} of {responses}" +\
+                    " responses were not compressed."
+            return summary
+
+    def _display(self, force = False):
+        """Displays the progress, at most once per interval.
+        Must be called with the lock held.
+        """
+        if self.quiet or self._paused:
+            return
+
+        now = time.monotonic()
+        if (not force) and (now - self._last_display < self.interval):
+            return
+        self._last_display = now
+
+        summary = self.summary()
+        if self.is_tty:
+            padding = " " * max(self._line_length - len(summary), 0)
+            self.stream.write("\r" + summary + padding)
+            self._line_length = len(summary)
+        else:
+            self.stream.write(summary + "\n")
+        self.stream.flush()
+
+    def _clear_line(self):
+        """Clears the progress line (TTY only). Must be called with the lock held."""
+        if self.is_tty and self._line_length and not self.quiet:
+            self.stream.write("\r" + " " * self._line_length + "\r")
+            self.stream.flush()
+            self._line_length = 0
+
+
+def _format_bytes(num_bytes):
+    """Formats a number of bytes in a human readable form."""
+    for unit in ("B", "KB", "MB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
@@ -1,25 +1,55 @@
 """HTTP Request Maker."""
 
 # Python Libraries
+from contextlib import nullcontext
 from inspect import stack
-import json
 import re
+import threading
+import time
+from urllib.parse import urlparse
 import requests
-from requests.adapters import HTTPAdapter, Retry
-from halo import Halo
 
 # Program Libraries
 from src.constants import (
+    ACCEPT_ENCODING,
+    DEFAULT_BACKOFF_FACTOR,
+    DEFAULT_PER_PAGE,
+    DEFAULT_TIMEOUT,
     GET,
+    MAX_PER_PAGE,
     OK,
     EXECUTION_LOG_FILE
 )
 from src.exceptions import (
+    CircuitOpenException,
+    DeadlineExceededException,
     FetchInfoFailedException,
     InvalidUriException,
     RequestFailedException
 )
-from src.utils import write_text_to_file
+from src.fast_json import (
+    is_empty_page,
+    parse_json
+)
+from src.retry_policy import (
+    RetryBudget,
+    RetryPolicy,
+    get_circuit_breaker
+)
+from src.utils import (
+    endpoint_template,
+    get_wire_bytes,
+    write_text_to_file
+)
+
+
+class _InFlightCall():
+    """Holds the outcome of a request that other callers are waiting for."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.response = None
+        self.exception = None
 
 
 class RequestMaker(requests.Session):
@@ -29,17 +59,42 @@ class RequestMaker(requests.Session):
     def __init__(self):
         """Instantiates a RequestMaker object.
 
-        Initializes status_forcelist (for which HTTP status codes
-        a retry should be performed) and backoff_factor between retries.
+        Initializes the retry policy: status_forcelist (for which HTTP status codes
+        a retry should be performed) and jittered exponential backoff between retries.
         
         Returns:
             (RequestMaker object): The instantiated RequestMaker object.
         """
         super().__init__()
-        # HTTP status codes for which a retry should be performed
-        self.status_forcelist = [429, 500, 502, 503, 504]
-        # A backoff factor to apply between attempts after the second try.
-        self.backoff_factor = 0.1
+        # Ask for compressed response bodies (decompressed transparently).
+        self.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        # Number of items per page of the listings (see recursive_request).
+        self.per_page = DEFAULT_PER_PAGE
+        # Timeout (in seconds) of the requests that do not set one.
+        self.timeout = DEFAULT_TIMEOUT
+        self.retry_policy = RetryPolicy(base_delay = DEFAULT_BACKOFF_FACTOR,
+                                        status_forcelist = [429, 500, 502, 503, 504])
+        # Retry budget of each operation, keyed by endpoint template.
+        self._retry_budgets = {}
+        self._retry_budgets_lock = threading.Lock()
+        # Calls currently in flight, keyed by (method, uri).
+        # Concurrent callers of the same key share one call.
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+        # Results of idempotent lookups, kept for the lifetime of the session.
+        self._lookup_cache = {}
+        self._lookup_cache_lock = threading.Lock()
+        # ProgressReporter shared by the whole run (None to disable reporting).
+        self.progress = None
+        # RequestHedger for GET requests (None to disable hedging).
+        self.hedger = None
+        # Deadline of the run (None for no deadline).
+        self.deadline = None
+        # Semaphore limiting the requests in flight, shared with other
+        # sessions (None for no limit).
+        self.request_slots = None
+        # CrawlJournal of the checkpointed listings (None to disable checkpoints).
+        self.journal = None
 
     def set_status_forcelist(self, status_forcelist):
         """Sets the status_forcelist.
@@ -50,27 +105,120 @@ class RequestMaker(requests.Session):
                                     a retry should be performed.
 
         """
-        self.status_forcelist = status_forcelist
+        self.retry_policy.status_forcelist = tuple(status_forcelist)
+
+    def set_progress_reporter(self, progress):
+        """Sets the progress reporter.
+
+        Args:
+            progress(ProgressReporter): The reporter to be updated
+                                        after every request.
+        """
+        self.progress = progress
+
+    def set_hedger(self, hedger):
+        """Sets the request hedger.
+
+        Args:
+            hedger(RequestHedger): The hedger used for GET requests
+                                   (None to disable hedging).
+        """
+        self.hedger = hedger
+
+    def set_deadline(self, deadline):
+        """Sets the deadline of the run. The timeout of every request is shrunk
+        to the remaining time and no request is made after the deadline.
+
+        Args:
+            deadline(Deadline): The deadline (None for no deadline).
+        """
+        self.deadline = deadline
+
+    def set_request_slots(self, request_slots):
+        """Sets the concurrency budget of the requests: each request holds a slot
+        while it is in flight, backoff delays do not. A hedged duplicate is sent
+        only if a slot is free, and holds it (see RequestHedger.send).
+
+        Args:
+            request_slots(threading.Semaphore): The semaphore, which may be shared
+                                                by several sessions (None for no limit).
+        """
+        self.request_slots = request_slots
+
+    def set_journal(self, journal):
+        """Sets the crawl journal: the pages of the checkpointed listings
+        (see recursive_request) are recorded to it, or served from it when
+        an interrupted crawl is resumed.
+
+        Args:
+            journal(CrawlJournal): The journal (None to disable checkpoints).
+        """
+        self.journal = journal
+
+    def enable_http2(self, prior_knowledge = False):
+        """Sends the requests over HTTP/2 (see HTTP2Adapter), so that concurrent
+        requests to a host are multiplexed over one connection.
+        Falls back to HTTP/1.1 if the optional httpx/h2 packages are not installed.
+
+        Args:
+            prior_knowledge(boolean): If True, HTTP/2 is used without negotiation
+                                      (needed for plain-text "http://" servers).
+
+        Returns:
+            (boolean): True if the HTTP/2 transport is used.
+        """
+        try:
+            from src.http2_adapter import HTTP2Adapter
+            adapter = HTTP2Adapter(prior_knowledge)
+        except ImportError as exc:
+            log_msg = f"HTTP/2 transport not available ({exc}), using HTTP/1.1.\n"
+            write_text_to_file(log_msg, EXECUTION_LOG_FILE, mode = "a")
+            return False
+
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        return True
+
+    def set_per_page(self, per_page):
+        """Sets the number of items per page of the listings.
+
+        Args:
+            per_page(int): The page size, limited to 1 - MAX_PER_PAGE.
+        """
+        self.per_page = min(max(int(per_page), 1), MAX_PER_PAGE)
+
+    def set_timeout(self, timeout):
+        """Sets the timeout of the requests that do not set one.
+
+        Args:
+            timeout(float): Number of seconds the client waits to get
+                            a response from the server.
+        """
+        self.timeout = timeout
 
     def set_backoff_factor(self, backoff_factor):
         """Sets the backoff factor.
 
         Args:
             backoff_factor(float): A float number between 0 and 1.
+                                   The delay before retry n is a random number
+                                   between 0 and backoff_factor * 2^n.
         """
-        self.backoff_factor = backoff_factor
+        self.retry_policy.base_delay = backoff_factor
 
-    def make_request(self, uri, method=GET, timeout = 10, retries = 10):
+    def make_request(self, uri, method=GET, timeout = None, retries = 10):
         """Performs an HTTP request to a specified uri.
         
         Args:
             uri(string): The uri to which the request will be made.
             method(string): The HTTP method to be used (default is GET).
             timeout(int): Number of seconds the client waits to get a
-                          response form the server (default is 10).
+                          response form the server (default is the
+                          timeout of the session, see set_timeout).
             retries(int): How many times the client will retry if there
                           is no response from the server or one of the codes
-                          in status_forcelist is returned.
+                          in status_forcelist is returned (at most, retries are
+                          also limited by the retry budget of the operation).
 
         Returns:
             (requests.models.Response object): The response from the server.
@@ -78,32 +226,167 @@ class RequestMaker(requests.Session):
         Raises:
             InvalidUriException: If the provided uri is invalid.
             RequestFailedException: If the request failed for any reason.
+            CircuitOpenException: If the circuit breaker of the host is open.
+            DeadlineExceededException: If the deadline of the run has passed.
         """
 
-        retries = Retry(total = retries,
-                        backoff_factor = self.backoff_factor,
-                        status_forcelist = self.status_forcelist
-                    )
-        adapter = HTTPAdapter(max_retries = retries)
-        self.mount("https://", adapter)
-        self.mount("http://", adapter)
-
         if not self.validate_uri(uri):
             raise InvalidUriException(stack()[0], uri)
+        if timeout is None:
+            timeout = self.timeout
 
-        try:
-            request_method = getattr(self, method.lower())
+        log_msg = f"Performing {method} request to {uri} ...\n"
+        write_text_to_file(log_msg, EXECUTION_LOG_FILE, mode = "a")
 
-            log_msg = f"Performing {method} request to {uri} ...\n"
-            write_text_to_file(log_msg, EXECUTION_LOG_FILE, mode = "a")
+        if method.upper() == GET:
+            # GET is idempotent, so identical in-flight requests
+            # can share a single response.
+            return self._single_flight((GET, uri),
+                                       lambda: self._request_with_retries(uri, method,
+                                                                          timeout, retries))
+        return self._request_with_retries(uri, method, timeout, retries)
+
+    def _request_with_retries(self, uri, method, timeout, retries):
+        """Performs an HTTP request, retrying according to the retry policy,
+        the retry budget of the operation and the circuit breaker of the host.
+
+        The circuit breaker is checked before the first attempt and records
+        one outcome per request, once its retries are over.
+
+        Returns:
+            (requests.models.Response object): The response from the server.
+                                               If retries run out on a status
+                                               in status_forcelist, the last
+                                               response is returned.
+
+        Raises:
+            RequestFailedException: If no response was received.
+            CircuitOpenException: If the circuit breaker of the host is open.
+            DeadlineExceededException: If the deadline of the run has passed.
+        """
+        host = urlparse(uri).netloc
+        circuit_breaker = get_circuit_breaker(host)
+        retry_budget = self._get_retry_budget(endpoint_template(uri))
+        request_method = getattr(self, method.lower())
+        attempt = 0
+
+        while True:
+            attempt_timeout = timeout
+            if self.deadline is not None:
+                if self.deadline.expired():
+                    raise DeadlineExceededException(stack()[0], uri)
+                attempt_timeout = self.deadline.clamp_timeout(timeout)
+
+            if (attempt == 0) and not circuit_breaker.allow_request():
+                raise CircuitOpenException(stack()[0], host, uri)
+
+            response = None
+            retry_after = None
+            try:
+                with self.request_slots or nullcontext():
+                    if (self.hedger is not None) and (method.upper() == GET):
+                        response = self.hedger.send(host + endpoint_template(uri),
+                                                    lambda: request_method(
+                                                        uri, timeout = attempt_timeout),
+                                                    self.request_slots)
+                    else:
+                        response = request_method(uri, timeout = attempt_timeout)
+            except Exception as exc:
+                error = exc
+            else:
+                if not self.retry_policy.should_retry(response.status_code):
+                    circuit_breaker.record_success()
+                    retry_budget.record_success()
+                    return response
+                error = None
+                retry_after = _get_retry_after(response)
+
+            if circuit_breaker.is_open():
+                # Fail fast instead of waiting for the rest of the retries.
+                raise CircuitOpenException(stack()[0], host, uri)
+
+            delay = self.retry_policy.backoff(attempt, retry_after)
+            out_of_time = (self.deadline is not None) and (delay >= self.deadline.remaining())
+
+            if (attempt >= retries) or out_of_time or not retry_budget.can_retry():
+                circuit_breaker.record_failure(uri)
+                if response is not None:
+                    return response
+                raise RequestFailedException(stack()[0], str(error), uri) from error
+
+            time.sleep(delay)
+            attempt += 1
+
+    def _get_retry_budget(self, operation):
+        """Returns the retry budget of an operation (created on first use)."""
+        with self._retry_budgets_lock:
+            if operation not in self._retry_budgets:
+                self._retry_budgets[operation] = RetryBudget()
+            return self._retry_budgets[operation]
+
+    def _single_flight(self, key, call):
+        """Executes call, unless a call with the same key is already in flight.
+        In that case, waits for the in-flight call and shares its outcome.
+
+        Args:
+            key(tuple): Identifies the call (e.g. (method, uri)).
+            call(callable): The function to execute.
+
+        Returns:
+            (object): The value returned by call.
 
-            response = request_method(uri, timeout = timeout)
+        Raises:
+            Exception: Whatever exception call raised.
+        """
+        with self._in_flight_lock:
+            in_flight = self._in_flight.get(key)
+            is_leader = in_flight is None
+            if is_leader:
+                in_flight = _InFlightCall()
+                self._in_flight[key] = in_flight
+
+        if not is_leader:
+            in_flight.event.wait()
+            if in_flight.exception is not None:
+                raise in_flight.exception
+            return in_flight.response
+
+        try:
+            in_flight.response = call()
         except Exception as exc:
-            raise RequestFailedException(stack()[0], str(exc), uri) from exc
+            in_flight.exception = exc
+            raise
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+            in_flight.event.set()
 
-        return response
+        return in_flight.response
+
+    def memoized_lookup(self, key, lookup):
+        """Returns the result of an idempotent lookup (e.g. group name -> group id).
+        The lookup is performed once per session; later calls with the same key
+        return the cached result and concurrent calls share one lookup.
+
+        Args:
+            key(tuple): Identifies the lookup.
+            lookup(callable): The function performing the lookup.
+
+        Returns:
+            (object): The result of the lookup.
+        """
+        with self._lookup_cache_lock:
+            if key in self._lookup_cache:
+                return self._lookup_cache[key]
+
+        result = self._single_flight(("LOOKUP",) + key, lookup)
+
+        with self._lookup_cache_lock:
+            self._lookup_cache[key] = result
+
+        return result
 
-    def make_request_and_expect_200(self, uri, method = GET, timeout = 10, retries = 10):
+    def make_request_and_expect_200(self, uri, method = GET, timeout = None, retries = 10):
         """Executes make_request inside a try/except block 
         and verifies that status code is 200 - OK.
 
@@ -111,7 +394,8 @@ class RequestMaker(requests.Session):
             uri(string): The uri to which the request will be made.
             method(string): The HTTP method to be used (default is GET).
             timeout(int): Number of seconds the client waits to get a
-                          response form the server (default is 10).
+                          response form the server (default is the
+                          timeout of the session, see set_timeout).
             retries(int): How many times the client will retry if there
                           is no response from the server or one of the codes
                           in status_forcelist is returned.
@@ -136,46 +420,142 @@ class RequestMaker(requests.Session):
 
         except (RequestFailedException, InvalidUriException) as exc:
             caller = stack()[0].function
-            msg = "RequestFailedException was raised."
+            msg = f"{type(exc).__name__} was raised."
             raise   FetchInfoFailedException(caller, msg) from exc
 
         return response
 
-    def recursive_request(self, uri, deep_search = True, spinner_text = None):
+    def recursive_request(self, uri, deep_search = True, progress_text = None, extract = None,
+                          checkpoint = False):
         """Iteratively calls make_request_and_expect_200 until 
         the text of server's response is empty.
 
+        The uri should contain {page_number} and {per_page} placeholders.
+        A page with less than per_page items is the last one, so no request
+        is made for the empty page after it.
+
+        If extract is provided, it is applied to each page as soon as it is
+        received (e.g. to keep only some fields), so the full pages are
+        not all held in memory.
+
+        If checkpoint is True and a journal is set, each page is recorded to
+        the journal, and the pages recorded by an interrupted crawl are not
+        requested again.
+
         """
         page_number = 1
         json_list = []
+        journal = self.journal if checkpoint else None
 
         while True:
-            page_uri = uri.format(page_number = page_number)
+            page_uri = uri.format(page_number = page_number, per_page = self.per_page)
 
-            if (spinner_text is not None) and deep_search:
-                _spinner_text = spinner_text + f" (page = {page_number})"
+            record = journal.get_page(page_uri) if journal is not None else None
+            if record is not None:
+                items, last = record["items"], record["last"]
             else:
-                _spinner_text = spinner_text
+                response = self.make_request_and_report_progress(page_uri, progress_text)
 
-            response = self.make_request_and_display_spinner(page_uri, _spinner_text)
+                if is_empty_page(response.content):
+                    break
+                page = parse_json(response.content)
+                page_size = len(page)
+                items = extract(page) if extract is not None else page
+                # Gitlab sends an empty X-Next-Page header on the last page.
+                last = page_size < self.per_page or response.headers.get("X-Next-Page") == ""
+                if journal is not None:
+                    journal.record_page(page_uri, items, page_size, last)
 
-            if response.text in ["[]", ""]:
-                break
-            json_list += json.loads(response.text)
+            json_list += items
 
-            if not deep_search:
+            if (not deep_search) or last:
                 break
 
             page_number +=1
 
         return json_list
 
-    def make_request_and_display_spinner(self, uri, spinner_text = None):
-        """Executes make_request_and_expect_200 and display a spinner while waiting for response.
+    def seek_request(self, uri, newest, oldest, date_of, progress_text = None, extract = None):
+        """Fetches the pages of a listing ordered newest first (e.g. tags ordered
+        by "updated") whose items are dated between oldest and newest (the window),
+        without walking the pages before it.
+
+        The pages are probed exponentially (1, 2, 4, 8, ...) until one reaches
+        the window (its oldest item is not newer than newest), the first such page
+        is found by binary search between the last two probes, and the pages are
+        scanned from there until one reaches past the window (its oldest item is
+        older than oldest). This takes O(log pages + window) requests instead of
+        O(pages). Every fetched page is fetched once.
+
+        Args:
+            uri(string): The uri, with {page_number} and {per_page} placeholders.
+            newest(datetime): The newest date of the window.
+            oldest(datetime): The oldest date of the window.
+            date_of(callable): Returns the date of an item (None if unknown, such
+                               items are treated as inside the window).
+            progress_text(string): The stage displayed by the progress reporter.
+            extract(callable): If provided, it is applied to each scanned page
+                               (see recursive_request).
+
+        Returns:
+            json_list(list): The items of the scanned pages.
+
+        """
+        pages = {}
+
+        def fetch(page_number):
+            # Returns the page (empty past the end) and whether it is the last one.
+            if page_number not in pages:
+                page_uri = uri.format(page_number = page_number, per_page = self.per_page)
+                response = self.make_request_and_report_progress(page_uri, progress_text)
+                page = [] if is_empty_page(response.content) else parse_json(response.content)
+                last = len(page) < self.per_page or response.headers.get("X-Next-Page") == ""
+                pages[page_number] = (page, last)
+            return pages[page_number]
+
+        def reaches_window(page_number):
+            page, last = fetch(page_number)
+            if (not page) or last:
+                return True
+            page_oldest = date_of(page[-1])
+            return (page_oldest is None) or (page_oldest <= newest)
+
+        # Gallop: the first page that reaches the window is in [low, high].
+        low, high = 1, 1
+        while not reaches_window(high):
+            low = high + 1
+            high *= 2
+
+        # Binary search for the first page that reaches the window.
+        while low < high:
+            middle = (low + high) // 2
+            if reaches_window(middle):
+                high = middle
+            else:
+                low = middle + 1
+
+        json_list = []
+        page_number = low
+        while True:
+            page, last = fetch(page_number)
+            if not page:
+                break
+            json_list += extract(page) if extract is not None else page
+            page_oldest = date_of(page[-1])
+            if last or ((page_oldest is not None) and (page_oldest < oldest)):
+                break
+            page_number += 1
+
+        return json_list
+
+    def make_request_and_report_progress(self, uri, progress_text = None):
+        """Executes make_request_and_expect_200 and reports the outcome
+        to the progress reporter (if one is set).
 
         Args:
             uri(string): The uri to which the request will be made.
-            spinner_text: The text to be displayed next to the spinner.
+            progress_text: The stage displayed by the progress reporter
+                           (e.g. "projects").
 
         Returns:
             (requests.models.Response object): The response from the server.
@@ -184,17 +564,21 @@ class RequestMaker(requests.Session):
             FetchInfoFailedException: 
 
         """
-        spinner_text = f"Fetching {spinner_text}..."
-        spinner = Halo(text = spinner_text, spinner = "dots")
-        spinner.start()
+        if (self.progress is not None) and (progress_text is not None):
+            self.progress.set_stage(f"Fetching {progress_text}")
         try:
             response = self.make_request_and_expect_200(uri)
         except FetchInfoFailedException as exc:
-            spinner.fail(text = spinner_text)
+            if self.progress is not None:
+                self.progress.request_failed()
             msg = str(exc)
             raise FetchInfoFailedException(stack()[0], msg) from exc
 
-        spinner.succeed(text = spinner_text)
+        if self.progress is not None:
+            compressed = response.headers.get("Content-Encoding", "") in ("gzip", "deflate")
+            self.progress.request_done(len(response.content),
+                                       wire_bytes = get_wire_bytes(response),
+                                       compressed = compressed)
         return response
 
     def validate_uri(self, uri):
@@ -212,3 +596,13 @@ class RequestMaker(requests.Session):
         if re.match(uri_pattern, uri):
             return True
         return False
+
+
+def _get_retry_after(response):
+    """Returns the value (in seconds) of the Retry-After header of a response,
+    or None if the header is missing or is not a number of seconds.
+    """
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
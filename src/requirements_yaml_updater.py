@@ -1,22 +1,40 @@
 """Updater for requirements.yaml file"""
 
 # Python Libraries
+from datetime import timedelta
 from inspect import stack
-import os
-import os.path
-import yaml
+import io
+import re
+import threading
 
 # Program Libraries
-from src.central_ci_api import CentralCIAPI
-from src.legacy_ci_api import LegacyCIAPI
+# CentralCIAPI, LegacyCIAPI (requests), yaml and the modules of the crawl
+# (concurrent.futures, src.spill, src.result_cache, src.tuning, ...) are imported
+# where they are first needed, so that offline runs and short invocations start fast.
 from src.constants import (
-    GITLAB1_URI
+    CRAWL_JOURNAL_FILE,
+    DEFAULT_PER_PAGE,
+    EXECUTION_LOG_FILE,
+    GITLAB1_URI,
+    HELM_V3_CHART_FILE,
+    OLD_YAML_FILE,
+    SEEK_DAYS_AFTER_BRANCH,
+    SEEK_DAYS_BEFORE_BRANCH
 )
 from src.exceptions import (
     BranchNotFoundException,
     FetchInfoFailedException
 )
+from src.progress import ProgressReporter
+from src.snapshot import (
+    read_snapshot,
+    write_snapshot
+)
+from src.tag_index import TagIndex
+from src.update_result import UpdateResult
 from src.utils import (
+    match_tag_with_title,
+    parse_gitlab_datetime,
     write_text_to_file
 )
 
@@ -33,9 +51,15 @@ MAP_DIFFERENT_NAMES = {
     "topology-routing-assistant" : "TopologyAndRoutingAssistant"
 }
 
+# Key of crawl_failures when the helm projects could not be listed at all.
+LISTING_FAILURE = "helm projects"
+
 class RequirementsYamlUpdater():
     """The RequirementsYamlUpdater is responsible for updating requirements.yaml file
     from /tas/kubernetes/helm/nokia-tas with the official tags related to the specified branch.
+
+    An other file (e.g. the requirements.yaml or the Helm v3 Chart.yaml of an other
+    umbrella chart) can be updated by specifying its project, path and filename.
     """
     default_project = "/tas/kubernetes"
     default_path = "/helm/nokia-tas"
@@ -49,15 +73,210 @@ class RequirementsYamlUpdater():
     # could not be updated.
     failed_update = {}
 
-    def __init__(self):
+    def __init__(self, progress = None, project = None, path = None, filename = None,
+                 output_filename = None):
         """Instantiates a RequirementsYamlUpdater object.
 
-        Creates a CentralCIAPI object to access Central CI.
-        Creates a LegacyCIAPI object to access Legacy CI.
+        The CentralCIAPI object (to access Central CI) and the LegacyCIAPI
+        object (to access Legacy CI) are created on first use and share
+        a single progress reporter.
+
+        Args:
+            progress(ProgressReporter): The progress reporter of the run
+                                        (a new one is created if not provided).
+            project(string): The project of the file to be updated
+                             (default is default_project).
+            path(string): The path of the file in the project (default is default_path).
+            filename(string): The name of the file (default is default_filename).
+            output_filename(string): The name of the local file where the updated
+                                     file is written (default is filename).
+
+        """
+        self.progress = progress if progress is not None else ProgressReporter()
+        self.default_project = project or self.default_project
+        self.default_path = path if path is not None else self.default_path
+        self.default_filename = filename or self.default_filename
+        self.output_filename = output_filename or self.default_filename
+        if self.output_filename == self.default_filename == RequirementsYamlUpdater.default_filename:
+            self.old_filename = OLD_YAML_FILE
+        else:
+            self.old_filename = "old_" + self.output_filename
+        self._central_ci_api = None
+        self._legacy_ci_api = None
+        self._api_lock = threading.Lock()
+        # RequestHedger shared by both APIs (None to disable hedging).
+        # Must be set before the APIs are first used.
+        self.hedger = None
+        # Deadline of the requests of both APIs (None for no deadline).
+        # Must be set before the APIs are first used.
+        self.deadline = None
+        # If True, both APIs use the HTTP/2 transport (when available).
+        # Must be set before the APIs are first used.
+        self.http2 = False
+        # Number of items per page of the listings of both APIs (None for the
+        # page size of each host in tuning, or DEFAULT_PER_PAGE).
+        # Must be set before the APIs are first used.
+        self.per_page = None
+        # Memory (in bytes) that the crawled tags may use before they
+        # are spilled to disk (None for no budget).
+        self.memory_budget = None
+        # Number of worker processes of the tag crawl (1 or None to crawl
+        # in this process).
+        self.workers = None
+        # Request settings of each host, found by autotune (see src.tuning).
+        # The settings set above take precedence.
+        # Must be set before the APIs are first used.
+        self.tuning = {}
+        # Timings of the shards of the last sharded crawl (see find_tags_of_projects_sharded).
+        self.shard_timings = None
+        # Groups of the helm projects (see src.sources).
+        from src.sources import DEFAULT_SOURCES
+        self.sources = DEFAULT_SOURCES
+        # Number of requests in flight at once across both APIs (None for no limit).
+        # Must be set before the APIs are first used.
+        self.concurrency = None
+        self._request_slots = None
+        # CassetteRecorder or CassettePlayer attached to both APIs
+        # (None to access gitlab without recording).
+        # Must be set before the APIs are first used.
+        self.cassette = None
+        # If True, the helm projects are discovered from the merge requests
+        # of ntas/helm whose title starts with the branch name, instead of
+        # crawling the tags of every helm project.
+        self.mr_discovery = False
+        # If True, a deep search fetches only the pages of the tags dated
+        # around the last commit of the target branch (see get_seek_window).
+        self.seek = False
+        # If True, the crawl is recorded to a journal and continues from the journal
+        # of an interrupted crawl with the same branch and parameters (see open_crawl_journal).
+        self.resume = False
+        # ResultCache of the results of previous runs (None to disable it).
+        self.result_cache = None
+        self.result_cache_key = None
+        # Crawled state, kept so that it can be exported to a snapshot
+        # or loaded from one (see export_snapshot and load_snapshot).
+        self.branch_info = None
+        self.requirements_text = None
+        self.helm_projects_with_tags = None
+        # Helm projects listed from gitlab (see list_helm_projects).
+        self.helm_projects_list = None
+        # All the helm projects of the sources (see list_all_helm_projects).
+        self._all_helm_projects = None
+        self._listing_lock = threading.Lock()
+        # Crawl started before the target branch is known (see start_speculative_crawl).
+        self._speculative_crawl = None
+        # Helm projects whose tags could not be fetched ({"name" : reason}).
+        self.crawl_failures = {}
+
+    @property
+    def central_ci_api(self):
+        """CentralCIAPI object to access Central CI (created on first use)."""
+        with self._api_lock:
+            if self._central_ci_api is None:
+                from src.central_ci_api import CentralCIAPI
+                self._central_ci_api = CentralCIAPI()
+                self._central_ci_api.set_progress_reporter(self.progress)
+                self._central_ci_api.set_hedger(self.hedger)
+                self._central_ci_api.set_deadline(self.deadline)
+                self.apply_request_settings(self._central_ci_api)
+                if self.http2:
+                    self._central_ci_api.enable_http2()
+                if self.cassette is not None:
+                    self.cassette.attach(self._central_ci_api)
+        return self._central_ci_api
+
+    @property
+    def legacy_ci_api(self):
+        """LegacyCIAPI object to access Legacy CI (created on first use)."""
+        with self._api_lock:
+            if self._legacy_ci_api is None:
+                from src.legacy_ci_api import LegacyCIAPI
+                self._legacy_ci_api = LegacyCIAPI()
+                self._legacy_ci_api.set_progress_reporter(self.progress)
+                self._legacy_ci_api.set_hedger(self.hedger)
+                self._legacy_ci_api.set_deadline(self.deadline)
+                self.apply_request_settings(self._legacy_ci_api)
+                if self.http2:
+                    self._legacy_ci_api.enable_http2()
+                if self.cassette is not None:
+                    self.cassette.attach(self._legacy_ci_api)
+        return self._legacy_ci_api
+
+    def apply_request_settings(self, api):
+        """Applies the request settings of the host of an API object: per_page,
+        or else DEFAULT_PER_PAGE (see get_per_page for the tag crawl), the
+        timeout and backoff factor of the host in tuning, and the limit of
+        the requests in flight (see get_concurrency). Must be called with
+        the API lock held.
+
+        Args:
+            api(GitlabAPI): The API object.
+
+        """
+        from src.tuning import get_host
+        host_settings = self.tuning.get(get_host(api.groups_uri), {})
+        api.set_per_page(self.per_page or DEFAULT_PER_PAGE)
+        if "timeout" in host_settings:
+            api.set_timeout(host_settings["timeout"])
+        if "backoff_factor" in host_settings:
+            api.set_backoff_factor(host_settings["backoff_factor"])
+        request_slots = self._get_request_slots()
+        if (request_slots is None) and ("concurrency" in host_settings):
+            # Not shared: the tuned concurrency is the limit of this host only.
+            request_slots = threading.Semaphore(int(host_settings["concurrency"]))
+        api.set_request_slots(request_slots)
+
+    def get_per_page(self, api, deep_search):
+        """Returns the page size of the tag crawl of the host of an API object:
+        per_page, or else (for a deep search) the page size of the host in tuning.
+        A shallow search fetches the first page of tags only, so its page size
+        is not tuned."""
+        if self.per_page is not None:
+            return self.per_page
+        if not deep_search:
+            return DEFAULT_PER_PAGE
+        from src.tuning import get_host
+        return int(self.tuning.get(get_host(api.groups_uri), {}).get("per_page",
+                                                                     DEFAULT_PER_PAGE))
+
+    def get_workers(self):
+        """Returns the number of worker processes of the tag crawl: workers, or 1.
+        The concurrency of the hosts in tuning limits the requests in flight
+        instead (see get_concurrency), as measured by autotune."""
+        return self.workers or 1
+
+    def get_concurrency(self, api):
+        """Returns the number of requests in flight at once to the host of an
+        API object: concurrency, or else the concurrency of the host in tuning
+        (None for no limit)."""
+        if self.concurrency is not None:
+            return self.concurrency
+        from src.tuning import get_host
+        concurrency = self.tuning.get(get_host(api.groups_uri), {}).get("concurrency")
+        return None if concurrency is None else int(concurrency)
+
+    def _get_request_slots(self):
+        """Returns the semaphore shared by both APIs (created on first use,
+        None if concurrency is not limited). Must be called with the API lock held."""
+        if (self.concurrency is not None) and (self._request_slots is None):
+            self._request_slots = threading.Semaphore(self.concurrency)
+        return self._request_slots
+
+    def share_session(self, other):
+        """Shares the gitlab sessions, the target branch and the crawled tags
+        of an other RequirementsYamlUpdater, so that they are not fetched again.
+        The failures of the crawl are not shared (each updater reports the
+        failures of the helm projects it references).
+
+        Args:
+            other(RequirementsYamlUpdater): The updater to share with.
 
         """
-        self.central_ci_api = CentralCIAPI()
-        self.legacy_ci_api = LegacyCIAPI()
+        self._central_ci_api = other.central_ci_api
+        self._legacy_ci_api = other.legacy_ci_api
+        self.target_branch = other.target_branch
+        self.branch_info = other.branch_info
+        self.helm_projects_with_tags = other.helm_projects_with_tags
 
     def get_branch(self):
         """Prompts user to specify the target branch of /tas/kubernetes project,
@@ -80,7 +299,9 @@ class RequirementsYamlUpdater():
 
         # If target_branch is not set, then prompt user to specify it.
         while (self.target_branch is None) or (self.target_branch == ""):
+            self.progress.pause()
             branch_input = input(message)
+            self.progress.resume()
 
             if branch_input == "":
                 print(error_message)
@@ -113,6 +334,7 @@ class RequirementsYamlUpdater():
             response = self.legacy_ci_api.get_branch_info(group, project, branch_input)
 
             if response["name"] == branch_input:
+                self.branch_info = response
                 return branch_input
             else:
                 name = response["name"]
@@ -132,13 +354,16 @@ class RequirementsYamlUpdater():
             raise BranchNotFoundException(stack()[0], branch_input, exc) \
                 from exc
 
-    def fetch_helm_tags(self, deep_search):
-        """Fetches tags of the helm projects from gitlab.
+    def fetch_helm_tags(self, deep_search, required_names = None):
+        """Fetches tags of the helm projects from gitlab. The sources
+        (see src.sources) are crawled concurrently.
         
         Args:
             deep_search(boolean): If true, all tags of the project will be
                                   fetched.
-                                  If False, only the last 50 tags will be fetched.
+                                  If False, only the last page of tags will be fetched.
+            required_names(dict): If provided, only the tags of these projects are
+                                  fetched (see get_required_project_names).
 
         Returns:
             helm_project_tags(list): A list with dictionaries containing:
@@ -146,24 +371,565 @@ class RequirementsYamlUpdater():
                                         - "id" : Project id,
                                         - "tags" : Project tags.
 
+        If resume is set, the crawl is checkpointed to a journal (see
+        open_crawl_journal), which is kept if the crawl is interrupted or the tags
+        of some projects could not be fetched, and removed once it completes.
+
         """
-        helm_group_id = self.central_ci_api.get_subgroup_id_from_name("ntas", "helm")
-        helm_projects_list = self.central_ci_api.get_projects_of_group(helm_group_id)
-        helm_projects_list = self.central_ci_api.extract_project_name_and_id(helm_projects_list)
-        helm_project_tags = self.central_ci_api.find_tags_of_projects(helm_projects_list,
-                                                                      deep_search)
+        helm_projects_list = self.list_helm_projects(required_names)
+        journal = self.open_crawl_journal(deep_search)
+        if journal is None:
+            return self.crawl_helm_tags(helm_projects_list, deep_search)
+
+        apis = [self.get_api(source["instance"]) for source in self.sources]
+        for api in apis:
+            api.set_journal(journal)
+        try:
+            helm_project_tags = self.crawl_helm_tags(helm_projects_list, deep_search)
+        except BaseException:
+            journal.close()
+            raise
+        finally:
+            for api in apis:
+                api.set_journal(None)
+        if self.crawl_failures:
+            # The tags of some projects could not be fetched, resuming retries them.
+            journal.close()
+        else:
+            journal.discard()
 
         return helm_project_tags
 
-    def fetch_requirements_file(self):
-        """Fetches requirements.yaml file from gitlab and saves it locally."""
+    def open_crawl_journal(self, deep_search):
+        """Opens the journal of the tag crawl (CRAWL_JOURNAL_FILE), if resume is
+        set (otherwise the crawl writes no file). If the journal of an interrupted
+        crawl has the same fingerprint (target branch and crawl parameters),
+        the crawl continues from it, otherwise a new journal is started.
+
+        Args:
+            deep_search(boolean): If true, all tags of the projects are fetched.
+
+        Returns:
+            (CrawlJournal): The journal, or None if resume is not set.
+
+        """
+        if not self.resume:
+            return None
+
+        from src.journal import CrawlJournal, get_fingerprint
+
+        fingerprint = get_fingerprint(branch = self.target_branch,
+                                      deep_search = deep_search,
+                                      per_page = [self.get_per_page(
+                                                      self.get_api(source["instance"]),
+                                                      deep_search)
+                                                  for source in self.sources],
+                                      window = self.get_seek_window(),
+                                      sources = self.sources)
+        return CrawlJournal(CRAWL_JOURNAL_FILE, fingerprint, resume = True)
+
+    def crawl_helm_tags(self, helm_projects_list, deep_search, stop = None):
+        """Fetches the tags of the helm projects of every source
+        (see fetch_helm_tags).
+
+        Args:
+            helm_projects_list(list): The helm projects (see list_helm_projects).
+            deep_search(boolean): If true, all tags of the projects will be fetched.
+            stop(Event): If provided, the crawl stops before the next project once it is set.
+
+        Returns:
+            helm_project_tags(list): The helm projects with their tags.
+
+        """
+
+        projects_of_sources = [[] for _ in self.sources]
+        for helm_project in helm_projects_list:
+            projects_of_sources[helm_project.get("source", 0)].append(helm_project)
+
+        if len(self.sources) == 1:
+            helm_project_tags, self.shard_timings = \
+                self.fetch_source_tags(0, projects_of_sources[0], deep_search,
+                                       self.memory_budget, stop)
+            return helm_project_tags
+
+        from concurrent.futures import ThreadPoolExecutor
+        from src.spill import SpillingList
+
+        # The memory budget is shared by the sources.
+        memory_budget = None
+        if self.memory_budget is not None:
+            memory_budget = self.memory_budget // len(self.sources)
+        with ThreadPoolExecutor(max_workers = len(self.sources)) as executor:
+            crawls = list(executor.map(
+                lambda index: self.fetch_source_tags(index, projects_of_sources[index],
+                                                     deep_search, memory_budget, stop),
+                range(len(self.sources))))
+
+        if self.memory_budget is None:
+            helm_project_tags = []
+        else:
+            helm_project_tags = SpillingList(self.memory_budget)
+        shard_timings = []
+        for source_tags, source_timings in crawls:
+            for helm_project in source_tags:
+                helm_project_tags.append(helm_project)
+            if isinstance(source_tags, SpillingList):
+                source_tags.close()
+            shard_timings.extend(source_timings or [])
+        self.shard_timings = shard_timings or None
+
+        return helm_project_tags
+
+    def start_speculative_crawl(self, deep_search):
+        """Starts crawling the tags of all the helm projects in a background
+        thread, so that the crawl goes on while the user is prompted for the
+        target branch (see get_branch). Its result is used by get_changed_tags.
+
+        The crawl is not started if it depends on the target branch
+        (mr_discovery or seek), if resume is set (the journal
+        depends on the target branch) or if a cassette is attached (the recorded
+        requests must not depend on the speculation). It is stopped by
+        cancel_speculative_crawl if its result is not needed.
+
+        Args:
+            deep_search(boolean): If true, all tags of the projects will be fetched.
+
+        Returns:
+            (boolean): True if the crawl was started.
+
+        """
+        if self.mr_discovery or self.seek or self.resume or \
+           (self.cassette is not None):
+            return False
+
+        crawl = {"deep_search" : deep_search, "tags" : None, "error" : None,
+                 "stop" : threading.Event()}
+
+        def run_crawl():
+            try:
+                crawl["tags"] = self.crawl_helm_tags(self.list_all_helm_projects(), deep_search,
+                                                     crawl["stop"])
+            except Exception as exc:
+                crawl["error"] = exc
+
+        # A daemon thread does not keep the program running if the user
+        # interrupts the prompt.
+        crawl["thread"] = threading.Thread(target = run_crawl, name = "speculative-crawl",
+                                           daemon = True)
+        self._speculative_crawl = crawl
+        crawl["thread"].start()
+        write_text_to_file("Speculative crawl of the helm tags started.\n",
+                           EXECUTION_LOG_FILE, mode = "a")
+        return True
+
+    def take_speculative_crawl(self, deep_search, required_names = None):
+        """Waits for the crawl started by start_speculative_crawl and returns
+        its result, reduced to the required helm projects.
+
+        Args:
+            deep_search(boolean): The deep_search flag of the run.
+            required_names(dict): If provided, only the tags of these projects are
+                                  returned (see get_required_project_names).
+
+        Returns:
+            helm_project_tags(list): The helm projects with their tags (see
+                                     fetch_helm_tags), or None if no crawl was
+                                     started or it failed (the tags must be
+                                     fetched with fetch_helm_tags).
+
+        """
+        crawl = self._speculative_crawl
+        self._speculative_crawl = None
+        if (crawl is None) or (crawl["deep_search"] != deep_search):
+            return None
+
+        crawl["thread"].join()
+        if crawl["error"] is not None:
+            # The crawl is run again, it reports the failure if it persists.
+            write_text_to_file(f"Speculative crawl failed: {crawl['error']}\n",
+                               EXECUTION_LOG_FILE, mode = "a")
+            self.crawl_failures.clear()
+            return None
+
+        from src.spill import SpillingList
+
+        names = {helm_project["name"] for helm_project in self.list_helm_projects(required_names)}
+        if self.memory_budget is None:
+            helm_project_tags = []
+        else:
+            helm_project_tags = SpillingList(self.memory_budget)
+        for helm_project in crawl["tags"]:
+            if helm_project["name"] in names:
+                helm_project_tags.append(helm_project)
+        if isinstance(crawl["tags"], SpillingList):
+            crawl["tags"].close()
+        for name in list(self.crawl_failures):
+            if name not in names:
+                del self.crawl_failures[name]
+
+        write_text_to_file("Speculative crawl of the helm tags used.\n",
+                           EXECUTION_LOG_FILE, mode = "a")
+        return helm_project_tags
+
+    def cancel_speculative_crawl(self):
+        """Stops the crawl started by start_speculative_crawl (before its next
+        project) and waits for it, when its result is not needed (e.g. the
+        result of the run was cached).
+
+        """
+        crawl = self._speculative_crawl
+        self._speculative_crawl = None
+        if crawl is None:
+            return
+
+        from src.spill import SpillingList
+
+        crawl["stop"].set()
+        crawl["thread"].join()
+        self.crawl_failures.clear()
+        if isinstance(crawl["tags"], SpillingList):
+            crawl["tags"].close()
+        write_text_to_file("Speculative crawl of the helm tags cancelled.\n",
+                           EXECUTION_LOG_FILE, mode = "a")
+
+    def fetch_source_tags(self, source_index, helm_projects_list, deep_search, memory_budget,
+                          stop = None):
+        """Fetches the tags of the helm projects of a source, most recently
+        active first (see prioritize_helm_projects).
+
+        Args:
+            source_index(int): The index of the source in sources.
+            helm_projects_list(list): The helm projects of the source (as returned by gitlab).
+            deep_search(boolean): If true, all tags of the projects will be fetched.
+            memory_budget(int): The memory (in bytes) that the tags of the source
+                                may use before they are spilled to disk (None for no budget).
+            stop(Event): If provided, the crawl stops before the next project once it is set.
+
+        Returns:
+            helm_project_tags(list or SpillingList): The helm projects with their tags
+                                                     (see fetch_helm_tags).
+            shard_timings(list): The timings of the shards (None if the crawl
+                                 was not sharded).
+
+        """
+        api = self.get_api(self.sources[source_index]["instance"])
+        api.set_per_page(self.get_per_page(api, deep_search))
+        helm_projects_list = api.extract_project_name_and_id(helm_projects_list)
+        helm_projects_list = self.prioritize_helm_projects(helm_projects_list)
+        # A project whose tags cannot be fetched (e.g. the host is degraded)
+        # does not stop the crawl, it is reported in failed_update.
+        # A stoppable (speculative) crawl is not sharded: it runs in a thread while
+        # the main thread waits on the prompt, and a process forked then deadlocks
+        # on the lock of stdin.
+        workers = self.get_workers()
+        if self.concurrency is not None:
+            # The worker processes do not share the request slots: each source
+            # gets its share of the requests in flight, one per worker.
+            workers = min(workers, max(self.concurrency // len(self.sources), 1))
+        if (workers > 1) and (self.cassette is None) and (len(helm_projects_list) > 1) and \
+           (stop is None):
+            from src.sharded_crawl import find_tags_of_projects_sharded
+            settings = {
+                "instance" : self.sources[source_index]["instance"],
+                "per_page" : api.per_page,
+                "timeout" : api.timeout,
+                "backoff_factor" : api.retry_policy.base_delay,
+                "http2" : self.http2,
+                "deadline" : None if self.deadline is None else self.deadline.remaining(),
+                "window" : self.get_seek_window()
+            }
+            return find_tags_of_projects_sharded(helm_projects_list, workers, deep_search,
+                                                 self.crawl_failures, memory_budget,
+                                                 self.progress, settings, api)
+
+        helm_project_tags = api.find_tags_of_projects(helm_projects_list, deep_search,
+                                                      self.crawl_failures, memory_budget,
+                                                      self.get_seek_window(), stop)
+        return helm_project_tags, None
+
+    def get_seek_window(self):
+        """Returns the window of the dates of the tags fetched by a deep search
+        if seek is set: from SEEK_DAYS_BEFORE_BRANCH days before the last commit
+        of the target branch to SEEK_DAYS_AFTER_BRANCH days after it.
+
+        Returns:
+            (tuple): The newest and the oldest date (None if seek is not set
+                     or the date of the branch is unknown).
+
+        """
+        if (not self.seek) or (self.branch_info is None):
+            return None
+        branch_date = parse_gitlab_datetime(
+            self.branch_info.get("commit", {}).get("committed_date"))
+        if branch_date is None:
+            return None
+        return (branch_date + timedelta(days = SEEK_DAYS_AFTER_BRANCH),
+                branch_date - timedelta(days = SEEK_DAYS_BEFORE_BRANCH))
+
+    def get_api(self, instance):
+        """Returns the API object of a gitlab instance ("central" or "legacy")."""
+        from src.sources import LEGACY
+        if instance == LEGACY:
+            return self.legacy_ci_api
+        return self.central_ci_api
+
+    def list_helm_projects(self, required_names = None):
+        """Lists the helm projects of every source from gitlab (concurrently).
+        The list is kept, so the projects are listed once per run.
+
+        Args:
+            required_names(dict): If provided, only these projects are kept
+                                  (see get_required_project_names).
+
+        Returns:
+            helm_projects_list(list): A list with dictionaries containing info
+                                      about the helm projects (as returned by gitlab)
+                                      and "source" : The index of their source.
+
+        """
+        if self.helm_projects_list is None:
+            helm_projects_list = self.list_all_helm_projects()
+            if required_names is not None:
+                helm_projects_list = self.select_required_projects(helm_projects_list,
+                                                                   required_names)
+            self.helm_projects_list = helm_projects_list
+
+        return self.helm_projects_list
+
+    def list_all_helm_projects(self):
+        """Lists all the helm projects of every source from gitlab (concurrently).
+        The list is kept, and it is listed once even if a speculative crawl
+        (see start_speculative_crawl) needs it at the same time.
+
+        Returns:
+            helm_projects_list(list): The helm projects (see list_helm_projects).
+
+        """
+        with self._listing_lock:
+            if self._all_helm_projects is None:
+                if len(self.sources) == 1:
+                    listings = [self.list_source_projects(self.sources[0])]
+                else:
+                    from concurrent.futures import ThreadPoolExecutor
+                    with ThreadPoolExecutor(max_workers = len(self.sources)) as executor:
+                        listings = list(executor.map(self.list_source_projects, self.sources))
+                self._all_helm_projects = self.merge_source_projects(listings)
+            return self._all_helm_projects
+
+    def list_source_projects(self, source):
+        """Lists the helm projects of a source from gitlab.
+
+        Args:
+            source(dict): The source (see src.sources.load_sources).
+
+        Returns:
+            (list): A list with dictionaries containing info about the helm
+                    projects (as returned by gitlab).
+
+        """
+        api = self.get_api(source["instance"])
+        group_id = api.get_group_id_from_path(source["group"])
+        if self.mr_discovery:
+            return self.discover_helm_projects(api, group_id)
+        return api.get_projects_of_group(group_id)
+
+    def merge_source_projects(self, listings):
+        """Merges the helm projects of the sources. When a project name is found
+        in several sources, the project of the first source is kept and the
+        others are listed in the execution log.
+
+        Args:
+            listings(list): The helm projects of each source (in the order of sources).
+
+        Returns:
+            helm_projects_list(list): The merged list, each project with
+                                      "source" : The index of its source.
+
+        """
+        from src.sources import get_source_name
+
+        helm_projects_list = []
+        source_of_name = {}
+        collisions = []
+
+        for source_index, listing in enumerate(listings):
+            for helm_project in listing:
+                name = helm_project["name"]
+                if source_of_name.setdefault(name, source_index) != source_index:
+                    collisions.append(f"{name} of {get_source_name(self.sources[source_index])}" +\
+                        f" (kept from {get_source_name(self.sources[source_of_name[name]])})")
+                    continue
+                helm_projects_list.append({**helm_project, "source" : source_index})
+
+        if collisions:
+            msg = "Helm projects found in several sources, ignored: " +\
+                ", ".join(collisions) + "\n"
+            write_text_to_file(msg, EXECUTION_LOG_FILE, mode = "a")
+        return helm_projects_list
+
+    def prioritize_helm_projects(self, helm_projects_list):
+        """Orders the helm projects by last activity (most recent first), so that
+        the projects related to the branch are crawled early (e.g. before the
+        deadline passes).
+
+        Args:
+            helm_projects_list(list): A list with dictionaries containing
+                                      (at least):
+                                        - "name" : Project name,
+                                        - "last_activity_at" : Last activity
+                                                               (None if unknown).
+
+        Returns:
+            helm_projects_list(list): The ordered list.
+
+        """
+        activity = {}
+        for helm_project in helm_projects_list:
+            activity[helm_project["name"]] = \
+                parse_gitlab_datetime(helm_project.get("last_activity_at"))
+
+        def recency(helm_project):
+            # Projects with an unknown activity are crawled last.
+            last_activity = activity[helm_project["name"]]
+            return float("-inf") if last_activity is None else last_activity.timestamp()
+
+        return sorted(helm_projects_list, key = recency, reverse = True)
+
+    def discover_helm_projects(self, api, helm_group_id):
+        """Finds the helm projects with a merge request whose title starts
+        with the title keyword (see get_title_keyword), with a single listing
+        of the merge requests of the group. Closed merge requests are ignored.
+        Their tags are still verified by find_projects_related_with_branch.
+
+        Args:
+            api(GitlabAPI): The API object of the gitlab instance of the group.
+            helm_group_id(int): The id of the group of the helm projects.
+
+        Returns:
+            helm_projects_list(list): A list with dictionaries containing info
+                                      about the helm projects (as returned by gitlab).
+
+        """
+        keyword = self.get_title_keyword()
+        merge_requests = api.get_merge_requests_of_group(helm_group_id, keyword)
+        # The search matches the keyword anywhere in the title.
+        project_ids = []
+        for merge_request in merge_requests:
+            if merge_request.get("state") == "closed" or \
+               not merge_request["title"].lower().startswith(keyword.lower()):
+                continue
+            if merge_request["project_id"] not in project_ids:
+                project_ids.append(merge_request["project_id"])
+
+        helm_projects_list = [api.get_project_from_project_id(project_id)
+                              for project_id in project_ids]
+
+        msg = f"Merge request discovery: {len(merge_requests)} merge requests, " +\
+            f"{len(helm_projects_list)} helm projects.\n"
+        write_text_to_file(msg, EXECUTION_LOG_FILE, mode = "a")
+        return helm_projects_list
+
+    def get_required_project_names(self):
+        """Finds the helm projects referenced by the dependencies of the
+        requirements.yaml file, using MAP_DIFFERENT_NAMES.
+
+        Returns:
+            required_names(dict): A dictionary of the form
+                                  {"project-name" : "name-in-yaml-file"},
+                                  project names are without the "helm-" prefix.
+
+        """
+        import yaml
+
+        yaml_object = yaml.safe_load(self.requirements_text) or {}
+
+        required_names = {}
+        for dependency in yaml_object.get("dependencies") or []:
+            name = dependency.get("name")
+            if name is None:
+                continue
+            required_names[MAP_DIFFERENT_NAMES.get(name, name)] = name
+
+        return required_names
+
+    def select_required_projects(self, helm_projects_list, required_names):
+        """Keeps only the helm projects referenced by requirements.yaml and
+        reports the dependencies that do not match any helm project.
+
+        Args:
+            helm_projects_list(list): A list with dictionaries containing
+                                      (at least):
+                                        - "name" : Project name.
+            required_names(dict): The referenced projects (see get_required_project_names).
+
+        Returns:
+            required_projects(list): The helm projects referenced by requirements.yaml.
+
+        """
+        required_projects = []
+        found_names = set()
+
+        for helm_project in helm_projects_list:
+            name = self.strip_helm_prefix(helm_project["name"])
+            if name in required_names:
+                required_projects.append(helm_project)
+                found_names.add(name)
+
+        missing = sorted(dependency for name, dependency in required_names.items()
+                         if name not in found_names)
+        if missing:
+            msg = "\nDependencies without a matching helm project " +\
+                "(their version is kept as is):\n" + ", ".join(missing) + "\n"
+            self.progress.pause()
+            print(msg)
+            self.progress.resume()
+            write_text_to_file(msg, EXECUTION_LOG_FILE, mode = "a")
+
+        return required_projects
+
+    def fetch_requirements_file(self, save = True):
+        """Fetches requirements.yaml file from gitlab (to requirements_text).
+
+        Args:
+            save(boolean): If True, the fetched file is also saved locally
+                           (to output_filename).
+
+        """
 
         uri = self.yaml_uri.format(project = self.default_project,
                                    branch = self.target_branch,
                                    path = self.default_path,
                                    filename = self.default_filename)
         response = self.legacy_ci_api.make_request_and_expect_200(uri)
-        write_text_to_file(str(response.text), self.default_filename, mode = "w")
+        self.requirements_text = str(response.text)
+        if save:
+            write_text_to_file(self.requirements_text, self.output_filename, mode = "w")
+
+    def update(self, deep_search = False):
+        """Updates the tags of the file in memory: fetches the file, crawls
+        the tags, updates them and renders the updated file, without writing
+        any file (see UpdateResult.write).
+
+        target_branch must be set, the user is not prompted for it.
+
+        Args:
+            deep_search(boolean): If true, all tags of the helm projects will be fetched.
+
+        Returns:
+            (UpdateResult): The updated file and the helm projects whose
+                            tag could not be updated.
+
+        Raises:
+            BranchNotFoundException: If target_branch is not an existing branch.
+            FetchInfoFailedException: If the file or the helm projects could not be fetched.
+
+        """
+        self.verify_branch_exists(self.target_branch)
+        self.fetch_requirements_file(save = False)
+        helm_projects_with_changed_tag = self.get_changed_tags(deep_search)
+        yaml_object = self.update_helm_tags(helm_projects_with_changed_tag)
+        return UpdateResult(self.render_yaml(yaml_object), self.failed_update,
+                            self.output_filename)
 
     def get_changed_tags(self, deep_search = False):
         """Finds which tags have changed in the target branch.
@@ -171,7 +937,7 @@ class RequirementsYamlUpdater():
         Args:
             deep_search(boolean): If true, all tags of the project will be
                                     checked.
-                                    If False, only the last 50 tags will be checked.
+                                    If False, only the last page of tags will be checked.
             
         Returns:
             helm_projects_with_changed_tag(list): A list with dictionaries containing:
@@ -183,54 +949,75 @@ class RequirementsYamlUpdater():
 
 
         helm_projects_with_changed_tag = []
-        
-        helm_projects_with_tags = self.fetch_helm_tags(deep_search)
 
-        helm_projects_with_changed_tag = self.find_projects_related_with_branch(helm_projects_with_tags)
+        # The tags may have already been loaded from a snapshot.
+        if self.helm_projects_with_tags is None:
+            self.helm_projects_with_tags = \
+                self.get_helm_tags(deep_search, self.get_required_project_names())
+
+        helm_projects_with_changed_tag = \
+            self.find_projects_related_with_branch(self.helm_projects_with_tags)
 
         # for helm_project in helm_projects_with_changed_tag:
         #     helm_project["changed-tag"] = self.get_simple_tag(helm_project["tags"])
 
         return helm_projects_with_changed_tag
 
+    def get_helm_tags(self, deep_search, required_names = None):
+        """Returns the tags of the helm projects: the result of the crawl started
+        while the user was prompted for the branch (see take_speculative_crawl),
+        or else fetch_helm_tags. If the deadline passes before the helm projects
+        are listed, no tag is returned and the failure is kept in crawl_failures,
+        so that the file is still written.
+
+        Args:
+            deep_search(boolean): If true, all tags of the projects will be fetched.
+            required_names(dict): If provided, only the tags of these projects are
+                                  fetched (see get_required_project_names).
+
+        Returns:
+            helm_project_tags(list): The helm projects with their tags (see fetch_helm_tags).
+
+        """
+        helm_project_tags = self.take_speculative_crawl(deep_search, required_names)
+        if helm_project_tags is not None:
+            return helm_project_tags
+
+        try:
+            return self.fetch_helm_tags(deep_search, required_names)
+        except FetchInfoFailedException as exc:
+            if (self.deadline is None) or not self.deadline.expired():
+                raise
+            # Out of time before the helm projects were listed:
+            # no tag is updated, but the file is still written.
+            self.crawl_failures[LISTING_FAILURE] = \
+                f"Not listed: the deadline has passed ({exc.msg.strip()})"
+            return []
+
     def get_simple_tag(self, tags_list):
-        """Selects one tag from the tags_list:
+        """Selects one tag from the tags_list: the latest semantic version
+        (see TagIndex). "X.Y.Z" and "vX.Y.Z" count as one tag, "X.Y.Z" is returned.
             
         Args:
             tags_list(list): A list containing tags.
 
         Returns:
             - First tag of the list : If tags_list contains only one tag,
-            - "X.Y.Z" : If tags_list contains two tags, tag-1 = "X.Y.Z" and
-              tag-2 = "vX.Y.Z",
+            - The tag with the highest version : Otherwise.
         
         Raises:
-            AssertionError:
-                - If tags_list contains more than two tags,
-                - If tags_list has two elements, but tag-1 = "X.Y.Z" and 
-                  tag-2 = "vU.V.W"
+            AssertionError: If tags_list contains several tags and none of them
+                            is a semantic version.
 
         """
-        simple_tag = ""
-        v_tag = ""
-
-        if len(tags_list) > 2:
-            raise AssertionError
-
-        if len(tags_list) == 1:
+        if len(set(tags_list)) == 1:
             return tags_list[0]
 
-        if tags_list[0][0] == "v":
-            v_tag = tags_list[0]
-            simple_tag = tags_list[1]
-        elif tags_list[1][0] == "v":
-            v_tag = tags_list[1]
-            simple_tag = tags_list[0]
-
-        if (v_tag[1:] != simple_tag) or (simple_tag == ""):
+        latest_tag = TagIndex(tags_list).latest()
+        if latest_tag is None:
             raise AssertionError
 
-        return simple_tag
+        return latest_tag
 
     def update_helm_tags(self, helm_projects_with_changed_tag):
         """Creates a yaml object (dictionary) from requirements.yaml file
@@ -246,8 +1033,9 @@ class RequirementsYamlUpdater():
             yaml_object(dictionary): The yaml object with the new tags.
         
         """
-        with open(self.default_filename, "r", encoding = "utf-8") as yaml_stream:
-            yaml_object = yaml.safe_load(yaml_stream)
+        import yaml
+
+        yaml_object = yaml.safe_load(self.requirements_text)
 
         # Transform the json object "helm_projects_with_changed_tag"
         # into a dict of the form: {'helm-name-1' : 'tag-1',
@@ -272,7 +1060,7 @@ class RequirementsYamlUpdater():
                 tags_list = helm_projects_with_changed_tag[name]
                 new_tag = self.get_simple_tag(tags_list)
 
-                if yaml_helm_repo["version"].split("-")[1] == "ntas":
+                if str(yaml_helm_repo["version"]).split("-")[1:2] == ["ntas"]:
                     yaml_helm_repo["version"] = new_tag + "-ntas"
                 else:
                     yaml_helm_repo["version"] = new_tag
@@ -283,6 +1071,7 @@ class RequirementsYamlUpdater():
                 continue
 
         self.failed_update = helm_projects_with_changed_tag
+        self.failed_update.update(self.crawl_failures)
 
         return yaml_object
 
@@ -304,20 +1093,30 @@ class RequirementsYamlUpdater():
         """
         related_projects = []
         tags_related_to_branch = None
+        keyword = self.get_title_keyword()
 
         for helm_project in helm_projects_list_with_tags:
             tags = helm_project["tags"]
-            # TODO : REMOVE LINES 312 AND 313 AND REPLACE UNCOMMENT THE FOLLOWING LINE WHEN READY
-            # tags_related_to_branch = self.central_ci_api.match_tag_with_title(tags, self.target_branch)
-            override_branch_name = "Update helm-common version to use new zts_BRM_labels"
-            tags_related_to_branch = self.central_ci_api.match_tag_with_title(tags, override_branch_name)
+            tags_related_to_branch = match_tag_with_title(tags, keyword)
 
             if len(tags_related_to_branch) > 0:
-                helm_project["tags"] = tags_related_to_branch
-                related_projects.append(helm_project)
+                # A new dictionary is created so that the crawled tags are kept intact.
+                related_projects.append({**helm_project, "tags" : tags_related_to_branch})
 
         return related_projects
 
+    def get_title_keyword(self):
+        """Returns the keyword that the titles of the tags (and merge requests)
+        related to the target branch start with.
+
+        Returns:
+            (string): The keyword.
+
+        """
+        # TODO : RETURN self.target_branch WHEN READY
+        override_branch_name = "Update helm-common version to use new zts_BRM_labels"
+        return override_branch_name
+
     def transform_list_of_dicts_to_single_kv_pair_dict(self, _list, key_for_key, key_for_value):
         """Transforms a list with dictionaries with multiple key-value pairs to a dict 
         whose keys will be the values of key_for_key paired with the values of key_for_value.
@@ -378,20 +1177,46 @@ class RequirementsYamlUpdater():
         helm_projects = {}
         
         for helm_project_name in helm_projects_dict.keys():
-            if helm_project_name.split("-")[0] == "helm":
-                new_name = helm_project_name[5:]
-            else:
-                new_name = helm_project_name
+            new_name = self.strip_helm_prefix(helm_project_name)
             helm_projects[new_name] = helm_projects_dict[helm_project_name]
         
         return helm_projects
 
+    def strip_helm_prefix(self, helm_project_name):
+        """Removes "helm-" prefix from a project name (if it has one).
+
+        Args:
+            helm_project_name(string): The name of the project.
+
+        Returns:
+            (string): The name without the "helm-" prefix.
+
+        """
+        if helm_project_name.split("-")[0] == "helm":
+            return helm_project_name[5:]
+        return helm_project_name
+
     def write_yaml_to_file(self, yaml_object):
-        """Writes yaml object to requirements.yaml file.
-        
+        """Writes yaml object to requirements.yaml file (see render_yaml).
+        The fetched file is kept in old_filename.
+
         Args:
             yaml_object(dictionary): The yaml object to be written.
 
+        """
+        content = self.render_yaml(yaml_object)
+        write_text_to_file(self.requirements_text, self.old_filename, mode = "w")
+        write_text_to_file(content, self.output_filename, mode = "w")
+
+    def render_yaml(self, yaml_object):
+        """Renders yaml object as the content of the updated file.
+
+        Args:
+            yaml_object(dictionary): The yaml object to be rendered.
+
+        Returns:
+            (string): The content of the updated file.
+
         """
 
         # PyYaml's dumper could not be used because:
@@ -400,51 +1225,105 @@ class RequirementsYamlUpdater():
             # (c) The json objects present in yaml file were converted
             #     in yaml notation.
 
+        if self.default_filename == HELM_V3_CHART_FILE:
+            # Chart.yaml contains other fields besides dependencies.
+            return self.render_chart_yaml(yaml_object)
+
         comments_dict = self.find_comments()
         line_counter = 1
-
-        os.rename(self.default_filename, "old.yaml")
-
-        write_text_to_file("dependencies:\n", self.default_filename, mode = "w")
+        lines = ["dependencies:\n"]
         line_counter += 1
 
         for element in yaml_object["dependencies"]:
             if line_counter in comments_dict.keys():
-                write_text_to_file(comments_dict[line_counter], self.default_filename, mode = "a")
+                lines.append(comments_dict[line_counter])
                 line_counter += 1
 
             name = element["name"]
             version = element["version"]
             repository = element["repository"]
 
-            write_text_to_file(f"  - name: {name}\n",
-                               self.default_filename, mode = "a")
+            lines.append(f"  - name: {name}\n")
             line_counter += 1
-            write_text_to_file(f"    version: {version}\n",
-                               self.default_filename, mode = "a")
+            lines.append(f"    version: {version}\n")
             line_counter += 1
-            write_text_to_file(f"    repository: {repository}\n",
-                               self.default_filename, mode = "a")
+            lines.append(f"    repository: {repository}\n")
             line_counter += 1
 
             if "alias" in element.keys():
                 alias = element["alias"]
-                write_text_to_file(f"    alias: {alias}\n",
-                                   self.default_filename, mode = "a")
+                lines.append(f"    alias: {alias}\n")
                 line_counter += 1
 
             if "condition" in element.keys():
                 condition = element["condition"]
-                write_text_to_file(f"    condition: {condition}\n",
-                                   self.default_filename, mode = "a")
+                lines.append(f"    condition: {condition}\n")
                 line_counter += 1
 
             if "metadata" in element.keys():
                 metadata = element["metadata"]
-                write_text_to_file(f"    metadata: {metadata}\n",
-                                   self.default_filename, mode = "a")
+                lines.append(f"    metadata: {metadata}\n")
                 line_counter += 1
 
+        return "".join(lines)
+
+    def render_chart_yaml(self, yaml_object):
+        """Renders yaml object as a Helm v3 Chart.yaml file.
+        Only the "version" lines of the dependencies that have changed are replaced,
+        every other line of the fetched file is kept as is.
+
+        Args:
+            yaml_object(dictionary): The yaml object to be rendered.
+
+        Returns:
+            (string): The content of the updated file.
+
+        """
+        lines = self.get_requirements_lines()
+
+        dependencies = yaml_object.get("dependencies") or []
+        in_dependencies = False
+        # Indentation of the "-" of each dependency (nested lists are indented deeper)
+        # and of the keys of each dependency (nested keys are indented deeper).
+        item_indent = None
+        key_indent = None
+        index = -1
+
+        for line_number, line in enumerate(lines):
+            stripped = line.strip()
+
+            if stripped == "" or stripped.startswith("#"):
+                continue
+
+            # A top-level key starts or ends the dependencies block.
+            if not line[0].isspace() and not stripped.startswith("-"):
+                in_dependencies = stripped.startswith("dependencies:")
+                continue
+
+            if not in_dependencies:
+                continue
+
+            dash = re.match(r"^(\s*)-\s+", line)
+            if dash is not None:
+                if item_indent is None:
+                    item_indent = len(dash.group(1))
+                if len(dash.group(1)) == item_indent:
+                    index += 1
+                    key_indent = len(dash.group(0))
+
+            match = re.match(r"^(\s*(?:-\s+)?version:\s*)(['\"]?)([^'\"#\s]*)\2(.*)$", line)
+            if (match is None) or not (0 <= index < len(dependencies)):
+                continue
+            if match.group(1).index("version") != key_indent:
+                continue
+
+            prefix, quote, version, rest = match.groups()
+            new_version = str(dependencies[index]["version"])
+            if new_version != version:
+                lines[line_number] = f"{prefix}{quote}{new_version}{quote}{rest}\n"
+
+        return "".join(lines)
+
     def find_comments(self):
         """Finds the lines which start with a "#" in requirements.yaml file.
 
@@ -457,10 +1336,149 @@ class RequirementsYamlUpdater():
         comments_dict = {}
         line_counter = 1
 
-        with open(self.default_filename, "r", encoding = "utf-8") as yaml_stream:
-            for line in yaml_stream.readlines():
-                if line[0].strip() == "#":
-                    comments_dict[line_counter] = line
-                line_counter += 1
+        for line in self.get_requirements_lines():
+            if line[0].strip() == "#":
+                comments_dict[line_counter] = line
+            line_counter += 1
 
         return comments_dict
+
+    def get_requirements_lines(self):
+        """Returns the lines of the fetched file (with "\\n" line endings)."""
+        return io.StringIO(self.requirements_text, newline = None).readlines()
+
+    def get_result_cache_key(self, deep_search):
+        """Computes the key of the result of the run in the result cache, from
+        the target branch, the fetched file and the newest tag (name and commit)
+        of each helm project referenced by it, fetched with one request per project.
+        The last activity of the projects is not used: gitlab updates it at most
+        hourly, so it may not change when a tag is pushed.
+
+        Args:
+            deep_search(boolean): The deep_search flag of the run.
+
+        Returns:
+            (string): The key.
+
+        Raises:
+            FetchInfoFailedException: If the newest tag of a project cannot be fetched.
+
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        import hashlib
+        from src.result_cache import ResultCache
+
+        def get_tag_stamp(helm_project):
+            api = self.get_api(self.sources[helm_project.get("source", 0)]["instance"])
+            tag = api.get_newest_tag(helm_project["id"]) or {}
+            return [helm_project["name"], helm_project.get("source", 0), helm_project["id"],
+                    tag.get("name"), (tag.get("commit") or {}).get("id")]
+
+        helm_projects_list = self.list_helm_projects(self.get_required_project_names())
+        # The requests in flight are limited by the request slots of the APIs.
+        workers = max(self.get_concurrency(self.get_api(source["instance"])) or 1
+                      for source in self.sources)
+        with ThreadPoolExecutor(max_workers = workers) as executor:
+            tags_stamp = list(executor.map(get_tag_stamp, helm_projects_list))
+
+        # The seek window depends on the last commit of the branch.
+        branch_date = None
+        if self.seek and (self.branch_info is not None):
+            branch_date = self.branch_info.get("commit", {}).get("committed_date")
+
+        requirements_hash = hashlib.sha256(self.requirements_text.encode("utf-8")).hexdigest()
+        return ResultCache.make_key(branch = self.target_branch,
+                                    filename = self.default_filename,
+                                    requirements = requirements_hash,
+                                    deep_search = deep_search,
+                                    per_page = self.per_page,
+                                    sources = self.sources,
+                                    mr_discovery = self.mr_discovery,
+                                    seek = self.seek,
+                                    branch_date = branch_date,
+                                    tags = sorted(tags_stamp))
+
+    def load_cached_result(self, deep_search):
+        """Writes the result of a previous run with the same inputs (see
+        get_result_cache_key) to the output file, instead of updating the tags.
+
+        Args:
+            deep_search(boolean): The deep_search flag of the run.
+
+        Returns:
+            (boolean): True if a cached result was used.
+
+        """
+        if self.result_cache is None:
+            return False
+
+        try:
+            self.result_cache_key = self.get_result_cache_key(deep_search)
+        except FetchInfoFailedException:
+            # The crawl will retry to list the projects (and report the failure).
+            return False
+        result = self.result_cache.get(self.result_cache_key)
+        if result is None:
+            return False
+        self.cancel_speculative_crawl()
+
+        write_text_to_file(self.requirements_text, self.old_filename, mode = "w")
+        write_text_to_file(result["output"], self.output_filename, mode = "w")
+        self.failed_update = result["failed"]
+        write_text_to_file(f"Result cache hit ({self.result_cache_key}), tags not crawled.\n",
+                           EXECUTION_LOG_FILE, mode = "a")
+        return True
+
+    def store_cached_result(self):
+        """Stores the result of the run in the result cache (see load_cached_result).
+        Results with projects whose tags could not be fetched are not stored.
+
+        """
+        if (self.result_cache is None) or (self.result_cache_key is None) or \
+           self.crawl_failures:
+            return
+
+        with open(self.output_filename, "r", encoding = "utf-8") as output_stream:
+            output = output_stream.read()
+        self.result_cache.put(self.result_cache_key, output, self.failed_update)
+
+    def export_snapshot(self, path, deep_search):
+        """Exports the crawled state (branch info, requirements.yaml file and
+        helm projects with their tags) to a snapshot file.
+
+        Args:
+            path(string): The path of the snapshot file.
+            deep_search(boolean): The deep_search flag used for the crawl.
+
+        """
+        write_snapshot(path, {
+            "branch" : self.target_branch,
+            "deep_search" : deep_search,
+            "branch_info" : self.branch_info,
+            "requirements" : self.requirements_text,
+            "projects" : self.helm_projects_with_tags or []
+        })
+
+    def load_snapshot(self, path):
+        """Loads the crawled state from a snapshot file, so that the tags can
+        be updated without accessing gitlab.
+
+        Args:
+            path(string): The path of the snapshot file.
+
+        Returns:
+            (boolean): The deep_search flag used for the crawl of the snapshot.
+
+        Raises:
+            SnapshotException: If the snapshot could not be loaded.
+
+        """
+        snapshot = read_snapshot(path)
+
+        self.target_branch = snapshot["branch"]
+        self.branch_info = snapshot.get("branch_info")
+        self.requirements_text = snapshot["requirements"]
+        self.helm_projects_with_tags = snapshot["projects"]
+        write_text_to_file(self.requirements_text, self.output_filename, mode = "w")
+
+        return snapshot.get("deep_search", False)
@@ -0,0 +1,120 @@
+"""Cache of the results of previous runs.
+
+A result (the updated file and the helm projects whose tag could not be
+updated) is stored under a key computed from everything it depends on: the
+target branch, the content of the fetched file and a version stamp of the
+tags (the newest tag of each referenced helm project). When none of them has
+changed, the stored result is used instead of crawling the tags again.
+
+Computing the stamp costs one request per helm project, so the cache is only
+used by deep searches, whose crawl costs many more.
+
+Each entry is a JSON file, written to a temporary file and then renamed, so
+concurrent runs never read a partially written entry.
+"""
+
+# Python Libraries
+import hashlib
+import json
+import os
+import os.path
+import tempfile
+
+# Increase when a change of the program changes the results.
+CACHE_VERSION = 1
+# Maximum number of entries, the oldest ones are removed.
+MAX_ENTRIES = 100
+
+
+def get_default_cache_directory():
+    """Returns the default cache directory ($XDG_CACHE_HOME/helm_tags_update)."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"),
+                                                                  ".cache")
+    return os.path.join(cache_home, "helm_tags_update")
+
+
+class ResultCache():
+    """The ResultCache class stores the results of runs in a directory,
+    which can be shared by concurrent runs."""
+
+    def __init__(self, directory = None):
+        """Instantiates a ResultCache object.
+
+        Args:
+            directory(string): The cache directory (default is
+                               get_default_cache_directory()).
+        """
+        self.directory = directory or get_default_cache_directory()
+
+    @staticmethod
+    def make_key(**inputs):
+        """Returns the key of a result.
+
+        Args:
+            inputs: Everything the result depends on (JSON-serializable).
+
+        Returns:
+            (string): The key (a SHA-256 hex digest).
+        """
+        document = json.dumps({"version" : CACHE_VERSION, **inputs}, sort_keys = True)
+        return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the result stored under key, or None if there is none.
+
+        Returns:
+            (dict): A dictionary containing:
+                        - "output" : The content of the updated file,
+                        - "failed" : The helm projects whose tag could not be updated.
+        """
+        try:
+            with open(self._path(key), "r", encoding = "utf-8") as fstream:
+                entry = json.load(fstream)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("version") != CACHE_VERSION:
+            return None
+        return {"output" : entry["output"], "failed" : entry["failed"]}
+
+    def put(self, key, output, failed):
+        """Stores a result under key. Errors are ignored, the cache is only an optimization.
+
+        Args:
+            key(string): The key (see make_key).
+            output(string): The content of the updated file.
+            failed(dict): The helm projects whose tag could not be updated.
+        """
+        entry = {"version" : CACHE_VERSION, "output" : output, "failed" : failed}
+        try:
+            os.makedirs(self.directory, exist_ok = True)
+            file_descriptor, temp_path = tempfile.mkstemp(dir = self.directory, suffix = ".tmp")
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(file_descriptor, "w", encoding = "utf-8") as fstream:
+                json.dump(entry, fstream)
+            # Atomic: readers see the previous entry or the new one, never a partial one.
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self._prune()
+
+    def _path(self, key):
+        """Returns the path of the entry of key."""
+        return os.path.join(self.directory, key + ".json")
+
+    def _prune(self):
+        """Removes the oldest entries beyond MAX_ENTRIES."""
+        try:
+            entries = [entry for entry in os.scandir(self.directory)
+                       if entry.name.endswith(".json")]
+            entries.sort(key = lambda entry: entry.stat().st_mtime)
+            for entry in entries[:-MAX_ENTRIES]:
+                os.remove(entry.path)
+        except OSError:
+            # An other run may be pruning at the same time.
+            return
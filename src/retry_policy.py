@@ -0,0 +1,213 @@
+"""Retry policy: jittered exponential backoff, retry budgets and circuit breakers."""
+
+# Python Libraries
+from collections import deque
+import random
+import threading
+import time
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class RetryPolicy():
+    """The RetryPolicy class decides which responses are retried
+    and how long to wait before each retry.
+
+    The delay before retry n (starting from 0) is a random number between 0 and
+    min(max_delay, base_delay * 2^n) ("full jitter"), so that clients retrying
+    at the same time do not hit the server at the same time.
+    """
+
+    def __init__(self, base_delay = 0.1, max_delay = 5.0,
+                 status_forcelist = (429, 500, 502, 503, 504)):
+        """Instantiates a RetryPolicy object.
+
+        Args:
+            base_delay(float): The delay (in seconds) before the first retry.
+            max_delay(float): The maximum delay (in seconds) before a retry.
+            status_forcelist(tuple): The HTTP status codes for which
+                                     a retry should be performed.
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.status_forcelist = tuple(status_forcelist)
+
+    def should_retry(self, status_code):
+        """Returns True if a response with status_code should be retried."""
+        return status_code in self.status_forcelist
+
+    def backoff(self, attempt, retry_after = None):
+        """Returns the delay (in seconds) before retry number attempt.
+
+        Args:
+            attempt(int): The number of the retry (starting from 0).
+            retry_after(float): The delay requested by the server
+                                (Retry-After header), if any.
+
+        Returns:
+            (float): The delay.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+class RetryBudget():
+    """The RetryBudget class limits the retries of an operation
+    (e.g. fetching the tags of projects) to a fraction of its requests.
+
+    Every retry costs one token and every successful request refunds
+    refill_ratio tokens. When the tokens run out, requests are not retried,
+    so a degraded server is not flooded with retries.
+    """
+
+    def __init__(self, max_tokens = 20, refill_ratio = 0.1):
+        """Instantiates a RetryBudget object.
+
+        Args:
+            max_tokens(float): The maximum number of tokens.
+            refill_ratio(float): Tokens refunded for every successful request.
+        """
+        self.max_tokens = max_tokens
+        self.refill_ratio = refill_ratio
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def can_retry(self):
+        """Consumes a token, if one is available.
+
+        Returns:
+            (boolean): True if the request can be retried.
+        """
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def record_success(self):
+        """Refunds refill_ratio tokens."""
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.refill_ratio)
+
+
+class CircuitBreaker():
+    """The CircuitBreaker class stops requests to a host whose recent
+    requests have mostly failed.
+
+    An outcome is recorded once per request, after its retries, so that a
+    single failing uri (e.g. the tags of one broken project) cannot open
+    the breaker of the whole host: the failures must come from at least
+    `min_failed_uris` distinct uris.
+
+    - closed    : Requests are sent. If the error rate of the last `window`
+                  requests reaches `failure_threshold`, the breaker opens.
+    - open      : Requests fail fast, without being sent. After `open_seconds`
+                  the breaker becomes half-open.
+    - half-open : A single probe request is sent. If it succeeds the breaker
+                  closes, otherwise it opens again.
+    """
+
+    def __init__(self, failure_threshold = 0.5, window = 20, min_requests = 10,
+                 min_failed_uris = 3, open_seconds = 30):
+        """Instantiates a CircuitBreaker object.
+
+        Args:
+            failure_threshold(float): The error rate (0 - 1) that opens the breaker.
+            window(int): The number of recent requests the error rate is computed on.
+            min_requests(int): The minimum number of requests before the breaker
+                               can open.
+            min_failed_uris(int): The minimum number of distinct failed uris
+                                  in the window before the breaker can open.
+            open_seconds(float): How long the breaker stays open before a probe.
+        """
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.min_failed_uris = min_failed_uris
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        # None for a successful request, the uri for a failed one.
+        self._outcomes = deque(maxlen = window)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """Returns True if a request can be sent to the host."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+
+            # Half-open: only one probe at a time.
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def is_open(self):
+        """Returns True if the breaker is open (requests fail fast)."""
+        with self._lock:
+            return self.state == OPEN
+
+    def record_success(self):
+        """Records a successful request."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self._outcomes.clear()
+                self._probe_in_flight = False
+            self._outcomes.append(None)
+
+    def record_failure(self, uri):
+        """Records a failed request (after its retries).
+
+        Args:
+            uri(string): The uri of the request.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+
+            self._outcomes.append(uri)
+            failed_uris = [outcome for outcome in self._outcomes if outcome is not None]
+            if (len(self._outcomes) >= self.min_requests) and \
+               (len(failed_uris) / len(self._outcomes) >= self.failure_threshold) and \
+               (len(set(failed_uris)) >= self.min_failed_uris):
+                self._open()
+
+    def _open(self):
+        """Opens the breaker. Must be called with the lock held."""
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self._outcomes.clear()
+
+
+# One circuit breaker per host, shared by all sessions.
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(host):
+    """Returns the circuit breaker of a host (created on first use).
+
+    Args:
+        host(string): The host, e.g. "scm.cci.nokia.net".
+
+    Returns:
+        (CircuitBreaker): The circuit breaker of the host.
+    """
+    with _circuit_breakers_lock:
+        if host not in _circuit_breakers:
+            _circuit_breakers[host] = CircuitBreaker()
+        return _circuit_breakers[host]
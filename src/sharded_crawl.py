@@ -0,0 +1,195 @@
+"""Crawl of the helm tags sharded across worker processes.
+
+Decoding the pages of tags and building the tag lists is CPU-bound, so a
+single process is limited by the GIL on crawls of thousands of projects.
+The projects are dealt round-robin to the shards (the list is ordered by
+activity, so every shard gets a share of the most active projects). Each
+shard is crawled by a worker process with its own API session,
+and the results are merged back in the order of the project list.
+"""
+
+# Python Libraries
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+import time
+
+# Program Libraries
+from src.constants import EXECUTION_LOG_FILE
+from src.deadline import Deadline
+from src.progress import ProgressReporter
+from src.sources import LEGACY
+from src.spill import SpillingList
+from src.utils import write_text_to_file
+
+
+def crawl_shard(shard_index, projects_list, deep_search, settings):
+    """Fetches the tags of a shard of the helm projects (in a worker process).
+
+    Args:
+        shard_index(int): The index of the shard.
+        projects_list(list): The projects of the shard (see find_tags_of_projects).
+        deep_search(boolean): If true, all tags of the projects will be fetched.
+        settings(dict): The settings of the session, containing:
+                            - "instance" : The gitlab instance ("central" or "legacy"),
+                            - "per_page" : Number of items per page,
+                            - "timeout" : The timeout of the requests (in seconds),
+                            - "backoff_factor" : The backoff factor of the retries,
+                            - "http2" : If True, the HTTP/2 transport is used,
+                            - "deadline" : Remaining time of the run in seconds
+                                           (None for no deadline),
+                            - "window" : The dates of the tags of a seeking deep
+                                         search (None to fetch all tags).
+
+    Returns:
+        (dict): A dictionary containing:
+                    - "shard" : The index of the shard,
+                    - "pid" : The id of the worker process,
+                    - "projects" : The projects with their tags,
+                    - "failed" : The projects whose tags could not be fetched,
+                    - "elapsed" : The time (in seconds) the shard took,
+                    - "counters" : The request counters of the shard
+                                   (see ProgressReporter.counters).
+    """
+    if settings.get("instance") == LEGACY:
+        from src.legacy_ci_api import LegacyCIAPI as API
+    else:
+        from src.central_ci_api import CentralCIAPI as API
+
+    start = time.perf_counter()
+    progress = ProgressReporter(quiet = True)
+    api = API()
+    api.set_progress_reporter(progress)
+    api.set_per_page(settings["per_page"])
+    api.set_timeout(settings["timeout"])
+    api.set_backoff_factor(settings["backoff_factor"])
+    if settings["deadline"] is not None:
+        api.set_deadline(Deadline(settings["deadline"]))
+    if settings["http2"]:
+        api.enable_http2()
+
+    failed_projects = {}
+    try:
+        projects_tags = api.find_tags_of_projects(projects_list, deep_search, failed_projects,
+                                                  window = settings.get("window"))
+    finally:
+        api.close()
+
+    return {
+        "shard" : shard_index,
+        "pid" : os.getpid(),
+        "projects" : projects_tags,
+        "failed" : failed_projects,
+        "elapsed" : time.perf_counter() - start,
+        "counters" : progress.counters()
+    }
+
+
+def find_tags_of_projects_sharded(projects_list, workers, deep_search = False,
+                                  failed_projects = None, memory_budget = None,
+                                  progress = None, settings = None, api = None):
+    """Fetches the tags of every project (see GitlabAPI.find_tags_of_projects)
+    with a pool of worker processes, one shard of the projects per worker.
+
+    Args:
+        projects_list(list): A list with dictionaries containing (at least):
+                                - "name" : Project name,
+                                - "id" : Project id.
+        workers(int): The number of worker processes (and shards).
+        deep_search(boolean): If true, all tags of the projects will be fetched.
+        failed_projects(dict): The projects whose tags could not be fetched are
+                               added to it ({"name" : reason}).
+        memory_budget(int): If provided, the merged projects are kept in memory
+                            up to this size (in bytes), see SpillingList.
+        progress(ProgressReporter): The progress reporter of the run, the
+                                    requests of each shard are added to it
+                                    when the shard completes.
+        settings(dict): The settings of the sessions of the workers (see crawl_shard).
+        api(GitlabAPI): The API object of the instance in this process. If it has
+                        a journal, the projects recorded by an interrupted crawl are
+                        not sharded and the projects of each shard are recorded when
+                        the shard completes.
+
+    Returns:
+        projects_tags(list or SpillingList): The projects with their tags,
+                                             in the order of projects_list.
+        shard_timings(list): A dictionary for each shard (ordered by index), containing:
+                                - "shard" : The index of the shard,
+                                - "pid" : The id of the worker process,
+                                - "projects" : The number of projects of the shard,
+                                - "elapsed" : The time (in seconds) the shard took.
+    """
+    journal = api.journal if api is not None else None
+    crawled = {}
+    remaining_projects = []
+    for project in projects_list:
+        recorded_project = journal.get_project(api.get_journal_key(project)) \
+            if journal is not None else None
+        if recorded_project is not None:
+            crawled[project["id"]] = recorded_project
+        else:
+            remaining_projects.append(project)
+
+    shards = [remaining_projects[index::workers] for index in range(workers)]
+    shards = [shard for shard in shards if shard]
+
+    if progress is not None:
+        progress.add_projects(len(projects_list))
+        progress.add_counters({"projects_done" : len(crawled)})
+        progress.set_stage(f"Fetching tags ({len(shards)} worker processes)")
+
+    shard_timings = []
+    with ProcessPoolExecutor(max_workers = max(len(shards), 1)) as executor:
+        futures = [executor.submit(crawl_shard, index, shard, deep_search, settings)
+                   for index, shard in enumerate(shards)]
+        for future in as_completed(futures):
+            result = future.result()
+            for project in result["projects"]:
+                crawled[project["id"]] = project
+                if journal is not None:
+                    journal.record_project(api.get_journal_key(project), project)
+            if failed_projects is not None:
+                failed_projects.update(result["failed"])
+            if progress is not None:
+                progress.add_counters(result["counters"])
+            shard_timings.append({
+                "shard" : result["shard"],
+                "pid" : result["pid"],
+                "projects" : len(shards[result["shard"]]),
+                "elapsed" : result["elapsed"]
+            })
+
+    if memory_budget is None:
+        projects_tags = []
+    else:
+        projects_tags = SpillingList(memory_budget)
+    for project in projects_list:
+        if project["id"] in crawled:
+            projects_tags.append(crawled.pop(project["id"]))
+
+    shard_timings.sort(key = lambda timing: timing["shard"])
+    write_text_to_file(shard_timings_summary(shard_timings) + "\n",
+                       EXECUTION_LOG_FILE, mode = "a")
+    return projects_tags, shard_timings
+
+
+def shard_timings_summary(shard_timings):
+    """Returns the report of the timings of the shards of a crawl.
+
+    Args:
+        shard_timings(list): The timings (see find_tags_of_projects_sharded).
+
+    Returns:
+        (string): The report.
+    """
+    lines = [f"Sharded crawl: {len(shard_timings)} worker processes"]
+    for timing in shard_timings:
+        rate = timing["projects"] / timing["elapsed"] if timing["elapsed"] else 0.0
+        lines.append(f"  shard {timing['shard']} (pid {timing['pid']}): " +\
+                     f"{timing['projects']} projects in {timing['elapsed']:.2f}s " +\
+                     f"({rate:.1f} projects/s)")
+    if shard_timings:
+        slowest = max(timing["elapsed"] for timing in shard_timings)
+        total = sum(timing["elapsed"] for timing in shard_timings)
+        lines.append(f"  slowest shard {slowest:.2f}s, " +\
+                     f"parallelism {total / slowest if slowest else 0.0:.1f}x")
+    return "\n".join(lines)
@@ -0,0 +1,98 @@
+"""Snapshot of the crawled state, used for offline runs.
+
+A snapshot is a gzip-compressed JSON Lines file. Each line is a
+record with a "kind" key:
+    - "header"       : format version, target branch and deep_search flag,
+    - "branch"       : info about the target branch,
+    - "requirements" : the fetched requirements.yaml file,
+    - "project"      : one helm project with its tags.
+"""
+
+# Python Libraries
+import gzip
+import json
+from inspect import stack
+
+# Program Libraries
+from src.exceptions import SnapshotException
+
+SNAPSHOT_VERSION = 1
+
+
+def write_snapshot(path, snapshot):
+    """Writes a snapshot to a gzip-compressed JSON Lines file.
+
+    Args:
+        path(string): The path of the snapshot file.
+        snapshot(dict): A dictionary containing:
+                            - "branch" : Target branch name,
+                            - "deep_search" : The deep_search flag of the crawl,
+                            - "branch_info" : Info about the target branch,
+                            - "requirements" : Content of requirements.yaml,
+                            - "projects" : A list with dictionaries containing
+                                           "name", "id" and "tags".
+    """
+    header = {
+        "kind" : "header",
+        "version" : SNAPSHOT_VERSION,
+        "branch" : snapshot["branch"],
+        "deep_search" : snapshot["deep_search"]
+    }
+
+    with gzip.open(path, "wt", encoding = "utf-8") as fstream:
+        _write_record(fstream, header)
+        _write_record(fstream, {"kind" : "branch", "info" : snapshot["branch_info"]})
+        _write_record(fstream, {"kind" : "requirements", "content" : snapshot["requirements"]})
+        for project in snapshot["projects"]:
+            _write_record(fstream, {
+                "kind" : "project",
+                "name" : project["name"],
+                "id"   : project["id"],
+                "tags" : project["tags"]
+            })
+
+def read_snapshot(path):
+    """Reads a snapshot written by write_snapshot.
+
+    Args:
+        path(string): The path of the snapshot file.
+
+    Returns:
+        snapshot(dict): The snapshot, in the format accepted by write_snapshot.
+
+    Raises:
+        SnapshotException: If the file cannot be read or is not a valid snapshot.
+    """
+    snapshot = {"projects" : []}
+
+    try:
+        with gzip.open(path, "rt", encoding = "utf-8") as fstream:
+            for line in fstream:
+                record = json.loads(line)
+                kind = record["kind"]
+
+                if kind == "header":
+                    if record["version"] != SNAPSHOT_VERSION:
+                        msg = f"Unsupported snapshot version {record['version']}."
+                        raise SnapshotException(stack()[0], path, msg)
+                    snapshot["branch"] = record["branch"]
+                    snapshot["deep_search"] = record["deep_search"]
+                elif kind == "branch":
+                    snapshot["branch_info"] = record["info"]
+                elif kind == "requirements":
+                    snapshot["requirements"] = record["content"]
+                elif kind == "project":
+                    record.pop("kind")
+                    snapshot["projects"].append(record)
+    except (OSError, EOFError, ValueError, KeyError) as exc:
+        raise SnapshotException(stack()[0], path, str(exc)) from exc
+
+    for key in ("branch", "requirements"):
+        if key not in snapshot:
+            raise SnapshotException(stack()[0], path, f"Missing \"{key}\" record.")
+
+    return snapshot
+
+def _write_record(fstream, record):
+    """Writes a record as a single compact JSON line."""
+    fstream.write(json.dumps(record, separators = (",", ":")) + "\n")
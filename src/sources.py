@@ -0,0 +1,78 @@
+"""Sources of the helm projects: the gitlab groups that are crawled."""
+
+# Python Libraries
+from inspect import stack
+
+# Program Libraries
+from src.exceptions import SourcesFileException
+
+# Gitlab instances: Central CI (CentralCIAPI) and Legacy CI (LegacyCIAPI).
+CENTRAL = "central"
+LEGACY = "legacy"
+INSTANCES = (CENTRAL, LEGACY)
+
+# The helm projects of ntas/helm in Central CI.
+DEFAULT_SOURCES = [{"instance" : CENTRAL, "group" : "ntas/helm"}]
+# Default number of requests in flight at once across all sources.
+DEFAULT_CONCURRENCY = 8
+
+
+def load_sources(path):
+    """Loads the sources of the helm projects from a yaml (or json) file
+    of the form:
+
+        concurrency: 8          # (optional) requests in flight at once across sources
+        sources:
+          - instance: central   # "central" (Central CI) or "legacy" (Legacy CI)
+            group: ntas/helm    # the full path of the group
+          - instance: legacy
+            group: tas/charts
+
+    When two sources contain a project with the same name, the project of the
+    source listed first is used.
+
+    Args:
+        path(string): The path of the sources file.
+
+    Returns:
+        sources(list): A dictionary for each source, containing:
+                        - "instance" : "central" or "legacy",
+                        - "group" : The full path of the group.
+        concurrency(int): The number of requests in flight at once across sources.
+
+    Raises:
+        SourcesFileException: If the file cannot be read or is not valid.
+    """
+    import yaml
+
+    try:
+        with open(path, "r", encoding = "utf-8") as sources_stream:
+            config = yaml.safe_load(sources_stream)
+    except (OSError, yaml.YAMLError) as exc:
+        raise SourcesFileException(stack()[0], path, str(exc)) from exc
+
+    if not isinstance(config, dict):
+        raise SourcesFileException(stack()[0], path, "Expected a mapping with \"sources\".")
+
+    sources = config.get("sources")
+    if not isinstance(sources, list) or len(sources) == 0:
+        raise SourcesFileException(stack()[0], path, "Expected a non-empty list of sources.")
+
+    for source in sources:
+        if not isinstance(source, dict) or (source.get("instance") not in INSTANCES) or \
+           not source.get("group"):
+            msg = f"Source {source} must contain \"instance\" (one of " +\
+                f"{', '.join(INSTANCES)}) and \"group\"."
+            raise SourcesFileException(stack()[0], path, msg)
+        source["group"] = str(source["group"]).strip("/")
+
+    concurrency = config.get("concurrency", DEFAULT_CONCURRENCY)
+    if not isinstance(concurrency, int) or concurrency < 1:
+        raise SourcesFileException(stack()[0], path,
+                                   "\"concurrency\" must be a positive integer.")
+
+    return sources, concurrency
+
+def get_source_name(source):
+    """Returns the name of a source, e.g. "central:ntas/helm"."""
+    return f"{source['instance']}:{source['group']}"
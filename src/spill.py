@@ -0,0 +1,86 @@
+"""List that spills to disk once a memory budget is exceeded."""
+
+# Python Libraries
+import json
+import sys
+import tempfile
+
+# Program Libraries
+from src.fast_json import parse_json
+
+
+def estimate_size(obj):
+    """Returns an estimate (in bytes) of the memory used by a JSON-like object
+    (dictionaries, lists, strings, numbers), including its contents.
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += estimate_size(key) + estimate_size(value)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            size += estimate_size(value)
+    return size
+
+
+class SpillingList():
+    """The SpillingList class is an append-only list of JSON-serializable items.
+    Items are kept in memory until their (estimated) size exceeds the memory
+    budget; the next items are written to a temporary file, which is streamed
+    back (one item at a time) on iteration.
+
+    It can be iterated several times, but not while items are being appended.
+    """
+
+    def __init__(self, memory_budget = None):
+        """Instantiates a SpillingList object.
+
+        Args:
+            memory_budget(int): The memory (in bytes) that the items kept in
+                                memory may use (None for no budget).
+        """
+        self.memory_budget = memory_budget
+        self.memory_size = 0
+        self.spilled = 0
+        self._items = []
+        self._file = None
+
+    def __len__(self):
+        return len(self._items) + self.spilled
+
+    def __iter__(self):
+        yield from self._items
+        if self._file is None:
+            return
+        self._file.flush()
+        self._file.seek(0)
+        for line in self._file:
+            yield parse_json(line)
+        # Appending continues at the end of the file.
+        self._file.seek(0, 2)
+
+    def append(self, item):
+        """Appends an item, in memory if it fits in the budget, to the file otherwise.
+
+        Args:
+            item: A JSON-serializable object.
+        """
+        if self._file is None:
+            size = estimate_size(item)
+            if (self.memory_budget is None) or (self.memory_size + size <= self.memory_budget):
+                self._items.append(item)
+                self.memory_size += size
+                return
+            self._file = tempfile.TemporaryFile(mode = "w+b", prefix = "helm_tags_")
+
+        self._file.write(json.dumps(item).encode() + b"\n")
+        self.spilled += 1
+
+    def close(self):
+        """Deletes the items and the temporary file (if items were spilled)."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._items = []
+        self.memory_size = 0
+        self.spilled = 0
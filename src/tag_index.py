@@ -0,0 +1,130 @@
+"""Semantic-version index of the tags of a project."""
+
+# Python Libraries
+from bisect import bisect_left, insort
+import re
+
+# X.Y.Z, optionally prefixed by "v" and followed by -prerelease and/or +build.
+SEMVER_PATTERN = re.compile(r"^v?(\d+)\.(\d+)\.(\d+)"
+                            r"(?:-([0-9A-Za-z.-]+))?(?:\+([0-9A-Za-z.-]+))?$")
+
+
+def version_key(tag):
+    """Returns the sort key of a tag, following the precedence rules
+    of semantic versioning (1.0.0-rc.1 < 1.0.0 < 1.0.1 < 1.1.0 < 2.0.0).
+    The "v" prefix is ignored, so "vX.Y.Z" and "X.Y.Z" have the same key.
+
+    Args:
+        tag(string): The name of the tag, e.g. "1.2.3" or "v1.2.3-rc.1".
+
+    Returns:
+        (tuple): The sort key, or None if tag is not a semantic version.
+    """
+    match = SEMVER_PATTERN.match(tag)
+    if match is None:
+        return None
+
+    major, minor, patch, prerelease, build = match.groups()
+    if prerelease is None:
+        # A release has higher precedence than its pre-releases.
+        prerelease_key = (1, ())
+    else:
+        # Numeric identifiers are compared numerically and
+        # have lower precedence than alphanumeric ones.
+        prerelease_key = (0, tuple((0, int(part), "") if part.isdigit() else (1, 0, part)
+                                   for part in prerelease.split(".")))
+    # The build metadata does not affect precedence,
+    # it only orders the builds of a version deterministically.
+    return (int(major), int(minor), int(patch), prerelease_key, build or "")
+
+
+class TagIndex():
+    """The TagIndex class keeps the tags of a project ordered by semantic version,
+    so that the latest tag and the latest tag below a version are found in
+    O(log n).
+
+    The "v"-prefixed variant of a tag ("vX.Y.Z" for "X.Y.Z") is not indexed
+    separately: the name without the prefix is kept. Tags that are not
+    semantic versions are kept aside in invalid_tags.
+    """
+
+    def __init__(self, tags = ()):
+        """Instantiates a TagIndex object.
+
+        Args:
+            tags(iterable): The names of the tags.
+        """
+        # Sorted sort keys and the name of the tag of each key.
+        self._keys = []
+        self._names = {}
+        self.invalid_tags = []
+
+        for tag in tags:
+            key = version_key(tag)
+            if key is None:
+                self.invalid_tags.append(tag)
+            elif self._add_name(key, tag):
+                self._keys.append(key)
+        self._keys.sort()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        """Iterates over the tags, from the oldest to the latest version."""
+        return (self._names[key] for key in self._keys)
+
+    def __contains__(self, tag):
+        key = version_key(tag)
+        return (key is not None) and (key in self._names)
+
+    def add(self, tag):
+        """Adds a tag to the index.
+
+        Args:
+            tag(string): The name of the tag.
+        """
+        key = version_key(tag)
+        if key is None:
+            self.invalid_tags.append(tag)
+        elif self._add_name(key, tag):
+            insort(self._keys, key)
+
+    def latest(self):
+        """Returns the tag with the highest version, or None if the index is empty."""
+        if not self._keys:
+            return None
+        return self._names[self._keys[-1]]
+
+    def latest_below(self, bound):
+        """Returns the tag with the highest version lower than bound,
+        or None if there is no such tag.
+
+        Args:
+            bound(string): A semantic version, e.g. "2.0.0".
+
+        Raises:
+            ValueError: If bound is not a semantic version.
+        """
+        key = version_key(bound)
+        if key is None:
+            raise ValueError(f"{bound} is not a semantic version.")
+        position = bisect_left(self._keys, key)
+        if position == 0:
+            return None
+        return self._names[self._keys[position - 1]]
+
+    def _add_name(self, key, tag):
+        """Records the name of the tag of key. If the key is already indexed,
+        the name without the "v" prefix is kept.
+
+        Returns:
+            (boolean): True if key was not indexed yet.
+        """
+        name = self._names.get(key)
+        if name is None:
+            self._names[key] = tag
+            return True
+        if name.startswith("v") and not tag.startswith("v"):
+            self._names[key] = tag
+        return False
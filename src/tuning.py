@@ -0,0 +1,304 @@
+"""Tuning of the request settings of each gitlab host.
+
+The right page size, number of requests in flight, request timeout and
+backoff factor differ between hosts. tune_host measures them with short
+probes: it crawls the tags of a sample of projects with each setting, while
+measuring the throughput (tags per second), the latency percentiles and the
+throttled requests (429 and 503 responses). The best settings of each host are
+stored in a profile (a JSON file, see save_profile), which normal runs load
+automatically (see load_profile).
+
+The profile is of the form:
+
+    {
+      "version" : 1,
+      "hosts" : {
+        "scm.cci.nokia.net" : {"per_page" : 100, "concurrency" : 4,
+                               "timeout" : 3.5, "backoff_factor" : 0.2, ...}
+      }
+    }
+"""
+
+# Python Libraries
+from concurrent.futures import ThreadPoolExecutor
+import json
+import math
+import os
+import os.path
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+# Program Libraries
+from src.constants import (
+    DEFAULT_BACKOFF_FACTOR,
+    DEFAULT_TIMEOUT,
+    MAX_PER_PAGE,
+    OK
+)
+from src.fast_json import parse_json
+
+# Increase when the format of the profile changes.
+PROFILE_VERSION = 1
+# Settings of a host that normal runs apply.
+SETTINGS = ("per_page", "concurrency", "timeout", "backoff_factor")
+
+# Probed values (concurrency is probed first, with the largest page size).
+DEFAULT_CONCURRENCY_LEVELS = (1, 2, 4, 8, 16)
+DEFAULT_PAGE_SIZES = (20, 50, MAX_PER_PAGE)
+# Projects whose tags are crawled by each probe, at most this many pages each.
+DEFAULT_PROBE_PROJECTS = 32
+DEFAULT_PROBE_PAGES = 3
+# Statuses of throttled requests.
+THROTTLE_STATUSES = (429, 503)
+# A setting whose probe throttled more requests than this ratio is not used.
+MAX_THROTTLE_RATIO = 0.01
+# A higher concurrency is used only if it improves the throughput by this ratio.
+MIN_GAIN = 0.05
+# Bounds of the tuned timeout (a multiple of the 99th percentile latency).
+TIMEOUT_LATENCY_FACTOR = 5
+MIN_TIMEOUT = 2.0
+MAX_TIMEOUT = 3 * DEFAULT_TIMEOUT
+
+
+def get_default_profile_path():
+    """Returns the default path of the profile
+    ($XDG_CONFIG_HOME/helm_tags_update/tuning.json)."""
+    config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"),
+                                                                    ".config")
+    return os.path.join(config_home, "helm_tags_update", "tuning.json")
+
+
+def get_host(uri):
+    """Returns the host of uri (the key of its settings in the profile)."""
+    return urlparse(uri).netloc
+
+
+def load_profile(path = None):
+    """Loads the settings of each host from the profile.
+
+    Args:
+        path(string): The path of the profile (default is get_default_profile_path()).
+
+    Returns:
+        (dict): The settings of each host ({"host" : {"per_page" : ..., ...}}),
+                empty if there is no (valid) profile.
+    """
+    try:
+        with open(path or get_default_profile_path(), "r", encoding = "utf-8") as fstream:
+            profile = json.load(fstream)
+    except (OSError, ValueError):
+        return {}
+
+    if (not isinstance(profile, dict)) or (profile.get("version") != PROFILE_VERSION) or \
+       (not isinstance(profile.get("hosts"), dict)):
+        return {}
+
+    hosts = {}
+    for host, settings in profile["hosts"].items():
+        if not isinstance(settings, dict):
+            continue
+        hosts[host] = {name : settings[name] for name in SETTINGS
+                       if isinstance(settings.get(name), (int, float)) and settings[name] > 0}
+    return hosts
+
+
+def save_profile(hosts, path = None):
+    """Stores the settings of each host in the profile. The file is written to
+    a temporary file and then renamed, so a run never reads a partial profile.
+
+    Args:
+        hosts(dict): The settings (and measurements) of each host.
+        path(string): The path of the profile (default is get_default_profile_path()).
+
+    Raises:
+        OSError: If the profile cannot be written.
+    """
+    path = path or get_default_profile_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok = True)
+    file_descriptor, temp_path = tempfile.mkstemp(dir = os.path.dirname(os.path.abspath(path)),
+                                                  suffix = ".tmp")
+    try:
+        with os.fdopen(file_descriptor, "w", encoding = "utf-8") as fstream:
+            json.dump({"version" : PROFILE_VERSION, "hosts" : hosts}, fstream, indent = 2)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def percentile(values, fraction):
+    """Returns the percentile (nearest rank) of values, 0.0 if there is none."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def run_probe(api, project_ids, concurrency, per_page, max_pages = DEFAULT_PROBE_PAGES):
+    """Crawls the tags of projects with concurrency requests in flight and
+    per_page tags per page, as the tag crawl does, and measures it.
+    Requests are not retried, so that throttling is measured.
+
+    Args:
+        api(GitlabAPI): The API object of the host.
+        project_ids(list): The ids of the projects.
+        concurrency(int): The number of requests in flight.
+        per_page(int): The number of tags per page.
+        max_pages(int): The maximum number of pages of each project.
+
+    Returns:
+        (dict): A dictionary containing:
+                    - "concurrency", "per_page" : The probed settings,
+                    - "requests" : The number of requests,
+                    - "throttled" : The number of throttled requests,
+                    - "failed" : The number of failed requests (errors and other statuses),
+                    - "items" : The number of tags received,
+                    - "elapsed" : The duration of the probe (in seconds),
+                    - "throughput" : Tags received per second,
+                    - "p50", "p95", "p99" : The latency percentiles (in seconds).
+    """
+    from requests.adapters import HTTPAdapter
+
+    # One connection per request in flight, as the crawl keeps them alive.
+    api.close()
+    adapter = HTTPAdapter(pool_connections = 1, pool_maxsize = concurrency)
+    api.mount("https://", adapter)
+    api.mount("http://", adapter)
+
+    lock = threading.Lock()
+    latencies = []
+    counts = {"requests" : 0, "throttled" : 0, "failed" : 0, "items" : 0}
+
+    def crawl_project(project_id):
+        uri = api.project_tags_uri.format(project_id = project_id)
+        for page_number in range(1, max_pages + 1):
+            page_uri = uri.format(page_number = page_number, per_page = per_page)
+            start = time.perf_counter()
+            try:
+                response = api.get(page_uri, timeout = MAX_TIMEOUT)
+            except Exception:
+                with lock:
+                    counts["requests"] += 1
+                    counts["failed"] += 1
+                return
+            latency = time.perf_counter() - start
+
+            page_size = 0
+            with lock:
+                counts["requests"] += 1
+                latencies.append(latency)
+                if response.status_code in THROTTLE_STATUSES:
+                    counts["throttled"] += 1
+                elif response.status_code != OK:
+                    counts["failed"] += 1
+                else:
+                    page_size = len(parse_json(response.content) or [])
+                    counts["items"] += page_size
+            if page_size < per_page:
+                return
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = concurrency) as executor:
+        list(executor.map(crawl_project, project_ids))
+    elapsed = max(time.perf_counter() - start, 1e-6)
+
+    return {
+        "concurrency" : concurrency,
+        "per_page" : per_page,
+        **counts,
+        "elapsed" : elapsed,
+        "throughput" : counts["items"] / elapsed,
+        "p50" : percentile(latencies, 0.50),
+        "p95" : percentile(latencies, 0.95),
+        "p99" : percentile(latencies, 0.99)
+    }
+
+
+def is_throttled(probe):
+    """Returns True if too many requests of a probe were throttled or failed."""
+    return (probe["throttled"] + probe["failed"]) > MAX_THROTTLE_RATIO * max(probe["requests"], 1)
+
+
+def tune_host(api, group_path, concurrency_levels = DEFAULT_CONCURRENCY_LEVELS,
+              page_sizes = DEFAULT_PAGE_SIZES, num_projects = DEFAULT_PROBE_PROJECTS,
+              max_pages = DEFAULT_PROBE_PAGES, report = None):
+    """Finds the best request settings of the host of api.
+
+    The concurrency is probed first (with the largest page size), in increasing
+    order, until a probe is throttled or stops improving the throughput by
+    MIN_GAIN. Then the page sizes are probed with the best concurrency.
+    The timeout is a multiple of the 99th percentile latency of the best probe,
+    and the backoff factor its 95th percentile latency (doubled if the host
+    throttled a probe).
+
+    Args:
+        api(GitlabAPI): The API object of the host.
+        group_path(string): The full path of a group whose projects are crawled
+                            (the most recently active ones).
+        concurrency_levels(tuple): The probed numbers of requests in flight.
+        page_sizes(tuple): The probed page sizes.
+        num_projects(int): The number of projects crawled by each probe.
+        max_pages(int): The maximum number of pages of each project.
+        report(callable): If provided, it is called with each probe as it completes.
+
+    Returns:
+        (dict): The settings ("per_page", "concurrency", "timeout", "backoff_factor")
+                and the measurements: "probes" (every probe, see run_probe) and "tuned_at".
+    """
+    group_id = api.get_group_id_from_path(group_path)
+    projects = api.extract_project_name_and_id(
+        api.recursive_request(api.projects_uri.format(group_id = group_id), deep_search = False))
+    projects.sort(key = lambda project: project["last_activity_at"] or "", reverse = True)
+    project_ids = [project["id"] for project in projects[:num_projects]]
+
+    probes = []
+
+    def probe(concurrency, per_page):
+        result = run_probe(api, project_ids, concurrency, per_page, max_pages)
+        probes.append(result)
+        if report is not None:
+            report(result)
+        return result
+
+    best = None
+    for concurrency in sorted(concurrency_levels):
+        result = probe(concurrency, max(page_sizes))
+        if is_throttled(result):
+            break
+        if (best is not None) and (result["throughput"] < best["throughput"] * (1 + MIN_GAIN)):
+            break
+        best = result
+    if best is None:
+        # Throttled even one request at a time: the slowest setting.
+        best = probes[0]
+
+    for per_page in sorted(page_sizes, reverse = True):
+        if per_page == best["per_page"]:
+            continue
+        result = probe(best["concurrency"], per_page)
+        if (not is_throttled(result)) and (result["throughput"] > best["throughput"]):
+            best = result
+
+    throttled = any(result["throttled"] for result in probes)
+    timeout = min(max(TIMEOUT_LATENCY_FACTOR * best["p99"], MIN_TIMEOUT), MAX_TIMEOUT)
+    backoff_factor = max(best["p95"], DEFAULT_BACKOFF_FACTOR) * (2 if throttled else 1)
+
+    return {
+        "per_page" : best["per_page"],
+        "concurrency" : best["concurrency"],
+        "timeout" : round(timeout, 2),
+        "backoff_factor" : round(backoff_factor, 3),
+        "probes" : probes,
+        "tuned_at" : time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    }
+
+
+def format_probe(probe):
+    """Returns a one-line report of a probe (see run_probe)."""
+    return f"concurrency {probe['concurrency']:>3} | per_page {probe['per_page']:>3} | " +\
+        f"{probe['throughput']:8.1f} tags/s | p50 {probe['p50'] * 1000:6.1f} ms | " +\
+        f"p95 {probe['p95'] * 1000:6.1f} ms | p99 {probe['p99'] * 1000:6.1f} ms | " +\
+        f"{probe['requests']} requests, {probe['throttled']} throttled, {probe['failed']} failed"
@@ -0,0 +1,37 @@
+"""Result of the in-memory update of a file (see RequirementsYamlUpdater.update)."""
+
+# Program Libraries
+from src.utils import write_text_to_file
+
+
+class UpdateResult():
+    """The UpdateResult class holds the updated content of a file and the
+    helm projects whose tag could not be updated. Writing the file is left
+    to the caller (see write).
+    """
+
+    def __init__(self, content, failed, filename):
+        """Instantiates an UpdateResult object.
+
+        Args:
+            content(string): The content of the updated file.
+            failed(dict): The helm projects whose tag could not be updated
+                          ({"name" : tags or reason}).
+            filename(string): The name of the local file of the updater.
+        """
+        self.content = content
+        self.failed = failed
+        self.filename = filename
+
+    @property
+    def success(self):
+        """True if every tag related to the branch was updated."""
+        return not self.failed
+
+    def write(self, path = None):
+        """Writes the updated file.
+
+        Args:
+            path(string): The path of the file (default is filename).
+        """
+        write_text_to_file(self.content, path or self.filename, mode = "w")
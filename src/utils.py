@@ -4,6 +4,8 @@
 from datetime import datetime
 import os
 import os.path
+import re
+from urllib.parse import urlparse
 
 # Program libraries
 from src.constants import (
@@ -64,3 +66,71 @@ def is_string(obj):
         (bool): True if the given object's value is a string.
     """
     return isinstance(obj, str)
+
+def match_tag_with_title(tags_list, keyword):
+    """Finds the tags whose title starts with the given keyword.
+
+    Args:
+        tags_list(list): A list with dictionaries containing
+                         (at least):
+                            - "name" : Tag name e.g. 1.0.0,
+                            - "title" : Tag title.
+        keyword(string): The word with which the title should begin.
+
+    Returns:
+        matches(list): A list containing the matching tags
+
+    """
+    matches = []
+    pattern = f"^{keyword.lower()}"
+    for element in tags_list:
+        title = element["title"].lower()
+        if re.match(pattern, title):
+            matches.append(element["name"])
+
+    return matches
+
+def endpoint_template(uri):
+    """Returns the endpoint template of a uri: its path, without the query
+    and with numeric ids replaced by "{id}",
+    e.g. "/api/v4/projects/{id}/repository/tags".
+
+    Args:
+        uri(string): The uri.
+
+    Returns:
+        (string): The endpoint template.
+    """
+    segments = urlparse(uri).path.split("/")
+    return "/".join("{id}" if segment.isdigit() else segment for segment in segments)
+
+def parse_gitlab_datetime(text):
+    """Parses a timestamp of gitlab (ISO 8601, e.g. "2024-03-01T10:00:00.000Z").
+
+    Args:
+        text(string): The timestamp.
+
+    Returns:
+        (datetime): The timezone-aware datetime (None if text is not a valid timestamp).
+    """
+    if not is_string(text):
+        return None
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+def get_wire_bytes(response):
+    """Returns the size of the body of a response on the wire
+    (before decompression), or its decoded size if it is not known.
+
+    Args:
+        response(requests.models.Response object): The response.
+
+    Returns:
+        (int): The size in bytes.
+    """
+    try:
+        return response.raw.tell()
+    except (AttributeError, OSError):
+        return len(response.content)